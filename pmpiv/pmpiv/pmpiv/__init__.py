@@ -8,12 +8,24 @@ Created on March 04 2025
 """
 
 from pmpiv.annotations       import (Annotation_Handler, Annotation_Reader)
+from pmpiv.checkpoint        import (Checkpoint)
 from pmpiv.df_io             import *
+from pmpiv.executor          import (Frame_Executor)
 # from pmpiv.filtering         import (Filtering, Annotation_Filtering)
 from pmpiv.filtering         import * 
 from pmpiv.fstats            import (Frame_Statistics, Sequence_Statistics)
 from pmpiv.helper            import *
+from pmpiv.linking           import (parallel_link)
 from pmpiv.image_sequence    import (Image_Sequence)
+from pmpiv.locate            import (locate_sequence)
 from pmpiv.metadata          import (Metadata)
 from pmpiv.motion_stats      import (Motion_Statistics)
-from pmpiv.ploting           import *
\ No newline at end of file
+from pmpiv.pipeline          import (run_pipeline)
+from pmpiv.ploting           import *
+from pmpiv.predictor         import (Field_Predictor)
+from pmpiv.reader            import (Cached_Sequence, Frame_Cache)
+from pmpiv.render            import (Overlay_Renderer)
+from pmpiv.scheduler         import (run_experiments)
+from pmpiv.stack             import (Frame_Stack, pack_sequence)
+from pmpiv.streaming         import (run_streaming)
+from pmpiv.velocity_field    import (Velocity_Field)
\ No newline at end of file
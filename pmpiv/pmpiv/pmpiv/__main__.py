@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+
+Command line entry point, e.g.
+
+    python -m pmpiv run params.txt --stages locate,link,filter,velocity
+    python -m pmpiv batch a.txt b.txt --cores 32 --stages locate,link,filter
+    python -m pmpiv pack params.txt --out /scratch/stack
+    python -m pmpiv stream params.txt --chunk-frames 500
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import sys
+import argparse
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+
+def main(argv = None):
+    """
+    """
+    parser = argparse.ArgumentParser(prog = 'python -m pmpiv')
+    commands = parser.add_subparsers(dest = 'command', required = True)
+
+    run = commands.add_parser('run', help = 'run pipeline stages for a parameter file')
+    run.add_argument('infile', help = 'parameter file, see README')
+    run.add_argument('--stages', default = ','.join(pmpiv.pipeline.STAGES),
+                     help = f'comma separated list of {pmpiv.pipeline.STAGES + pmpiv.pipeline.EXTRA_STAGES} '
+                            f'or {list(pmpiv.pipeline.ALIASES)}')
+    run.add_argument('--workers', type = int, default = 2,
+                     help = 'number of stages running concurrently')
+    run.add_argument('--processes', default = 'auto',
+                     help = 'number of processes to locate features')
+    run.add_argument('--chunk-frames', type = int, default = 1000,
+                     help = 'number of frames per checkpoint chunk')
+    run.add_argument('--quiet', action = 'store_true')
+
+    batch = commands.add_parser('batch', help = 'run pipeline stages for several parameter files')
+    batch.add_argument('infiles', nargs = '+', help = 'parameter files, one per experiment')
+    batch.add_argument('--stages', default = ','.join(pmpiv.pipeline.STAGES),
+                       help = 'comma separated list of stages, see run')
+    batch.add_argument('--cores', type = int, default = None,
+                       help = 'core budget of all experiments together, default all cores')
+    batch.add_argument('--io-slots', type = int, default = 2,
+                       help = 'number of I/O stages running alongside the CPU stages')
+    batch.add_argument('--chunk-frames', type = int, default = 1000,
+                       help = 'number of frames per checkpoint chunk')
+    batch.add_argument('--quiet', action = 'store_true')
+
+    pack = commands.add_parser('pack', help = 'pack the tiff files of IN_PATH into one memory mapped frame stack')
+    pack.add_argument('infile', help = 'parameter file, see README')
+    pack.add_argument('--out', default = None, help = 'output folder, default WORKING_DIR/stack')
+    pack.add_argument('--quiet', action = 'store_true')
+
+    stream = commands.add_parser('stream', help = 'out-of-core locate, link, filter and velocity in one pass')
+    stream.add_argument('infile', help = 'parameter file, see README')
+    stream.add_argument('--filters', default = ','.join(pmpiv.streaming.FILTERS),
+                        help = f'comma separated subset of {pmpiv.streaming.FILTERS}')
+    stream.add_argument('--processes', default = 'auto',
+                        help = 'number of processes to locate features')
+    stream.add_argument('--chunk-frames', type = int, default = 1000,
+                        help = 'number of frames held in memory and written at once')
+    stream.add_argument('--quiet', action = 'store_true')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        md = pmpiv.metadata.Metadata(args.infile)
+        processes = args.processes if args.processes == 'auto' else int(args.processes)
+        pmpiv.pipeline.run_stages(m_metadata = md,
+                                  stages = args.stages,
+                                  max_workers = args.workers,
+                                  chunk_frames = args.chunk_frames,
+                                  processes = processes,
+                                  verbose = not args.quiet)
+
+    elif args.command == 'batch':
+        reports = pmpiv.scheduler.run_experiments(args.infiles,
+                                                  cores = args.cores,
+                                                  io_slots = args.io_slots,
+                                                  stages = args.stages,
+                                                  chunk_frames = args.chunk_frames,
+                                                  verbose = not args.quiet)
+        if any(r['failed'] for r in reports.values()):
+            return 1
+
+    elif args.command == 'pack':
+        md = pmpiv.metadata.Metadata(args.infile)
+        pmpiv.stack.pack_sequence(m_metadata = md, outfolder = args.out, verbose = not args.quiet)
+
+    elif args.command == 'stream':
+        md = pmpiv.metadata.Metadata(args.infile)
+        processes = args.processes if args.processes == 'auto' else int(args.processes)
+        pmpiv.streaming.run_streaming(m_metadata = md,
+                                      filters = [f.strip() for f in args.filters.split(',') if f.strip()],
+                                      chunk_frames = args.chunk_frames,
+                                      processes = processes,
+                                      verbose = not args.quiet)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,6 +17,7 @@ import matplotlib.pyplot as plt
 
 import pandas as pd
 import json
+import hashlib
 from pycocotools.coco import COCO
 import itertools
 from ast import literal_eval
@@ -68,12 +69,46 @@ class Annotation_Handler:
             yield group[0][1], group[-1][1]
 
 
-    def annotations2DF(self, writeto = None):
+    def _cache_file(self):
+        """
+        Name of the cache file in WORKING_DIR. The key is a hash of the json 
+        file content and the image shape of the annotations (image id 1, 
+        as in _compute_mask).
+        """
+        with open(self.json_filename, 'rb') as fh:
+            content = fh.read()
+
+        img   = {i['id'] : i for i in json.loads(content)['images']}[1]
+        shape = (int(img['height']), int(img['width']))
+
+        key = hashlib.sha1(content + str(shape).encode()).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(self.json_filename))[0]
+
+        return os.path.join(self.m_metadata.WORKING_DIR, f'annotations_{name}_{key}.npz')
+
+
+    def _mask2ranges(self, mask):
+        """
+        Vectorized run-length conversion of a mask to ranges of annotated 
+        pixels along y for each column x. 
+
+        Returns arrays x, y_start, y_end (inclusive) sorted by x and y_start.
+        """
+        # pad along y to detect runs touching the image border
+        padded = np.zeros((mask.shape[1], mask.shape[0] + 2), dtype = np.int8)
+        padded[:, 1:-1] = (mask.T != 0)
+
+        edges = np.diff(padded, axis = 1)
+
+        x, y_start = np.nonzero(edges ==  1)
+        _, y_end   = np.nonzero(edges == -1)
+
+        return x, y_start, y_end - 1
+
+
+    def _compute_mask(self):
         """
         """
-        # if self._plot == True:
-        #     if mytif == None:
-        #         raise ValueError('If ploting is enablet')
 
         # load annotations
         coco = COCO(self.json_filename)
@@ -91,38 +126,99 @@ class Annotation_Handler:
 
         mask[mask != 0] = 1
 
-        xlist = []
-        ylist = []
+        return mask
+
+
+    def _load(self, cache = True):
+        """
+        Returns a dict with the entries shape, mask (bit packed), x, y_start 
+        and y_end, read from the npz cache. If no valid cache file exists 
+        the mask is computed and, if cache is True, written to WORKING_DIR.
+        """
+        _f = self._cache_file() if cache else None
+
+        if _f is not None and os.path.isfile(_f):
+            if self.verbose:
+                print(f'Read annotation mask from {_f}')
+            with np.load(_f) as npz:
+                return {k : npz[k] for k in npz.files}
+
+        mask = self._compute_mask()
+        x, y_start, y_end = self._mask2ranges(mask)
+
+        data = {'shape'   : np.asarray(mask.shape), 
+                'mask'    : np.packbits(mask, axis = None),
+                'x'       : x, 
+                'y_start' : y_start, 
+                'y_end'   : y_end}
+
+        if _f is not None:
+            os.makedirs(self.m_metadata.WORKING_DIR, exist_ok = True)
+            # write to temporary file first, concurrent runs may share WORKING_DIR
+            _tmp = f'{_f}.{os.getpid()}.tmp'
+            with open(_tmp, 'wb') as fh:
+                np.savez_compressed(fh, **data)
+            os.replace(_tmp, _f)
+            if self.verbose:
+                print(f'Writing annotation mask to {_f}')
+
+        return data
 
-        for i in range(mask.shape[0]):
-            for j in range(mask.shape[1]):
-                if mask[i, j] == 1:
-                    ylist.append(i)
-                    xlist.append(j)
 
-        pd_data = np.column_stack((xlist, ylist))
+    def annotations2mask(self, cache = True):
+        """
+        Rasterize all annotations of the json file into one binary image.
+
+        Returns a uint8 array of shape (height, width) of the annotated image,
+        indexed as mask[y, x], with 1 inside and 0 outside the annotations.
+
+        cache : read/write the mask from/to a .npz file in WORKING_DIR
+        """
+
+        data  = self._load(cache = cache)
+        shape = tuple(data['shape'])
+
+        mask = np.unpackbits(data['mask'], count = shape[0] * shape[1]).reshape(shape)
+
+        return mask
+
+
+    def annotations2DF(self, writeto = None, cache = True):
+        """
+        cache : read/write the mask from/to a .npz file in WORKING_DIR
+        """
+        # if self._plot == True:
+        #     if mytif == None:
+        #         raise ValueError('If ploting is enablet')
+
+        data = self._load(cache = cache)
 
-        _dead_pixels = pd.DataFrame(data = pd_data, columns = ['x', 'y'])
-        
         if self.json_type == 'COCO_range':
-            _dead_pixels = _dead_pixels.groupby('x')['y'].apply(list)
+            x       = np.asarray(data['x'])
+            y_start = np.asarray(data['y_start']).tolist()
+            y_end   = np.asarray(data['y_end']).tolist()
 
-            myindex = _dead_pixels.index
-            myvalues = _dead_pixels.values
+            # split the runs per column x
+            columns, first = np.unique(x, return_index = True)
+            bounds = list(first[1:]) + [x.shape[0]]
 
-            dead_pixels = pd.DataFrame(columns = ['x', 'y'])
+            ranges = []
+            for k in range(columns.shape[0]):
+                ranges.append(list(zip(y_start[first[k]:bounds[k]], y_end[first[k]:bounds[k]])))
 
-            for i in range(len(myindex)):
-                dead_pixels.loc[i] = [myindex[i] , list(self._to_ranges(myvalues[i]))]
+            dead_pixels = pd.DataFrame({'x' : columns.tolist(), 'y' : ranges})
         elif self.json_type == 'COCO':
-            dead_pixels = _dead_pixels
+            shape = tuple(data['shape'])
+            mask  = np.unpackbits(data['mask'], count = shape[0] * shape[1]).reshape(shape)
+            ylist, xlist = np.nonzero(mask)
+            dead_pixels = pd.DataFrame(data = np.column_stack((xlist, ylist)), columns = ['x', 'y'])
 
         if writeto is not None:
             dpc = dead_pixels.copy(deep = True)
             dpc.to_csv(writeto, index = False, sep = ';')
 
         if self._plot == True:
-            plt.imshow(mask)
+            plt.imshow(self.annotations2mask(cache = cache))
             plt.show()
             plt.close()
             plt.clf()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import numpy as np
+import os, glob
+import json
+import shutil
+import hashlib
+
+import pandas as pd
+
+import pims             # https://soft-matter.github.io/pims/v0.6.1/
+import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+
+def file_hash(path):
+    """
+    sha1 of the file content, for small input files such as annotations.
+    """
+    h = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def sequence_hash(files):
+    """
+    sha1 of names, sizes and modification times of the files, for image
+    sequences that are too large to read for hashing.
+    """
+    h = hashlib.sha1()
+    for f in sorted(files):
+        st = os.stat(f)
+        h.update(f'{os.path.basename(f)};{st.st_size};{st.st_mtime_ns}\n'.encode())
+    return h.hexdigest()
+
+
+def _write_json(data, _f):
+    """
+    Write to a temporary file first, the old manifest stays valid until
+    the new one is complete.
+    """
+    _tmp = f'{_f}.{os.getpid()}.tmp'
+    with open(_tmp, 'w') as fh:
+        json.dump(data, fh, indent = 1)
+    os.replace(_tmp, _f)
+
+
+class Checkpoint:
+    """
+
+    Frame partitioned output of one pipeline stage in
+    WORKING_DIR/checkpoints/<name>.
+
+    The manifest (manifest.json) records the Metadata parameters of the
+    stage, the hashes of its input files and the keys of the upstream
+    checkpoints. Together they give the key of the checkpoint; if the key
+    of an existing checkpoint differs (parameters or inputs changed) all
+    its chunks are removed and the stage is recomputed. Chunks are written
+    one by one and recorded in the manifest, so an interrupted stage skips
+    the finished chunks on rerun.
+
+    name       : stage name, e.g. 'locate'
+    params     : list of Metadata attributes the stage depends on
+    inputs     : dict label -> hash of input files (see file_hash, sequence_hash)
+    upstream   : list of Checkpoints the stage reads
+    options    : dict of further (json serializable) arguments of the stage
+    ext        : file format of the chunks, see df_io.write_store
+
+    """
+
+    def __init__(self,
+                 name,
+                 m_metadata = None,
+                 m_metadata_file = None,
+                 params = [],
+                 inputs = {},
+                 upstream = [],
+                 options = {},
+                 ext = None,
+                 verbose = True):
+
+        # check if metadata is avail
+        try:
+            self.m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+        except:
+            raise FileNotFoundError('Metadata information not available!')
+
+        if ext is None:
+            ext = '.csv' if pmpiv.df_io.pa is None else '.parquet'
+
+        self.name    = name
+        self.ext     = ext
+        self.verbose = verbose
+        self.folder  = os.path.join(self.m_metadata.WORKING_DIR, 'checkpoints', name)
+        self._manifest_file = os.path.join(self.folder, 'manifest.json')
+
+        self.params   = {p : getattr(self.m_metadata, p) for p in params}
+        self.inputs   = dict(inputs)
+        self.upstream = {u.name : u.key for u in upstream}
+        self.options  = dict(options)
+
+        content = json.dumps([self.name, self.ext, self.params, self.inputs,
+                              self.upstream, self.options], sort_keys = True, default = str)
+        self.key = hashlib.sha1(content.encode()).hexdigest()[:16]
+
+        self._open()
+
+
+    def _open(self):
+        """
+        Read an existing manifest, start over if its key differs.
+        """
+        manifest = None
+        if os.path.isfile(self._manifest_file):
+            with open(self._manifest_file, 'r') as fh:
+                manifest = json.load(fh)
+
+        if manifest is not None and manifest['key'] == self.key:
+            self.manifest = manifest
+            if self.verbose:
+                state = 'complete' if self.is_complete else f'{len(self.manifest["chunks"])} chunks done'
+                print(f'Checkpoint {self.name}: {state}')
+            return
+
+        if manifest is not None:
+            if self.verbose:
+                print(f'Checkpoint {self.name}: parameters or inputs changed, recompute stage')
+            shutil.rmtree(self.folder)
+
+        os.makedirs(self.folder, exist_ok = True)
+        self.manifest = {'stage'    : self.name,
+                         'key'      : self.key,
+                         'params'   : self.params,
+                         'inputs'   : self.inputs,
+                         'upstream' : self.upstream,
+                         'options'  : self.options,
+                         'chunks'   : {},
+                         'complete' : False}
+        _write_json(self.manifest, self._manifest_file)
+
+
+    @property
+    def is_complete(self):
+        return self.manifest['complete']
+
+
+    def chunks(self):
+        """
+        Sorted list of the ids of the finished chunks.
+        """
+        return sorted(int(c) for c in self.manifest['chunks'])
+
+
+    def has_chunk(self, chunk):
+        return str(int(chunk)) in self.manifest['chunks']
+
+
+    def write_chunk(self, chunk, df, frames = None):
+        """
+        Write the DataFrame of chunk (int id) and record it in the manifest.
+
+        frames : (first, last) frame of the chunk, default from df
+        """
+        fn   = f'chunk_{int(chunk):06d}{self.ext}'
+        _tmp = f'tmp_{os.getpid()}_{fn}'
+
+        if frames is None:
+            frames = (int(df['frame'].min()), int(df['frame'].max())) if len(df) > 0 else (None, None)
+
+        pmpiv.df_io.write_store(df, self.folder, _tmp, verbose = False)
+        os.replace(os.path.join(self.folder, _tmp), os.path.join(self.folder, fn))
+
+        self.manifest['chunks'][str(int(chunk))] = {'file'   : fn,
+                                                    'frames' : list(frames),
+                                                    'rows'   : int(len(df))}
+        _write_json(self.manifest, self._manifest_file)
+
+
+    def write(self, df, chunk_frames = 1000):
+        """
+        Write a complete DataFrame, partitioned in chunks of chunk_frames
+        frames, and mark the checkpoint complete.
+        """
+        if len(df) > 0:
+            frames = df['frame'].to_numpy()
+            chunk  = (frames - frames.min()) // chunk_frames
+            for c, part in df.reset_index(drop = True).groupby(chunk, sort = True):
+                self.write_chunk(c, part)
+        else:
+            # keep the columns for the following stages
+            self.write_chunk(0, df)
+        self.complete()
+
+
+    def complete(self):
+        """
+        """
+        self.manifest['complete'] = True
+        _write_json(self.manifest, self._manifest_file)
+        if self.verbose:
+            print(f'Checkpoint {self.name}: complete ({sum(c["rows"] for c in self.manifest["chunks"].values())} rows)')
+
+
+    def read_chunk(self, chunk, columns = None):
+        """
+        """
+        fn = self.manifest['chunks'][str(int(chunk))]['file']
+        return pmpiv.df_io.read_store(self.folder, fn, columns = columns)
+
+
+    def read(self, columns = None, frames = None):
+        """
+        All chunks (or those overlapping the frame range (first, last)) as
+        one DataFrame with frame index.
+        """
+        parts = []
+        for c in self.chunks():
+            info = self.manifest['chunks'][str(c)]
+            if frames is not None and info['frames'][0] is not None:
+                if frames[0] is not None and info['frames'][1] < frames[0]:
+                    continue
+                if frames[1] is not None and info['frames'][0] > frames[1]:
+                    continue
+            parts.append(pmpiv.df_io.read_store(self.folder, info['file'], columns = columns, frames = frames))
+
+        if len(parts) == 0:
+            return pd.DataFrame(columns = columns if columns is not None else ['frame'])
+
+        # keep the columns if all chunks are empty
+        filled = [p for p in parts if len(p) > 0]
+        if len(filled) == 0:
+            return parts[0]
+
+        return pd.concat(filled)
@@ -17,6 +17,15 @@ import matplotlib.pyplot as plt
 
 import pandas as pd
 
+import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
 import pims             # https://soft-matter.github.io/pims/v0.6.1/
 import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
 ###--------------------------------------------------------------------------------
@@ -38,34 +47,197 @@ def _file_sanity(m_infile):
 
 
 
-def read_csv(m_folder, m_filename):
+# file extension -> storage format
+_formats = {'.csv'     : 'csv',
+            '.parquet' : 'parquet',
+            '.feather' : 'feather',
+            '.arrow'   : 'feather',
+            '.npy'     : 'npy'}
+
+
+def _format(m_filename):
+    """
+    """
+    ext = os.path.splitext(m_filename.rstrip('/'))[1]
+    # everything else is written as before
+    return _formats.get(ext.lower(), 'csv')
+
+
+def _require_pyarrow(fmt):
+    """
+    """
+    if pa is None:
+        raise ImportError(f'Format {fmt} requires pyarrow!')
+
+
+def _frame_slice(frame, frames):
+    """
+    Start and stop row of the frame range frames = (first, last) in the 
+    sorted frame column.
+    """
+    if frames is None:
+        return 0, frame.shape[0]
+    first, last = frames
+    start = 0 if first is None else int(np.searchsorted(frame, first, side = 'left'))
+    stop  = frame.shape[0] if last is None else int(np.searchsorted(frame, last, side = 'right'))
+    return start, stop
+
+
+def write_store(df, m_folder, m_filename, row_group_size = 100000, compression = 'zstd', verbose = True):
     """
+    Write a DataFrame to a columnar file, the format is given by the 
+    extension of m_filename:
+
+    .parquet         : compressed, one row group per row_group_size rows, 
+                       frame ranges are skipped by the row group statistics
+    .feather/.arrow  : Arrow IPC file, uncompressed (compression = None) 
+                       files can be memory mapped
+    .npy             : directory with one .npy file per column, uncompressed,
+                       memory mapped on read
+
+    Rows are sorted by frame (stable) so frame ranges are contiguous. The 
+    index is not stored (as in write2csv), read_store sets the frame index.
     """
 
     _folder_sanity(m_folder)
-    
+
+    outfile = os.path.join(m_folder, m_filename)
+    fmt = _format(m_filename)
+
+    df = df.reset_index(drop = True)
+    if 'frame' in df.columns:
+        df = df.sort_values('frame', kind = 'stable').reset_index(drop = True)
+
+    if fmt == 'parquet':
+        _require_pyarrow(fmt)
+        table = pa.Table.from_pandas(df, preserve_index = False)
+        pq.write_table(table, outfile, row_group_size = row_group_size, compression = compression)
+
+    elif fmt == 'feather':
+        _require_pyarrow(fmt)
+        feather.write_feather(df, outfile, compression = 'uncompressed' if compression is None else compression)
+
+    elif fmt == 'npy':
+        os.makedirs(outfile, exist_ok = True)
+        for c in df.columns:
+            np.save(os.path.join(outfile, f'{c}.npy'), df[c].to_numpy(), allow_pickle = False)
+        with open(os.path.join(outfile, 'columns.json'), 'w') as f:
+            json.dump({'columns' : [str(c) for c in df.columns], 'length' : int(len(df))}, f)
+
+    else:
+        df.to_csv(outfile, sep = ';', index = False)
+
+    if verbose:
+        print(f'DataFrame saved to file {outfile} !')
+
+
+def read_store(m_folder, m_filename, columns = None, frames = None, memory_map = False):
+    """
+    Read a DataFrame written by write_store (or write2csv).
+
+    columns    : list of columns to read, e.g. ['frame', 'particle', 'x', 'y'],
+                 default all
+    frames     : (first, last) frame range (inclusive, None for open end), 
+                 only these rows are read
+    memory_map : memory map the file (feather, npy: zero copy if possible),
+                 npy files are always memory mapped
+
+    Returns the DataFrame with frame index (if the frame column is read).
+    """
+
+    _folder_sanity(m_folder)
+
     infile = os.path.join(m_folder, m_filename)
 
     _file_sanity(infile)
 
-    df = pd.read_csv(infile, sep = ';')
-    df.set_index('frame', drop = False, append = False, inplace = True)
+    fmt = _format(m_filename)
+
+    # frame is needed to select the range
+    _columns = columns
+    if columns is not None and frames is not None and 'frame' not in columns:
+        _columns = list(columns) + ['frame']
+
+    if fmt == 'parquet':
+        _require_pyarrow(fmt)
+        filters = None
+        if frames is not None:
+            filters = []
+            if frames[0] is not None:
+                filters.append(('frame', '>=', frames[0]))
+            if frames[1] is not None:
+                filters.append(('frame', '<=', frames[1]))
+            filters = filters if filters else None
+        df = pq.read_table(infile, columns = _columns, filters = filters, 
+                           memory_map = memory_map).to_pandas()
+
+    elif fmt == 'feather':
+        _require_pyarrow(fmt)
+        table = feather.read_table(infile, columns = _columns, memory_map = memory_map)
+        if frames is not None:
+            start, stop = _frame_slice(table.column('frame').to_numpy(), frames)
+            table = table.slice(start, stop - start)
+        df = table.to_pandas()
+
+    elif fmt == 'npy':
+        with open(os.path.join(infile, 'columns.json'), 'r') as f:
+            _columns = json.load(f)['columns'] if _columns is None else _columns
+        data = {c : np.load(os.path.join(infile, f'{c}.npy'), mmap_mode = 'r') for c in _columns}
+        start, stop = _frame_slice(data['frame'], frames) if frames is not None else (0, None)
+        df = pd.DataFrame({c : data[c][start:stop] for c in _columns}, copy = not memory_map)
+
+    else:
+        df = pd.read_csv(infile, sep = ';', usecols = _columns)
+        if frames is not None:
+            first = -np.inf if frames[0] is None else frames[0]
+            last  =  np.inf if frames[1] is None else frames[1]
+            df = df.loc[(df['frame'] >= first) & (df['frame'] <= last)]
+
+    if columns is not None:
+        df = df[list(columns)]
+
+    if 'frame' in df.columns:
+        df = df.set_index('frame', drop = False, append = False)
 
     return df
 
 
-def write2csv(df, m_folder, m_filename):
+def read_csv(m_folder, m_filename, columns = None, frames = None):
     """
+    Compatibility shim: ;-separated csv as before, columnar formats 
+    (.parquet, .feather, .npy) are passed to read_store.
     """
 
+    if _format(m_filename) != 'csv':
+        return read_store(m_folder, m_filename, columns = columns, frames = frames)
+
     _folder_sanity(m_folder)
+    
+    infile = os.path.join(m_folder, m_filename)
 
-    outfile = os.path.join(m_folder, m_filename)
+    _file_sanity(infile)
 
-    df.to_csv(outfile, sep = ';', index = False)
+    if columns is None and frames is None:
+        df = pd.read_csv(infile, sep = ';')
+        df.set_index('frame', drop = False, append = False, inplace = True)
+        return df
 
-    print(f'DataFrame saved to file {outfile} !')
+    return read_store(m_folder, m_filename, columns = columns, frames = frames)
 
 
+def write2csv(df, m_folder, m_filename):
+    """
+    Compatibility shim: ;-separated csv as before, columnar formats 
+    (.parquet, .feather, .npy) are passed to write_store.
+    """
 
+    if _format(m_filename) != 'csv':
+        return write_store(df, m_folder, m_filename)
 
+    _folder_sanity(m_folder)
+
+    outfile = os.path.join(m_folder, m_filename)
+
+    df.to_csv(outfile, sep = ';', index = False)
+
+    print(f'DataFrame saved to file {outfile} !')
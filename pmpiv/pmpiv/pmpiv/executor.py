@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import numpy as np
+import os, glob
+import multiprocessing
+import functools
+
+import pandas as pd
+
+import pims             # https://soft-matter.github.io/pims/v0.6.1/
+import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+# Image sequence of the current worker process, opened once by _init_worker
+_worker_frames = None
+
+
+def open_frames(m_metadata):
+    """
+    Default opener of the executor: the frame range of the image sequence
+    as given by START_FRAME and END_FRAME (see Image_Sequence.subsection_range).
+    """
+    image_sequence = pmpiv.image_sequence.Image_Sequence(m_metadata = m_metadata)
+    image_sequence.quiet()
+    return image_sequence.subsection_range()
+
+
+def _init_worker(opener, m_metadata, frames):
+    """
+    """
+    global _worker_frames
+    if frames is not None:
+        _worker_frames = frames
+    else:
+        _worker_frames = opener(m_metadata)
+
+
+def _run(func, i):
+    """
+    """
+    return i, func(_worker_frames, i)
+
+
+def locate_frame(frames, i, **kwargs):
+    """
+    Worker function: tp.locate on frames[i], adds the column 'frame'.
+    """
+    image = frames[i]
+    features = tp.locate(image, **kwargs)
+    if hasattr(image, 'frame_no') and image.frame_no is not None:
+        features['frame'] = int(image.frame_no)
+    else:
+        features['frame'] = int(i)
+    return features
+
+
+class Frame_Executor:
+    """
+
+    Persistent process pool that applies functions to frames of an image
+    sequence.
+
+    Each worker opens the image sequence once (with opener(m_metadata), or
+    by receiving the given frames object once at startup), so only frame
+    indices are sent to the workers and only the (small) results are sent
+    back. Frames are distributed dynamically with imap_unordered in chunks
+    of chunksize frames. The pool is created on first use and reused by
+    all following calls until close().
+
+    processes : number of worker processes, default all cores. If <= 1
+                everything runs in the calling process.
+    chunksize : number of frames sent to a worker at once, default
+                n_frames / (8 * processes)
+    opener    : picklable function m_metadata -> frames, default open_frames
+    frames    : picklable image sequence (e.g. from Image_Sequence), used
+                instead of the opener
+
+    """
+
+    def __init__(self,
+                 m_metadata = None,
+                 m_metadata_file = None,
+                 processes = None,
+                 chunksize = None,
+                 opener = None,
+                 frames = None,
+                 verbose = True):
+
+        # check if metadata is avail
+        try:
+            self.m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+        except:
+            raise FileNotFoundError('Metadata information not available!')
+
+        if processes is None or processes == 'auto':
+            processes = multiprocessing.cpu_count()
+
+        self.processes = max(1, int(processes))
+        self.chunksize = chunksize
+        self.opener    = open_frames if opener is None else opener
+        self.verbose   = verbose
+
+        self._pool     = None
+        self._frames   = frames
+        self._given    = frames
+
+    def quiet(self):
+        self.verbose = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def frames(self):
+        """
+        Image sequence opened in the calling process (only used for
+        sequential execution and to get the number of frames).
+        """
+        if self._frames is None:
+            self._frames = self.opener(self.m_metadata)
+        return self._frames
+
+    def _get_pool(self):
+        """
+        """
+        if self._pool is None:
+            if self.verbose:
+                print(f'Starting pool with {self.processes} processes.')
+            self._pool = multiprocessing.Pool(self.processes,
+                                              initializer = _init_worker,
+                                              initargs = (self.opener, self.m_metadata, self._given))
+        return self._pool
+
+    def close(self):
+        """
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def imap_unordered(self, func, indices = None, chunksize = None):
+        """
+        Yields tuples (i, func(frames, i)) for all frame indices in the order
+        of completion. func must be picklable, i.e. a module level function
+        (or functools.partial of it).
+        """
+        if indices is None:
+            indices = range(len(self))
+        indices = list(indices)
+        n = len(indices)
+
+        if chunksize is None:
+            chunksize = self.chunksize
+        if chunksize is None:
+            chunksize = max(1, n // (8 * self.processes))
+
+        if self.processes <= 1:
+            results = ((i, func(self.frames, i)) for i in indices)
+        else:
+            results = self._get_pool().imap_unordered(functools.partial(_run, func),
+                                                      indices, chunksize = chunksize)
+
+        # report progress in steps of 10 %
+        step = max(1, n // 10)
+        for done, res in enumerate(results, start = 1):
+            if self.verbose and (done % step == 0 or done == n):
+                print(f'Processed {done} from {n} frames.')
+            yield res
+
+    def map(self, func, indices = None, chunksize = None):
+        """
+        Returns the list of func(frames, i) for all frame indices, ordered
+        by index.
+        """
+        collected = dict(self.imap_unordered(func, indices, chunksize))
+        return [collected[i] for i in sorted(collected)]
+
+    def locate(self, indices = None, chunksize = None, **kwargs):
+        """
+        tp.locate for all frames, returns one DataFrame with a 'frame' column.
+        Default keyword arguments from the metadata.
+        """
+        _kwargs = dict(diameter = self.m_metadata.FEATURE_SIZE,
+                       minmass = self.m_metadata.FEATURE_MIN_SIZE,
+                       invert = self.m_metadata.FEATURES_ARE_DARK)
+        _kwargs.update(kwargs)
+
+        features = self.map(functools.partial(locate_frame, **_kwargs), indices, chunksize)
+        features = [f for f in features if len(f) > 0]
+
+        if len(features) == 0:
+            return pd.DataFrame(columns = ['y', 'x', 'mass', 'size', 'ecc', 'signal', 'raw_mass', 'ep', 'frame'])
+
+        return pd.concat(features).reset_index(drop = True)
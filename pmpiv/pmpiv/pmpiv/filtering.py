@@ -82,6 +82,133 @@ class Filtering:
         return filtered_df
 
 
+def _window_any(mask, x0, x1, y0, y1):
+    """
+    True for every window [x0, x1] x [y0, y1] (inclusive, integer arrays, 
+    empty if x0 > x1 or y0 > y1) that contains a nonzero pixel of mask. Uses 
+    a summed area table, so the cost does not depend on the window size.
+    """
+    x0 = np.maximum(x0, 0)
+    y0 = np.maximum(y0, 0)
+    x1 = np.minimum(x1, mask.shape[1] - 1)
+    y1 = np.minimum(y1, mask.shape[0] - 1)
+    valid = (x0 <= x1) & (y0 <= y1)
+
+    table = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype = np.int64)
+    table[1:, 1:] = np.cumsum(np.cumsum(mask != 0, axis = 0, dtype = np.int64), axis = 1)
+
+    x0, x1, y0, y1 = x0[valid], x1[valid] + 1, y0[valid], y1[valid] + 1
+
+    hits = np.zeros(valid.shape[0], dtype = bool)
+    hits[valid] = (table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]) > 0
+
+    return hits
+
+
+def _match_mask(mask, x, y, fuzziness):
+    """
+    Labels of the annotated pixels of a (label) mask matched by every feature.
+
+    Same test as the COCO_range engine (_distributed_thresholding): a feature 
+    matches the annotated pixel column dx if |x - dx| < fuzziness and y lies 
+    within fuzziness of one of its runs of annotated pixels, i.e. it is closer 
+    than fuzziness to an annotated pixel in y or between two of them. Labels 
+    are combined with a bitwise or, so the function works for boolean masks 
+    as well as for bit-coded label masks.
+
+    mask : 2D array indexed as mask[y, x]
+    x, y : arrays of (subpixel) feature positions
+    """
+    mask = np.asarray(mask)
+    x    = np.asarray(x, dtype = float)
+    y    = np.asarray(y, dtype = float)
+
+    # pixels strictly closer than fuzziness, NaN positions match nothing
+    with np.errstate(invalid = 'ignore'):
+        finite = np.isfinite(x) & np.isfinite(y)
+        _x = np.where(finite, x, -1.0e9)
+        _y = np.where(finite, y, -1.0e9)
+        x0 = (np.floor(_x - fuzziness) + 1).astype(np.int64)
+        x1 = (np.ceil(_x + fuzziness) - 1).astype(np.int64)
+        y0 = (np.floor(_y - fuzziness) + 1).astype(np.int64)
+        y1 = (np.ceil(_y + fuzziness) - 1).astype(np.int64)
+        yf = np.floor(_y).astype(np.int64)
+
+    if mask.dtype == bool:
+        bits = [None]
+    else:
+        present = np.bitwise_or.reduce(mask, axis = None) if mask.size > 0 else 0
+        bits = [b for b in range(8 * mask.dtype.itemsize) if (int(present) >> b) & 1]
+
+    values = np.zeros(x.shape[0], dtype = mask.dtype)
+    for b in bits:
+        _m = mask if b is None else ((mask >> mask.dtype.type(b)) & 1) != 0
+        # features between two annotated pixels of a run
+        pairs = _m[:-1, :] & _m[1:, :]
+        hits  = _window_any(_m, x0, x1, y0, y1) | _window_any(pairs, x0, x1, yf, yf)
+        if b is None:
+            values |= hits
+        else:
+            values[hits] |= mask.dtype.type(1 << b)
+
+    return values
+
+
+def _lookup_mask(mask, x, y):
+    """
+    Vectorized gather of the mask value at the rounded feature positions.
+
+    mask : 2D array indexed as mask[y, x]
+    x, y : arrays of (subpixel) feature positions
+
+    Features outside of the mask extent get the value 0.
+    """
+    xi = np.floor(np.asarray(x, dtype = float) + 0.5)
+    yi = np.floor(np.asarray(y, dtype = float) + 0.5)
+
+    inside = ((xi >= 0) & (xi < mask.shape[1]) & 
+              (yi >= 0) & (yi < mask.shape[0]))
+
+    values = np.zeros(xi.shape[0], dtype = mask.dtype)
+    values[inside] = mask[yi[inside].astype(np.intp), xi[inside].astype(np.intp)]
+
+    return values
+
+
+def _label_mask(json_files, m_metadata, verbose = True):
+    """
+    Merge the annotations of several json files into one bit-coded label mask.
+
+    Bit k of a pixel is set if the pixel lies within the annotations of 
+    json_files[k], so overlapping annotations of different files are kept.
+    """
+    n_files = len(json_files)
+
+    if n_files == 0:
+        raise ValueError('List of json files must not be empty!')
+
+    if   n_files <= 8:  dtype = np.uint8
+    elif n_files <= 16: dtype = np.uint16
+    elif n_files <= 32: dtype = np.uint32
+    elif n_files <= 64: dtype = np.uint64
+    else:
+        raise ValueError('At most 64 json files can be combined in one label mask.')
+
+    labels = None
+    for k in range(n_files):
+        ann_handler = pmpiv.annotations.Annotation_Handler(json_files[k], m_metadata = m_metadata, verbose = verbose)
+        mask = ann_handler.annotations2mask()
+
+        if labels is None:
+            labels = np.zeros(mask.shape, dtype = dtype)
+        elif mask.shape != labels.shape:
+            raise ValueError(f'Annotation image size of {json_files[k]} does not match {json_files[0]}!')
+
+        labels |= (mask != 0).astype(dtype) << dtype(k)
+
+    return labels
+
+
 class Annotation_Filtering:
     """
     """
@@ -212,11 +339,62 @@ class Annotation_Filtering:
         return f_df
 
 
-    def _check_filter_df(self, filter_df):
+    def _mask_threshold_handler(self, m_type = None, mask = None):
+
+        """
+
+        Private function handling the removal or extraction of features 
+        based on a rasterized annotation mask (see 
+        Annotation_Handler.annotations2mask). Every feature is classified 
+        with the fuzziness test of the range engine by a summed area table 
+        lookup (see _match_mask). No multiprocessing needed.
+
+        """
+
+        # Sanity check
+
+        if m_type is None:
+            raise ValueError('m_type must not be None!')
+        if m_type not in ['remove', 'extract']:
+            raise ValueError('m_type must be in [remove, extract]!')
+
+        hits = _match_mask(np.asarray(mask) != 0, self.init_df['x'].to_numpy(), self.init_df['y'].to_numpy(), self.fuzziness)
+
+        if m_type == 'extract':
+            f_df = self.init_df[hits].copy(deep = True)
+        elif m_type == 'remove':
+            f_df = self.init_df[~hits].copy(deep = True)
+
+        print(f'Filtering removed {len(self.init_df.index) - len(f_df.index)} from {len(self.init_df.index)} tracks.')
+
+        # put frame number as index again
+        if 'frame' in f_df.columns:
+            f_df.index = f_df['frame']
+
+        return f_df
+
+
+    def classify(self, label_mask):
         """
+        Returns the label of every feature of the initial DF as an array 
+        (matched with the fuzziness, see _match_mask), see _label_mask for 
+        bit-coded labels of several files.
         """
 
-        if ('x' not in filter_df.columns) or ('y' not in filter_df.columns):
+        if np.ndim(label_mask) != 2:
+            raise ValueError('Label mask must be a 2D array!')
+
+        return _match_mask(np.asarray(label_mask), self.init_df['x'].to_numpy(), self.init_df['y'].to_numpy(), self.fuzziness)
+
+
+    def _check_filter_df(self, filter_df, json_type = 'COCO_range'):
+        """
+        """
+
+        if json_type == 'COCO_mask':
+            if np.ndim(filter_df) != 2:
+                raise ValueError('Mask for json_type COCO_mask must be a 2D array!')
+        elif ('x' not in filter_df.columns) or ('y' not in filter_df.columns):
             raise ValueError('Index missing extraction DF!')
 
     #---------------------------------------------------------------------------------------------
@@ -225,19 +403,24 @@ class Annotation_Filtering:
 
     def remove(self, filter_df, json_type = 'COCO_range'):
         """
+        filter_df : DataFrame from Annotation_Handler.annotations2DF or, for 
+                    json_type COCO_mask, the array from 
+                    Annotation_Handler.annotations2mask
         """
 
-        self._check_filter_df(filter_df = filter_df)
-
-        if json_type not in ['COCO_range', 'COCO']:
-            raise ValueError('json_type must be in [COCO_range, COCO]')
+        if json_type not in ['COCO_range', 'COCO', 'COCO_mask']:
+            raise ValueError('json_type must be in [COCO_range, COCO, COCO_mask]')
         elif json_type == 'COCO':
             print('json_type is COCO. Be aware that this is super slow!')
 
+        self._check_filter_df(filter_df = filter_df, json_type = json_type)
+
         if json_type == 'COCO':
             my_df = self._premove()
         elif json_type == 'COCO_range':
             my_df = self._df_threshold_handler(m_type = 'remove', filter_df = filter_df)
+        elif json_type == 'COCO_mask':
+            my_df = self._mask_threshold_handler(m_type = 'remove', mask = filter_df)
 
         return my_df
 
@@ -246,45 +429,130 @@ class Annotation_Filtering:
     #---------------------------------------------------------------------------------------------
 
     def extract(self, filter_df, json_type = 'COCO_range'):
+        """
+        filter_df : DataFrame from Annotation_Handler.annotations2DF or, for 
+                    json_type COCO_mask, the array from 
+                    Annotation_Handler.annotations2mask
+        """
 
-        self._check_filter_df(filter_df = filter_df)
+        if json_type not in ['COCO_range', 'COCO_mask']:
+            raise ValueError('json_type must be in [COCO_range, COCO_mask]')
 
-        if json_type not in ['COCO_range']:
-            raise ValueError('json_type must be in [COCO_range]')
+        self._check_filter_df(filter_df = filter_df, json_type = json_type)
 
         if json_type == 'COCO_range':
             my_df = self._df_threshold_handler(m_type = 'extract', filter_df = filter_df)
+        elif json_type == 'COCO_mask':
+            my_df = self._mask_threshold_handler(m_type = 'extract', mask = filter_df)
 
         return my_df
 
     #---------------------------------------------------------------------------------------------
 
 
-def complete_removal(init_df, m_metadata = None, m_metadata_file = None, verbose = True, fuzziness = 0.5, save = True):
+def _combined_removal(init_df, m_metadata, verbose = True, fuzziness = 0.5, extraction = True):
     """
+    Single pass removal/extraction for all REMOVAL and EXTRACTION json files.
+
+    All files are merged into one bit-coded label mask and every feature is 
+    classified by one lookup. Features within any REMOVAL annotation are 
+    removed. If extraction and EXTRACTION files are given, only features 
+    within at least one of the EXTRACTION annotations are kept.
+
+    Returns the filtered DF and a dict with the number of features hit by 
+    each json file.
     """
+    extraction_files = list(m_metadata.EXTRACTION) if extraction else []
+    json_files = list(m_metadata.REMOVAL) + extraction_files
+    n_removal  = len(m_metadata.REMOVAL)
+
+    if len(json_files) == 0:
+        return init_df.copy( deep = True ), {}
+
+    labels = _label_mask([f'{m_metadata.JSON_PATH}/{f}' for f in json_files], m_metadata, verbose = verbose)
+
+    ann_filter = Annotation_Filtering(init_df, 
+                                      m_metadata = m_metadata, 
+                                      fuzziness = fuzziness, 
+                                      verbose = verbose, 
+                                      save = False)
+    feature_labels = ann_filter.classify(labels)
+
+    hits = {}
+    for k in range(len(json_files)):
+        hits[json_files[k]] = int(np.count_nonzero((feature_labels >> labels.dtype.type(k)) & 1))
+
+    removal_bits    = labels.dtype.type((1 << n_removal) - 1)
+    extraction_bits = labels.dtype.type(((1 << len(json_files)) - 1) ^ ((1 << n_removal) - 1))
+
+    keep = (feature_labels & removal_bits) == 0
+    if len(extraction_files) > 0:
+        keep &= (feature_labels & extraction_bits) != 0
+
+    my_df = init_df[keep].copy( deep = True )
+
+    if verbose:
+        for k in range(len(json_files)):
+            _t = 'REMOVAL' if k < n_removal else 'EXTRACTION'
+            print(f'{_t} {m_metadata.JSON_PATH}/{json_files[k]}: {hits[json_files[k]]} features hit.')
+    print(f'Filtering removed {len(init_df.index) - len(my_df.index)} from {len(init_df.index)} tracks.')
+
+    return my_df, hits
+
+
+def complete_removal(init_df, m_metadata = None, m_metadata_file = None, verbose = True, fuzziness = 0.5, save = True, json_type = 'COCO_mask', combined = False, extraction = True, return_hits = False, fn = 'df_complete_removal.csv'):
+    """
+    Remove all features within the annotations of the REMOVAL json files.
+
+    json_type   : 'COCO_mask' (default) classifies features by a lookup in the 
+                  rasterized annotations, 'COCO_range' uses the (slow) parallel 
+                  range comparison.
+    combined    : if True, merge all REMOVAL and EXTRACTION json files into one 
+                  label mask and filter in a single pass (requires COCO_mask). 
+                  Features in REMOVAL annotations are removed and, if EXTRACTION 
+                  files are given, only features in EXTRACTION annotations are kept.
+    extraction  : only for combined, if False the EXTRACTION files are ignored 
+                  and only the REMOVAL annotations are applied.
+    return_hits : if True, also return a dict with the number of features hit 
+                  by each json file (only for combined mode, else empty).
+    fn          : file name in WORKING_DIR if save, the extension selects the 
+                  format (see df_io.write_store, e.g. .parquet)
+    """
+
+    if json_type not in ['COCO_range', 'COCO_mask']:
+        raise ValueError('json_type must be in [COCO_range, COCO_mask]')
+
+    if combined and json_type != 'COCO_mask':
+        raise ValueError('Combined filtering requires json_type COCO_mask!')
 
     try:
         m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
     except:
         raise FileNotFoundError('Metadata information not available!')
 
-    my_df = init_df.copy( deep = True )
-    for s in range(len(m_metadata.REMOVAL)):
-        if verbose:
-            print(f'\n### Remove all annotations given in {m_metadata.JSON_PATH}/{m_metadata.REMOVAL[s]}')
-        selection_ann_handler = pmpiv.annotations.Annotation_Handler(f'{m_metadata.JSON_PATH}/{m_metadata.REMOVAL[s]}', m_metadata = m_metadata)
-        filter_selection_df   = selection_ann_handler.annotations2DF()
-        removal_ann_filter    = pmpiv.filtering.Annotation_Filtering(my_df.copy(deep = True), 
-                                                                     m_metadata = m_metadata, 
-                                                                     m_metadata_file = m_metadata_file,
-                                                                     fuzziness = fuzziness,
-                                                                     verbose = verbose,
-                                                                     save = save )
-        my_df                 = removal_ann_filter.remove( filter_df = filter_selection_df )
+    hits = {}
+
+    if combined:
+        my_df, hits = _combined_removal(init_df, m_metadata, verbose = verbose, fuzziness = fuzziness, extraction = extraction)
+    else:
+        my_df = init_df.copy( deep = True )
+        for s in range(len(m_metadata.REMOVAL)):
+            if verbose:
+                print(f'\n### Remove all annotations given in {m_metadata.JSON_PATH}/{m_metadata.REMOVAL[s]}')
+            selection_ann_handler = pmpiv.annotations.Annotation_Handler(f'{m_metadata.JSON_PATH}/{m_metadata.REMOVAL[s]}', m_metadata = m_metadata)
+            if json_type == 'COCO_mask':
+                filter_selection_df = selection_ann_handler.annotations2mask()
+            else:
+                filter_selection_df = selection_ann_handler.annotations2DF()
+            removal_ann_filter    = pmpiv.filtering.Annotation_Filtering(my_df.copy(deep = True), 
+                                                                         m_metadata = m_metadata, 
+                                                                         m_metadata_file = m_metadata_file,
+                                                                         fuzziness = fuzziness,
+                                                                         verbose = verbose,
+                                                                         save = save )
+            my_df                 = removal_ann_filter.remove( filter_df = filter_selection_df, json_type = json_type )
 
     if save:
-        fn = 'df_complete_removal.csv'
         _f = os.path.join(m_metadata.WORKING_DIR, fn)
         
         # Remove file if existing
@@ -293,6 +561,9 @@ def complete_removal(init_df, m_metadata = None, m_metadata_file = None, verbose
 
         pmpiv.df_io.write2csv( my_df.copy( deep = True ), m_metadata.WORKING_DIR, fn )
 
+    if return_hits:
+        return my_df, hits
+
     return my_df
 
 
@@ -18,6 +18,7 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import multiprocessing
 import collections
+import functools
 import json
 
 import pims             # https://soft-matter.github.io/pims/v0.6.1/
@@ -77,6 +78,261 @@ class Frame_Statistics:
         plt.clf()
         
 
+def _frame_statistics(frames, i, parameters, **kwargs):
+    """
+    Worker function: Feature_Statistics of the features located in frames[i].
+    """
+    acc = Feature_Statistics(parameters)
+    acc.add(tp.locate(frames[i], **kwargs))
+    return acc
+
+
+class Running_Moments:
+    """
+
+    Streaming mean, standard deviation, min and max (Welford/Chan update). 
+    Instances computed on parts of a sequence can be merged.
+
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean  = 0.
+        self.m2    = 0.
+        self.min   = np.inf
+        self.max   = -np.inf
+
+    def _combine(self, count, mean, m2, vmin, vmax):
+        """
+        """
+        if count == 0:
+            return
+
+        n     = self.count + count
+        delta = mean - self.mean
+
+        self.mean  += delta * count / n
+        self.m2    += m2 + delta * delta * self.count * count / n
+        self.count  = n
+        self.min    = min(self.min, vmin)
+        self.max    = max(self.max, vmax)
+
+    def add(self, values):
+        """
+        """
+        values = np.asarray(values, dtype = float)
+        values = values[np.isfinite(values)]
+
+        if values.shape[0] == 0:
+            return
+
+        mean = np.mean(values)
+        self._combine(values.shape[0], mean, np.sum((values - mean)**2), 
+                      np.min(values), np.max(values))
+
+    def merge(self, other):
+        """
+        """
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    @property
+    def std(self):
+        if self.count == 0:
+            return np.nan
+        return np.sqrt(self.m2 / self.count)
+
+
+class Quantile_Sketch:
+    """
+
+    Mergeable quantile sketch with bounded relative error. 
+
+    Values are counted in logarithmically spaced bins, such that every 
+    returned quantile is within rel_accuracy (relative) of a true sample 
+    value of that rank. Memory grows with log(max/min) only, not with 
+    the number of values. Sketches of parts of a sequence can be merged.
+
+    """
+
+    def __init__(self, rel_accuracy = 0.005):
+        self.rel_accuracy = rel_accuracy
+        self.gamma        = (1. + rel_accuracy) / (1. - rel_accuracy)
+        self._log_gamma   = np.log(self.gamma)
+
+        self.count      = 0
+        self.zero_count = 0
+        self.pos_bins   = collections.Counter()
+        self.neg_bins   = collections.Counter()
+
+    def _add_bins(self, bins, values):
+        """
+        """
+        keys, counts = np.unique(np.ceil(np.log(values) / self._log_gamma).astype(np.int64), 
+                                 return_counts = True)
+        bins.update(dict(zip(keys.tolist(), counts.tolist())))
+
+    def add(self, values):
+        """
+        """
+        values = np.asarray(values, dtype = float)
+        values = values[np.isfinite(values)]
+
+        pos = values[values > 0]
+        neg = values[values < 0]
+
+        if pos.shape[0] > 0:
+            self._add_bins(self.pos_bins, pos)
+        if neg.shape[0] > 0:
+            self._add_bins(self.neg_bins, -neg)
+
+        self.zero_count += values.shape[0] - pos.shape[0] - neg.shape[0]
+        self.count      += values.shape[0]
+
+    def merge(self, other):
+        """
+        """
+        if other.gamma != self.gamma:
+            raise ValueError('Only sketches with the same accuracy can be merged!')
+
+        self.pos_bins.update(other.pos_bins)
+        self.neg_bins.update(other.neg_bins)
+        self.zero_count += other.zero_count
+        self.count      += other.count
+
+    def _value(self, key):
+        """
+        Representative value of the bin (gamma^(key-1), gamma^key].
+        """
+        return 2. * self.gamma**key / (self.gamma + 1.)
+
+    def percentile(self, q):
+        """
+        q : percentile in [0, 100], see np.percentile
+        """
+        if self.count == 0:
+            return np.nan
+
+        rank = int(np.floor(q / 100. * (self.count - 1)))
+
+        # ascending order: negative bins (largest magnitude first), zeros, positive bins
+        seen = 0
+        for key in sorted(self.neg_bins, reverse = True):
+            seen += self.neg_bins[key]
+            if seen > rank:
+                return -self._value(key)
+
+        seen += self.zero_count
+        if seen > rank:
+            return 0.
+
+        for key in sorted(self.pos_bins):
+            seen += self.pos_bins[key]
+            if seen > rank:
+                return self._value(key)
+
+        return self._value(max(self.pos_bins))
+
+
+class Feature_Statistics:
+    """
+
+    Accumulate statistics of located features (DataFrames of tp.locate) 
+    frame by frame. Accumulators of parts of a sequence can be merged, 
+    the results are statistics of all features of the sequence.
+
+    """
+
+    def __init__(self, parameters = ['mass', 'size', 'ecc'], rel_accuracy = 0.005):
+        self.parameters = list(parameters)
+        self.n_frames   = 0
+        self.moments    = {p : Running_Moments() for p in self.parameters}
+        self.sketches   = {p : Quantile_Sketch(rel_accuracy) for p in self.parameters}
+
+    def add(self, features):
+        """
+        """
+        for p in self.parameters:
+            values = features[p].to_numpy()
+            self.moments[p].add(values)
+            self.sketches[p].add(values)
+
+        self.n_frames += 1
+
+    def merge(self, other):
+        """
+        """
+        for p in self.parameters:
+            self.moments[p].merge(other.moments[p])
+            self.sketches[p].merge(other.sketches[p])
+
+        self.n_frames += other.n_frames
+
+    def get(self, methods):
+        """
+        Returns a dict with keys f'{method}_{parameter}'. Methods are mean, 
+        max, min, std and percentileXX.
+        """
+        stats = {}
+
+        for m in methods:
+            for p in self.parameters:
+                if m == 'mean':
+                    v = self.moments[p].mean if self.moments[p].count > 0 else np.nan
+                elif m == 'max':
+                    v = self.moments[p].max
+                elif m == 'min':
+                    v = self.moments[p].min
+                elif m == 'std':
+                    v = self.moments[p].std
+                elif m.startswith('percentile'):
+                    v = self.sketches[p].percentile(float(m.replace('percentile', '')))
+                else:
+                    raise ValueError(f'Unknown statistics method {m}!')
+
+                stats[f'{m}_{p}'] = float(v)
+
+        return stats
+
+
+# Method of the statistics in seq_stats.json: moments and sketch quantiles 
+# (Quantile_Sketch) of all features of the sequence. Files written with 
+# another method (or without, percentiles of the per-frame percentiles) are 
+# recomputed.
+STATS_METHOD = 'quantile_sketch'
+
+
+def write_stats(fn, stats, verbose = True):
+    """
+    Write the sequence statistics to fn (json) with their STATS_METHOD.
+    """
+    with open( fn, 'w' ) as f:
+        if verbose:
+            print(f'Writing statistics to {fn}')
+        json.dump(dict(stats, method = STATS_METHOD), f)
+
+
+def read_stats(fn, verbose = True):
+    """
+    Sequence statistics from fn (json), None if the file does not exist or 
+    was not written with STATS_METHOD.
+    """
+    if not os.path.isfile( fn ):
+        return None
+
+    with open( fn, 'r' ) as f:
+        _s = dict(json.load(f))
+
+    if _s.pop('method', None) != STATS_METHOD:
+        if verbose:
+            print(f'Statistics in {fn} were computed with another method, recompute')
+        return None
+
+    if verbose:
+        print(f'Read statistics from {fn}')
+
+    return _s
+
+
 class Sequence_Statistics:
     """
     
@@ -88,8 +344,14 @@ class Sequence_Statistics:
                        m_metadata = None, 
                        m_metadata_file = None,
                        verbose = True,
-                       parallel = True): 
+                       parallel = True,
+                       executor = None,
+                       processes = None): 
         """
+        executor  : executor.Frame_Executor to use for the parallel computation. 
+                    Its frames must be the same as frames. If None, a pool with 
+                    processes workers is started for each computation.
+        processes : number of processes if no executor is given, default all cores
         """
 
         # check if metadata is avail
@@ -105,7 +367,10 @@ class Sequence_Statistics:
         self.verbose           = verbose
 
         self.parallel          = parallel
+        self.executor          = executor
+        self.processes         = processes
         self.computed          = False
+        self._acc              = None
 
         self.methods = [
                       'mean', 
@@ -126,86 +391,27 @@ class Sequence_Statistics:
                         'mass', 'size', 'ecc'
                      ]
 
-    # wrapper 
-    def mean(self, a):
-        return np.mean(a)
-
-    def max(self, a):
-        return np.max(a)
-
-    def min(self, a):
-        return np.min(a)
-
-    def std(self, a):
-        return np.std(a)
-
-    def percentile3(self, a):
-        return np.percentile(a, 3.)
-
-    def percentile97(self, a):
-        return np.percentile(a, 97.)
-
-    def percentile5(self, a):
-        return np.percentile(a, 5.)
-
-    def percentile95(self, a):
-        return np.percentile(a, 95.)
-
-    def percentile10(self, a):
-        return np.percentile(a, 10.)
-
-    def percentile90(self, a):
-        return np.percentile(a, 90.)
-
-    def percentile15(self, a):
-        return np.percentile(a, 15.)
-
-    def percentile85(self, a):
-        return np.percentile(a, 85.)
-
-    # end wrappers
-
     def quiet(self):
         self.verbose = False
 
     def get(self, force_recompute = False):
         """
+        Statistics from WORKING_DIR/seq_stats.json, computed and written if 
+        the file does not exist, was computed with another method (see 
+        STATS_METHOD) or force_recompute.
         """
 
         _f = os.path.join(self.m_metadata.WORKING_DIR, 'seq_stats.json')
-        
-        if not force_recompute:
-            if os.path.isfile( _f ):
-                with open( _f, 'r' ) as f:
-                    if self.verbose:
-                        print(f'Read statistics from {_f}')
-                    _s = dict(json.load(f))
-            else:
-                if self.parallel:
-                    _s = self.pget()
-                else:
-                    _s = self.sget()
-
-                with open( _f, 'w' ) as f:
-                    if self.verbose:
-                        print(f'Writing statistics to {_f}')
-                    json.dump(_s, f)
 
-        else:
-            # remove the stats file if existing
-            if os.path.isfile( _f ):
-                os.remove( _f )
+        _s = None if force_recompute else read_stats(_f, verbose = self.verbose)
 
+        if _s is None:
             if self.parallel:
                 _s = self.pget()
             else:
                 _s = self.sget()
 
-            # fresh dump
-            with open( _f, 'w' ) as f:
-                if self.verbose:
-                    print(f'Writing statistics to {_f}')
-                json.dump(_s, f)
+            write_stats(_f, _s, verbose = self.verbose)
 
         return _s
 
@@ -217,13 +423,7 @@ class Sequence_Statistics:
         """
         self.n_frames = len(self.frames)
 
-        sq_data = {}
-        self.sq_stats = {} 
-
-        # initalize 
-        for m in self.methods:
-            for p in self.parameters:
-                sq_data[f'{m}_{p}'] = []
+        acc = Feature_Statistics(self.parameters)
 
         for i in range(self.n_frames):
             if self.verbose:
@@ -231,86 +431,82 @@ class Sequence_Statistics:
             f = tp.locate(self.frames[i], self.feature_size, 
                           invert = self.features_are_dark, 
                           minmass = self.min_feature_size)
-            for m in self.methods:
-                for p in self.parameters:
-                    m_method = getattr(self, m)
-                    sq_data[f'{m}_{p}'].append(m_method(f[p]))
+            acc.add(f)
 
-        for m in self.methods:
-            for p in self.parameters:
-                m_method = getattr(self, m)
-                self.sq_stats[f'{m}_{p}'] = m_method(sq_data[f'{m}_{p}'])
+        self._acc     = acc
+        self.sq_stats = acc.get(self.methods)
 
         self.computed = True
         return self.sq_stats
 
-
-    def _get(self, myframes):
-        """
-        """
-
-        self.sq_data = {}
-
-        # initalize 
-        for m in self.methods:
-            for p in self.parameters:
-                self.sq_data[f'{m}_{p}'] = []
-        for frame_i in myframes: 
-            if self.verbose:
-                print(f'PID {os.getpid()} is computing frame statistics: frame {frame_i} from {self.n_frames}')
-            f = tp.locate(self.frames[frame_i], self.feature_size, 
-                              invert = self.features_are_dark, 
-                              minmass = self.min_feature_size)
-            for m in self.methods:
-                for p in self.parameters:
-                    m_method = getattr(self, m)
-                    self.sq_data[f'{m}_{p}'].append(m_method(f[p]))
-
-        return self.sq_data
-
     
     def pget(self):
         """
         parallel computation 
         """
         self.n_frames = len(self.frames)
-        self.sq_stats = {} 
-
-        _keys = []
-        for m in self.methods:
-            for p in self.parameters:
-                _keys.append(f'{m}_{p}')
 
-        framelist = np.arange(self.n_frames)
-
-        ncpus = int(0.5 * multiprocessing.cpu_count())
-
-        framelist = list(np.array_split(framelist, ncpus))
-        for i in range(len(framelist)): framelist[i] = list(framelist[i])
-
-        pool = multiprocessing.Pool(ncpus)
-        collected = pool.map(self._get, framelist)
+        if self.executor is None:
+            executor = pmpiv.executor.Frame_Executor(m_metadata = self.m_metadata, 
+                                                     frames = self.frames, 
+                                                     processes = self.processes, 
+                                                     verbose = self.verbose)
+        else:
+            executor = self.executor
 
-        # Merge dicts
-        coll_sq_data = {}
-        for k in _keys:
-            coll_sq_data[k] = np.concatenate(list(dd[k] for dd in collected))
+        _frame_stats = functools.partial(_frame_statistics, 
+                                         parameters = self.parameters,
+                                         diameter = self.feature_size, 
+                                         invert = self.features_are_dark, 
+                                         minmass = self.min_feature_size)
 
-        for m in self.methods:
-            for p in self.parameters:
-                m_method = getattr(self, m)
-                self.sq_stats[f'{m}_{p}'] = m_method(coll_sq_data[f'{m}_{p}'])
+        # Merge accumulators of all frames
+        acc = Feature_Statistics(self.parameters)
+        try:
+            for i, c in executor.imap_unordered(_frame_stats, range(self.n_frames)):
+                acc.merge(c)
+        finally:
+            if self.executor is None:
+                executor.close()
 
-        pool.close()
-        pool.join()
+        self._acc     = acc
+        self.sq_stats = acc.get(self.methods)
 
         self.computed = True
         
         return self.sq_stats
 
 
+    def histogram(self, parameter, save = True, bins = 50):
+        """
+        Histogram of a feature parameter of all frames of the sequence.
+        Uses the accumulated statistics of get(force_recompute = True), 
+        sget() or pget(), which are computed if not available.
+        """
+        if self._acc is None:
+            if self.parallel:
+                self.pget()
+            else:
+                self.sget()
 
+        parameter = str(parameter)
+        sketch    = self._acc.sketches[parameter]
 
+        # values of the sketch bins and their counts as weights
+        values = ([-sketch._value(k) for k in sorted(sketch.neg_bins, reverse = True)] + [0.] + 
+                  [ sketch._value(k) for k in sorted(sketch.pos_bins)])
+        counts = ([sketch.neg_bins[k] for k in sorted(sketch.neg_bins, reverse = True)] + [sketch.zero_count] + 
+                  [sketch.pos_bins[k] for k in sorted(sketch.pos_bins)])
 
-
-
+        fig, ax = plt.subplots()
+        ax.hist(values, bins = bins, weights = counts)
+        ax.set(xlabel = parameter, ylabel='count [ # ]')
+        
+        if save:
+            plt.savefig(f'{self.m_metadata.WORKING_DIR}/seq_hist_{parameter}.pdf')
+            plt.savefig(f'{self.m_metadata.WORKING_DIR}/seq_hist_{parameter}.png')
+        else:
+            plt.show()
+        
+        plt.close()
+        plt.clf()
@@ -48,13 +48,90 @@ class Image_Sequence:
 
         self.verbose = True
         self._plot_parallel = False
+        self._plot_backend  = 'matplotlib'
+
+        # frame cache, see reader.Frame_Cache, off unless cache() is called
+        self._cache_bytes = 0
+        self._read_ahead  = 0
+        self._cache       = None
+
+    def __del__(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
     def quiet(self):
         self.verbose = False
 
+    def cache(self, max_bytes = 2**30, read_ahead = 8):
+        """
+        Keep up to max_bytes of decoded frames in memory (LRU) and decode the
+        next read_ahead frames in the background during sequential access.
+        Repeated passes over the sequence then read from memory. Off by
+        default; a sequence that was already read is read again.
+        """
+        self._cache_bytes = int(max_bytes)
+        self._read_ahead  = int(read_ahead)
+        self.close()
+
+    def no_cache(self):
+        """
+        Plain pims.ImageSequence, every access decodes the file (default).
+        """
+        self._cache_bytes = 0
+        self._read_ahead  = 0
+        self.close()
+
+    def close(self):
+        """
+        Release the frame cache and stop its read-ahead threads. The next
+        access reads the sequence again.
+        """
+        cache = getattr(self, '_cache', None)
+        if cache is not None:
+            cache.close()
+            cache.clear()
+            self._cache = None
+        self._is_read = False
+
+    def cache_info(self):
+        """
+        Counters of the frame cache (hits, misses, decoded, decode_seconds, 
+        ...), None without cache.
+        """
+        if not self._is_read or not hasattr(self.image_sequence, 'cache_info'):
+            return None
+        return self.image_sequence.cache_info()
+
     def plot_parallel(self):
         self._plot_parallel = True
 
+    def plot_backend(self, backend):
+        """
+        Backend of the plot_annotated_* methods:
+        'matplotlib' : one figure per frame with tp.annotate (default)
+        'raster'     : markers drawn directly into the image arrays and 
+                       written by a thread pool (render.Overlay_Renderer), 
+                       much faster, dpi is ignored
+        """
+        if backend not in ['matplotlib', 'raster']:
+            raise ValueError('backend must be in [matplotlib, raster]!')
+        self._plot_backend = backend
+
+    def _raster_output(self, dfs, outfolder, colors, ext):
+        """
+        """
+        if self._is_read is False:
+            self._read()
+
+        renderer = pmpiv.render.Overlay_Renderer(dfs, colors = colors, m_metadata = self.m_metadata)
+        pmpiv.render.write_annotated(self.image_sequence, renderer, outfolder, 
+                                     ext = ext, verbose = self.verbose)
+
     def __info(self):
         """
         Shall be private.
@@ -67,11 +144,25 @@ class Image_Sequence:
     def _read(self):
         """
         """
+        # a replaced sequence releases its cache
+        self.close()
+
         # Read image sequence
-        self.image_sequence = pims.ImageSequence(f'{self.folder}/*{self.ftype}')
-        
+        if pmpiv.stack.is_stack(self.folder):
+            # memory mapped frame stack, see stack.pack_sequence
+            self.image_sequence = pmpiv.stack.Frame_Stack(self.folder)
+        else:
+            self.image_sequence = pims.ImageSequence(f'{self.folder}/*{self.ftype}')
+            if self._cache_bytes > 0:
+                cache = pmpiv.reader.Frame_Cache(self.image_sequence, 
+                                                 max_bytes = self._cache_bytes,
+                                                 read_ahead = self._read_ahead)
+                self.image_sequence = pmpiv.reader.Cached_Sequence(cache)
+                self._cache = cache
+
         self._is_read = True
-        self.__info()
+        if self.verbose:
+            self.__info()
 
     def read(self):
         """
@@ -348,10 +439,40 @@ class Image_Sequence:
 
 
 
-    def plot_annotated_pngs(self, df_annotations, outfolder, color = 'red', dpi = 100):
+    def export_annotated(self, df_annotations, fn, color = 'red', df_annotations_mod = None, 
+                         colors = ['red', 'blue'], tail = 0, fps = None):
+        """
+        Stream all annotated frames into one video (.mp4, .avi) or multipage 
+        tiff (.tif) instead of one file per frame (see render.export_annotated).
+
+        df_annotations_mod : if given, red/blue comparison side by side as in 
+                             plot_compare_annotated_tiffs
+        tail               : draw trajectory tails of the last tail frames
+        fps                : frame rate of the video, default FPS / RATE
+        """
+        if self._is_read is False:
+            self._read()
+
+        if df_annotations_mod is None:
+            dfs, colors = [df_annotations], [color]
+        else:
+            dfs = [df_annotations, df_annotations_mod]
+
+        if fps is None:
+            fps = self.m_metadata.FPS / self.m_metadata.RATE
+
+        renderer = pmpiv.render.Overlay_Renderer(dfs, colors = colors, tail = tail, m_metadata = self.m_metadata)
+        pmpiv.render.export_annotated(self.image_sequence, renderer, fn, fps = fps, verbose = self.verbose)
+
+
+    def plot_annotated_pngs(self, df_annotations, outfolder, color = 'red', dpi = 100, backend = None):
         """
+        backend : see plot_backend(), default as set there
         """
-        if self._plot_parallel:
+        backend = self._plot_backend if backend is None else backend
+        if backend == 'raster':
+            self._raster_output([df_annotations], outfolder, [color], 'png')
+        elif self._plot_parallel:
             warnings.warn('Parallel png dump not implemented, using sequential dump.', UserWarning)
             self._output_annotated_pngs(df_annotations, outfolder, color = color, dpi = 100)
         else:
@@ -359,22 +480,30 @@ class Image_Sequence:
 
 
 
-    def plot_annotated_tiffs(self, df_annotations, outfolder, color = 'red', dpi = 100):
+    def plot_annotated_tiffs(self, df_annotations, outfolder, color = 'red', dpi = 100, backend = None):
         """
+        backend : see plot_backend(), default as set there
         """
 
-        if self._plot_parallel:
+        backend = self._plot_backend if backend is None else backend
+        if backend == 'raster':
+            self._raster_output([df_annotations], outfolder, [color], 'tif')
+        elif self._plot_parallel:
             self._parallel_output_annotated_tiffs(df_annotations, outfolder, 
                                                   color = color, dpi = dpi)
         else:
             self._output_annotated_tiffs(df_annotations, outfolder, 
                                                   color = color, dpi = dpi)
 
-    def plot_compare_annotated_tiffs(self, df_annotations, df_annotations_mod, outfolder, colors = ['red', 'blue'], dpi = 100):
+    def plot_compare_annotated_tiffs(self, df_annotations, df_annotations_mod, outfolder, colors = ['red', 'blue'], dpi = 100, backend = None):
         """
+        backend : see plot_backend(), default as set there
         """
         
-        if self._plot_parallel:
+        backend = self._plot_backend if backend is None else backend
+        if backend == 'raster':
+            self._raster_output([df_annotations, df_annotations_mod], outfolder, colors, 'tif')
+        elif self._plot_parallel:
             self._parallel_output_compare_annotated_tiffs(df_annotations, df_annotations_mod, 
                                                           outfolder, colors = colors, dpi = dpi)
         else:
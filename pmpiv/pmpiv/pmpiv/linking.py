@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import numpy as np
+import os, glob
+import json
+import multiprocessing
+
+import pandas as pd
+
+import pims             # https://soft-matter.github.io/pims/v0.6.1/
+import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+
+def _link_patch(task):
+    """
+    Worker function: tp.link on the rows of one patch.
+
+    task : (rows, frame, x, y, search_range, memory, diagnostics, kwargs)
+
+    Returns the rows and their particle ids in the same order, and the
+    records of tp.linking.LinkDiagnostics (None without diagnostics).
+    """
+    rows, frame, x, y, search_range, memory, diagnostics, kwargs = task
+    diag = tp.linking.LinkDiagnostics() if diagnostics else None
+    df = pd.DataFrame({'x' : x, 'y' : y, 'frame' : frame, '_row' : rows})
+    df = tp.link(df, search_range, memory = memory, diagnostics = diag, **kwargs)
+    return df['_row'].to_numpy(), df['particle'].to_numpy(), (diag.records if diag is not None else None)
+
+
+def _successors(rows, particles, level, stop):
+    """
+    Next row of the same trajectory for all rows (-1 if there is none before
+    level stop). rows must be sorted by level.
+    """
+    order = np.lexsort((level[rows], particles))
+    succ  = np.full(rows.shape[0], -1, dtype = np.int64)
+    same  = particles[order][1:] == particles[order][:-1]
+    nxt   = rows[order][1:]
+    valid = same & (level[nxt] < stop)
+    succ[order[:-1][valid]] = nxt[valid]
+    return succ
+
+
+def canonical_particles(particles):
+    """
+    Renumber trajectories in order of their first row: 0, 1, 2, ... The rows
+    must be sorted by frame (stable). Makes the results of tp.link and
+    parallel_link comparable.
+    """
+    _, first, inverse = np.unique(np.asarray(particles), return_index = True, return_inverse = True)
+    rank = np.empty(first.shape[0], dtype = np.int64)
+    rank[np.argsort(first, kind = 'stable')] = np.arange(first.shape[0])
+    return rank[inverse]
+
+
+def parallel_link(df,
+                  m_metadata = None,
+                  m_metadata_file = None,
+                  search_range = None,
+                  memory = None,
+                  processes = None,
+                  patches = None,
+                  overlap = None,
+                  diagnostics = None,
+                  verbose = True,
+                  **kwargs):
+    """
+    Link the features of df (columns frame, x, y) in overlapping time
+    patches in a process pool and stitch the trajectories, with the same
+    trajectories as serial tp.link.
+
+    The frames (levels of the linker, frames with features) are split into
+    patches; every patch is linked from overlap frames before its first
+    frame on (warm up). Linking into a frame only depends on the trajectory
+    ends of the last memory + 1 frames, so a patch is exact if its links in
+    these frames before its start equal those of the previous patch. This
+    is checked at every seam; if it fails the patch is relinked with a
+    twice as long warm up (at most from the first frame, i.e. serial).
+    Trajectories crossing a seam, also over gaps of up to memory frames,
+    continue the trajectory of their last feature before the seam.
+
+    search_range : default MAX_PARTICLE_SPEED
+    memory       : default MEMORY
+    processes    : number of processes, default all cores
+    patches      : number of patches, default processes
+    overlap      : warm up in frames, default 4 * (memory + 1)
+    diagnostics  : tp.linking.LinkDiagnostics, gets the records of the
+                   frames of every patch (without warm up)
+    kwargs       : further arguments of tp.link. Only the predictor
+                   predictor.Field_Predictor is supported, other predictors
+                   depend on the history of the trajectories.
+
+    Returns a copy of df sorted by frame (stable) with the column particle,
+    trajectories numbered in order of their first feature (see
+    canonical_particles).
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    if kwargs.get('predictor') is not None and not isinstance(kwargs['predictor'], pmpiv.predictor.Field_Predictor):
+        raise ValueError('parallel_link only supports the predictor Field_Predictor!')
+
+    if search_range is None:
+        search_range = m_metadata.MAX_PARTICLE_SPEED
+    if memory is None:
+        memory = m_metadata.MEMORY
+    if processes is None or processes == 'auto':
+        processes = multiprocessing.cpu_count()
+    processes = max(1, int(processes))
+    if patches is None:
+        patches = processes
+    if overlap is None:
+        overlap = 4 * (memory + 1)
+    overlap = max(int(overlap), memory + 1)
+
+    f = df.sort_values('frame', kind = 'stable').reset_index(drop = True)
+    frame = f['frame'].to_numpy().astype(np.int64)
+    x = f['x'].to_numpy()
+    y = f['y'].to_numpy()
+
+    levels = np.unique(frame)
+    level  = np.searchsorted(levels, frame)
+    bounds = np.searchsorted(level, np.arange(levels.shape[0] + 1))   # first row of each level
+    n_levels = levels.shape[0]
+
+    # patches of at least overlap levels
+    patches = max(1, min(int(patches), n_levels // overlap))
+    starts  = [int(round(p * n_levels / patches)) for p in range(patches)] + [n_levels]
+
+    def _task(p, warm_up):
+        lo, hi = max(0, starts[p] - warm_up), starts[p + 1]
+        r = np.arange(bounds[lo], bounds[hi])
+        return (r, frame[r], x[r], y[r], search_range, memory, diagnostics is not None, kwargs)
+
+    if verbose:
+        print(f'Linking {n_levels} frames in {patches} patches with {processes} processes.')
+
+    tasks = [_task(p, overlap) for p in range(patches)]
+    if processes > 1 and patches > 1:
+        with multiprocessing.Pool(min(processes, patches)) as pool:
+            results = pool.map(_link_patch, tasks)
+    else:
+        results = [_link_patch(t) for t in tasks]
+
+    particle = np.full(frame.shape[0], -1, dtype = np.int64)
+    n_ids = 0
+
+    for p in range(patches):
+        warm_up = overlap
+        while True:
+            rows, ids, _ = results[p]
+            ids = np.asarray(ids, dtype = np.int64)
+            order = np.argsort(rows)
+            rows, ids = rows[order], ids[order]
+            if p == 0:
+                break
+
+            # rows of the last memory + 1 levels before the seam
+            a = starts[p]
+            w0 = bounds[max(0, a - memory - 1)]
+            window = (rows >= w0) & (rows < bounds[a])
+
+            previous  = np.arange(w0, bounds[a])
+            succ_prev = _successors(previous, particle[previous], level, a)
+
+            before = rows < bounds[a]
+            succ_new = _successors(rows[before], ids[before], level, a)[window[before]]
+
+            if np.array_equal(succ_prev, succ_new) or a - warm_up <= 0:
+                break
+
+            warm_up *= 2
+            if verbose:
+                print(f'Patch {p}: links before the seam differ, relink with a warm up of {warm_up} frames.')
+            results[p] = _link_patch(_task(p, warm_up))
+
+        if diagnostics is not None:
+            for r in results[p][2]:
+                if r['frame'] >= levels[starts[p]]:
+                    diagnostics.append(r)
+
+        inside = rows >= bounds[starts[p]]
+        if p == 0:
+            particle[rows[inside]] = ids[inside]
+            n_ids = int(ids.max()) + 1 if ids.shape[0] > 0 else 0
+            continue
+
+        # trajectory ends before the seam -> final particle ids
+        window_rows = rows[window]
+        ends = window_rows[succ_new == -1]
+        end_ids = ids[window][succ_new == -1]
+        mapping = dict(zip(end_ids.tolist(), particle[ends].tolist()))
+
+        new_ids = ids[inside]
+        unique = np.unique(new_ids)
+        mapped = np.array([mapping.get(u, -1) for u in unique.tolist()], dtype = np.int64)
+        born = mapped == -1
+        mapped[born] = n_ids + np.arange(np.count_nonzero(born))
+        n_ids += int(np.count_nonzero(born))
+
+        particle[rows[inside]] = mapped[np.searchsorted(unique, new_ids)]
+
+    f['particle'] = canonical_particles(particle) if particle.shape[0] > 0 else particle
+
+    if verbose:
+        print(f'Linked {f.shape[0]} features to {len(np.unique(particle))} trajectories.')
+
+    return f
+
+
+def link_report(diagnostics = None,
+                m_metadata = None,
+                m_metadata_file = None,
+                save = True,
+                verbose = True):
+    """
+    Summary of the linking diagnostics (tp.linking.LinkDiagnostics, default
+    the log WORKING_DIR/link_diagnostics.jsonl of the link stage) with hints
+    to tune MAX_PARTICLE_SPEED and MEMORY:
+
+    - more than 1 % of the links longer than 90 % of the search range:
+      MAX_PARTICLE_SPEED (PREDICTOR_RANGE with predictor) may be too small
+    - many candidates per feature, large subnets or adaptive retries:
+      MAX_PARTICLE_SPEED may be too large (or use PREDICTOR)
+    - links from memory over the largest gap (MEMORY): MEMORY may be too
+      small, no links over the largest gaps: MEMORY may be reduced
+
+    save : write the report to WORKING_DIR/link_report.json
+
+    Returns the report as dict.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    if diagnostics is None:
+        diagnostics = tp.linking.LinkDiagnostics.read_log(os.path.join(m_metadata.WORKING_DIR, 'link_diagnostics.jsonl'))
+
+    d = diagnostics.to_frame()
+    linked = d.iloc[1:] if d.shape[0] > 1 else d    # first frame is not linked
+    subnets = diagnostics.subnet_histogram()
+    gaps    = diagnostics.memory_histogram()
+    dist    = diagnostics.distance_histogram()
+
+    search_range = float(d['search_range'].max()) if d.shape[0] > 0 else np.nan
+    n_links = int(linked['linked'].sum())
+    t_tree, t_solver = float(d['time_tree'].sum()), float(d['time_solver'].sum())
+
+    report = {'frames'                : int(d.shape[0]),
+              'features_per_frame'    : float(d['features'].mean()) if d.shape[0] > 0 else 0.,
+              'search_range'          : search_range,
+              'candidates_per_source' : float(linked['candidates'].sum() / max(1, linked['sources'].sum())),
+              'linked_fraction'       : float(n_links / max(1, linked['features'].sum())),
+              'new_per_frame'         : float(linked['new'].mean()) if linked.shape[0] > 0 else 0.,
+              'subnets'               : {str(k) : int(v) for k, v in subnets.items()},
+              'max_subnet'            : int(subnets.index.max()) if subnets.shape[0] > 0 else 0,
+              'adaptive_retries'      : int(d['adaptive_retries'].sum()),
+              'distance_mean'         : float((linked['distance_mean'] * linked['linked']).sum() / max(1, n_links)),
+              'distance_max'          : float(linked['distance_max'].max()) if n_links > 0 else 0.,
+              'distances'             : {f'{k:.1f}' : int(v) for k, v in dist.items()},
+              'at_range_fraction'     : float(dist.iloc[-1] / max(1, n_links)),
+              'memory'                : int(m_metadata.MEMORY),
+              'memory_links'          : {str(k) : int(v) for k, v in gaps.items()},
+              'time_tree'             : t_tree,
+              'time_solver'           : t_solver,
+              'hints'                 : []}
+
+    # with predictor the distances are measured from the predicted positions
+    key = 'PREDICTOR_RANGE' if m_metadata.PREDICTOR is not None and m_metadata.PREDICTOR_RANGE is not None \
+          else 'MAX_PARTICLE_SPEED'
+
+    hints = report['hints']
+    if report['at_range_fraction'] > 0.01:
+        hints.append(f'{100 * report["at_range_fraction"]:.1f} % of the links are longer than 90 % of the search range, '
+                     f'{key} may be too small.')
+    elif n_links > 0 and report['distance_max'] < 0.5 * search_range:
+        hints.append(f'All links are shorter than {report["distance_max"]:.2f} px, '
+                     f'{key} could be reduced.')
+    if report['candidates_per_source'] > 3 or report['adaptive_retries'] > 0 or \
+       report['max_subnet'] > tp.linking.Linker.MAX_SUB_NET_SIZE_ADAPTIVE:
+        hints.append(f'{report["candidates_per_source"]:.1f} candidates per feature, largest subnet '
+                     f'{report["max_subnet"]}, {report["adaptive_retries"]} adaptive retries: '
+                     f'{key} may be too large' + (', consider PREDICTOR.' if key == 'MAX_PARTICLE_SPEED' else '.'))
+    n_memory = int(gaps.sum())
+    if m_metadata.MEMORY > 0 and n_memory > 0:
+        largest = int(gaps.index.max())
+        if largest >= m_metadata.MEMORY and gaps.get(m_metadata.MEMORY, 0) > 0.1 * n_memory:
+            hints.append(f'{int(gaps[m_metadata.MEMORY])} of {n_memory} links from memory skip {m_metadata.MEMORY} '
+                         'frames (MEMORY), MEMORY may be too small.')
+        elif largest < m_metadata.MEMORY:
+            hints.append(f'No links from memory skip more than {largest} frames, MEMORY could be reduced to {largest}.')
+    elif m_metadata.MEMORY > 0:
+        hints.append('No links from memory, MEMORY could be reduced to 0.')
+
+    if verbose:
+        print(f'\n### Linking diagnostics ({report["frames"]} frames):')
+        print(f'Features per frame: {report["features_per_frame"]:.1f}, linked: {100 * report["linked_fraction"]:.1f} %, '
+              f'new trajectories per frame: {report["new_per_frame"]:.1f}')
+        print(f'Candidates per feature: {report["candidates_per_source"]:.2f}, largest subnet: {report["max_subnet"]}, '
+              f'adaptive retries: {report["adaptive_retries"]}')
+        print(f'Link distance mean/max: {report["distance_mean"]:.2f}/{report["distance_max"]:.2f} px '
+              f'(search range {search_range:.2f} px), {100 * report["at_range_fraction"]:.1f} % '
+              'longer than 90 % of the search range')
+        print(f'Links from memory by skipped frames: {report["memory_links"]}')
+        print(f'Time KD-tree/subnet solver: {t_tree:.2f}/{t_solver:.2f} s')
+        for h in hints:
+            print(h)
+
+    if save:
+        _f = os.path.join(m_metadata.WORKING_DIR, 'link_report.json')
+        with open( _f, 'w' ) as f:
+            if verbose:
+                print(f'Writing linking report to {_f}')
+            json.dump(report, f, indent = 2)
+
+    return report
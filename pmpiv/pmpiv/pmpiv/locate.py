@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import numpy as np
+import os, glob
+import json
+
+import pandas as pd
+
+import pims             # https://soft-matter.github.io/pims/v0.6.1/
+import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+
+def locate_sequence(frames,
+                    m_metadata = None,
+                    m_metadata_file = None,
+                    processes = 'auto',
+                    executor = None,
+                    save = True,
+                    verbose = True):
+    """
+    Locate features in all frames and compute the sequence statistics in
+    the same pass.
+
+    Runs tp.batch once and accumulates the statistics of the located
+    features with its after_locate hook (see fstats.Feature_Statistics),
+    so every frame is read and located only once. Readers from
+    Image_Sequence are opened in the worker processes, only the features
+    are sent back (see reader.worker_readable).
+
+    frames    : image sequence, e.g. from Image_Sequence.subsection_range()
+    processes : number of processes passed to tp.batch
+    executor  : executor.Frame_Executor, if given it is used instead of 
+                tp.batch to locate the frames (frames must be its frames)
+    save      : write the statistics to WORKING_DIR/seq_stats.json, same
+                file as Sequence_Statistics.get()
+
+    Returns the DataFrame of all features and the statistics dict.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    # same methods/parameters as Sequence_Statistics
+    _sq = pmpiv.fstats.Sequence_Statistics(frames, m_metadata = m_metadata, verbose = verbose)
+
+    acc = pmpiv.fstats.Feature_Statistics(_sq.parameters)
+
+    if executor is None:
+        def _after_locate(frame_no, features):
+            acc.add(features)
+            return features
+
+        df_all = tp.batch(frames, m_metadata.FEATURE_SIZE,
+                          minmass = m_metadata.FEATURE_MIN_SIZE,
+                          invert = m_metadata.FEATURES_ARE_DARK,
+                          processes = processes,
+                          after_locate = _after_locate,
+                          worker_reader = pmpiv.reader.worker_readable(frames))
+    else:
+        df_all = executor.locate()
+        for frame_no, features in df_all.groupby('frame', sort = True):
+            acc.add(features)
+
+    sq_stats = acc.get(_sq.methods)
+
+    if save:
+        pmpiv.fstats.write_stats(os.path.join(m_metadata.WORKING_DIR, 'seq_stats.json'), sq_stats, verbose = verbose)
+
+    return df_all, sq_stats
@@ -62,6 +62,12 @@ class Metadata:
         self.REMOVAL              = self._md['REMOVAL']
         self.EXTRACTION           = self._md['EXTRACTION']
 
+        # optional parameters, default if not given in the infile
+        self.IMAGE_WIDTH          = self._md['IMAGE_WIDTH']
+        self.IMAGE_HEIGHT         = self._md['IMAGE_HEIGHT']
+        self.PREDICTOR            = self._md['PREDICTOR']
+        self.PREDICTOR_RANGE      = self._md['PREDICTOR_RANGE']
+
     def _is_avail(self):
         """
         """
@@ -104,6 +110,17 @@ class Metadata:
         self._int_keys = ['FEATURE_SIZE', 'FEATURE_MIN_SIZE', 'RATE', 'MAX_PARTICLE_SPEED', 'MEMORY', 'DURATION', 'CHECK_STATIC', 'START_FRAME', 'END_FRAME']
         self._flt_keys = ['FPS', 'PIXELSIZE', 'HEIGHT', 'STATIC_DEV_PARAMETER']
 
+        # optional keys with default values
+        # IMAGE_WIDTH, IMAGE_HEIGHT: image extent in pixel, None -> extent of the data
+        # PREDICTOR: velocity field predictor for linking, None -> no predictor
+        # PREDICTOR_RANGE: search range with predictor, None -> MAX_PARTICLE_SPEED
+        self._opt_keys = {'IMAGE_WIDTH'     : None,
+                          'IMAGE_HEIGHT'    : None,
+                          'PREDICTOR'       : None,
+                          'PREDICTOR_RANGE' : None}
+        self._opt_int_keys = ['IMAGE_WIDTH', 'IMAGE_HEIGHT', 'PREDICTOR_RANGE']
+        self._opt_str_keys = ['PREDICTOR']
+
         with open(self.infile, 'r') as fh:
             for line in fh:
                 for k in range(len(self._keys)):
@@ -120,7 +137,16 @@ class Metadata:
                                 self._md[str(self._keys[k])] = list([])
                             for f in range(len(self._md[str(self._keys[k])])):
                                 self._md[str(self._keys[k])][f] = self._md[str(self._keys[k])][f].replace(' ', '')
+                for k in self._opt_keys:
+                    if line.startswith(f'{k} '):
+                        if k in self._opt_int_keys:
+                            self._md[k] = int(line.replace(f'{k} ', ''))
+                        elif k in self._opt_str_keys:
+                            self._md[k] = str(line.replace(f'{k} ', '').replace('\n', '')).strip()
 
+        for k in self._opt_keys:
+            if k not in self._md:
+                self._md[k] = self._opt_keys[k]
 
         print(f'Metadata: {self._md}')
 
@@ -158,6 +184,19 @@ class Metadata:
             if not (isinstance(self._md[i], float)):
                 raise ValueError(f'{i} must be float type!')
 
+        for i in self._opt_int_keys:
+            if self._md[i] is not None and not (isinstance(self._md[i], int)):
+                raise ValueError(f'{i} must be int type!')
+
+        if self._md['PREDICTOR'] in ['', 'None', 'none']:
+            self._md['PREDICTOR'] = None
+        if self._md['PREDICTOR'] is not None:
+            if self._md['PREDICTOR'] not in ['field', 'learn'] and not os.path.isfile(self._md['PREDICTOR']):
+                raise ValueError('PREDICTOR must be field, learn or a velocity field file (.npz)!')
+
+        if self._md['PREDICTOR_RANGE'] is not None and self._md['PREDICTOR_RANGE'] <= 0:
+            raise ValueError('PREDICTOR_RANGE must be positive!')
+
         for i in ['REMOVAL', 'EXTRACTION']:
             if self._md[i]:
                 for j in self._md[i]:
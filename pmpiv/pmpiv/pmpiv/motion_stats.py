@@ -53,6 +53,66 @@ class Motion_Statistics:
         except:
             raise FileNotFoundError('Metadata information not available!')
 
+        self.clear_cache()
+
+
+    def clear_cache(self):
+        """
+        Drop the cached trajectory arrays and displacement pairs. Call this 
+        if m_df is modified after the first displacement computation.
+        """
+        self._traj      = None
+        self._lag_cache = {}
+
+
+    def _trajectories(self):
+        """
+        Position arrays of all trajectories, sorted by particle and frame. 
+        Built once and cached.
+        """
+        if self._traj is None:
+            df = self.m_df
+            order = np.lexsort((df['frame'].to_numpy(), df['particle'].to_numpy()))
+
+            self._traj = {'particle' : df['particle'].to_numpy()[order],
+                          'frame'    : df['frame'].to_numpy().astype(np.int64)[order],
+                          'x'        : df['x'].to_numpy(dtype = float)[order],
+                          'y'        : df['y'].to_numpy(dtype = float)[order]}
+
+            # combined sort key (particle index, frame) for the lag lookup
+            _, pidx = np.unique(self._traj['particle'], return_inverse = True)
+            fmin = self._traj['frame'].min() if order.shape[0] > 0 else 0
+            self._traj['frame_offset'] = self._traj['frame'] - fmin
+            self._traj['stride']       = int(self._traj['frame_offset'].max()) + 1 if order.shape[0] > 0 else 1
+            self._traj['key']          = pidx.astype(np.int64) * self._traj['stride'] + self._traj['frame_offset']
+
+        return self._traj
+
+
+    def _lag_pairs(self, lag):
+        """
+        Indices (into the trajectory arrays) of all position pairs of the 
+        same particle at frame f and f + lag. Cached per lag.
+        """
+        lag = int(lag)
+        if lag < 1:
+            raise ValueError('freq must be a positive integer!')
+
+        if lag not in self._lag_cache:
+            traj = self._trajectories()
+            key  = traj['key']
+
+            # partner must be within the same particle (no wrap into the next one)
+            candidates = np.nonzero(traj['frame_offset'] + lag < traj['stride'])[0]
+            target = key[candidates] + lag
+            pos    = np.searchsorted(key, target)
+            pos[pos == key.shape[0]] = 0
+            found  = key[pos] == target
+
+            self._lag_cache[lag] = (candidates[found], pos[found])
+
+        return self._lag_cache[lag]
+
         
     def displacement_2frames(self, frame1, frame2):
         """
@@ -120,68 +180,99 @@ class Motion_Statistics:
 
         return rdict
 
-    def mean_displacement_allframes(self, freq = 1):
+    def displacements(self, freq = 1):
         """
-        """
-        rdict = {}
-        
-        all_frames = np.unique((self.m_df['frame']).to_numpy())
+        All displacements of particles between frame f and frame f + freq.
 
-        dx, dy, dr = [], [], []
+        Vectorized over all frames and trajectories: the trajectory arrays 
+        are sorted by particle and frame once, position pairs of each lag are 
+        found by a binary search and cached, so repeated calls and other 
+        lags do not sort or group the DF again. Gaps in trajectories (memory) 
+        and arbitrary frame numbers are handled.
 
-        if freq != 1:
-            raise NotImplementedError
+        Returns DataFrame with columns frame (of the first position), 
+        particle, x, y (first position), dx, dy, dr.
+        """
+        traj = self._trajectories()
+        ia, ib = self._lag_pairs(freq)
 
-        for i in range(all_frames.shape[0]-1):
-            _rdict = self.mean_displacement_2frames(i, i+1)
-            dx.append(_rdict['dx'])
-            dy.append(_rdict['dy'])
-            dr.append(_rdict['dr'])
+        disp = pd.DataFrame({'frame'    : traj['frame'][ia],
+                             'particle' : traj['particle'][ia],
+                             'x'        : traj['x'][ia],
+                             'y'        : traj['y'][ia],
+                             'dx'       : traj['x'][ib] - traj['x'][ia],
+                             'dy'       : traj['y'][ib] - traj['y'][ia]})
 
-        rdict['dx'] = np.mean(np.asarray(dx))
-        rdict['dy'] = np.mean(np.asarray(dy))
-        rdict['dr'] = np.mean(np.asarray(dr))
+        disp['dr'] = np.sqrt(disp['dx']**2 + disp['dy']**2)
 
-        return rdict
+        return disp
 
 
-    def mean_abs_displacement_allframes(self, freq = 1):
+    def displacement_statistics(self, freq = 1):
         """
+        Per frame and global statistics of the displacements between frame 
+        f and f + freq in one pass.
+
+        freq : lag in frames, or a list of lags. For a list a dict 
+               lag -> statistics is returned.
+
+        Returns dict with 
+            'frames'   : DataFrame indexed by frame with the per frame mean, 
+                         abs_mean and max of dx, dy, dr and the count
+            'mean'     : dict dx, dy, dr, mean over the per frame means
+            'abs_mean' : dict dx, dy, dr, mean over the per frame abs means
+            'max'      : dict dx, dy, dr, maximum of all displacements
+        Frames without any displacement are not included.
         """
-        rdict = {}
-        
-        all_frames = np.unique((self.m_df['frame']).to_numpy())
+        if np.ndim(freq) > 0:
+            return {int(f) : self.displacement_statistics(freq = f) for f in freq}
 
-        dx, dy, dr = [], [], []
+        disp = self.displacements(freq = freq)
 
-        if freq != 1:
-            raise NotImplementedError
+        comps = ['dx', 'dy', 'dr']
+        for c in comps:
+            disp[f'abs_{c}'] = disp[c].abs()
 
-        for i in range(all_frames.shape[0]-1):
-            _rdict = self.abs_mean_displacement_2frames(i, i+1)
-            dx.append(_rdict['dx'])
-            dy.append(_rdict['dy'])
-            dr.append(_rdict['dr'])
+        grouped = disp.groupby('frame', sort = True)
+        per_frame = pd.concat([grouped[comps].mean().add_prefix('mean_'),
+                               grouped[[f'abs_{c}' for c in comps]].mean().add_prefix('mean_'),
+                               grouped[comps].max().add_prefix('max_'),
+                               grouped.size().rename('count')], axis = 1)
+        per_frame = per_frame.rename(columns = {f'mean_abs_{c}' : f'abs_mean_{c}' for c in comps})
 
-
-        rdict['dx'] = np.mean(np.abs(np.asarray(dx)))
-        rdict['dy'] = np.mean(np.abs(np.asarray(dy)))
-        rdict['dr'] = np.mean(np.abs(np.asarray(dr)))
+        rdict = {'frames' : per_frame, 'mean' : {}, 'abs_mean' : {}, 'max' : {}}
+        for c in comps:
+            rdict['mean'][c]     = np.mean(per_frame[f'mean_{c}'].to_numpy())
+            rdict['abs_mean'][c] = np.mean(per_frame[f'abs_mean_{c}'].to_numpy())
+            rdict['max'][c]      = np.max(disp[c].to_numpy()) if len(disp) > 0 else np.nan
 
         return rdict
 
-    def mean_velocity_allframes(self, freq = 1):
+
+    def mean_displacement_allframes(self, freq = 1):
+        """
+        Mean over all frames of the mean displacement between frame f and 
+        f + freq.
         """
+        return dict(self.displacement_statistics(freq = freq)['mean'])
+
+
+    def mean_abs_displacement_allframes(self, freq = 1):
         """
+        Mean over all frames of the mean absolute displacement between frame 
+        f and f + freq.
+        """
+        return dict(self.displacement_statistics(freq = freq)['abs_mean'])
 
-        if freq != 1:
-            raise NotImplementedError
+    def mean_velocity_allframes(self, freq = 1):
+        """
+        """
 
         rdict = self.mean_displacement_allframes(freq = freq)
 
-        rdict['dx'] *= (self.m_metadata.FPS * self.m_metadata.PIXELSIZE)
-        rdict['dy'] *= (self.m_metadata.FPS * self.m_metadata.PIXELSIZE)
-        rdict['dr'] *= (self.m_metadata.FPS * self.m_metadata.PIXELSIZE)
+        rdict['dx'] *= (self.m_metadata.FPS * self.m_metadata.PIXELSIZE / freq)
+        rdict['dy'] *= (self.m_metadata.FPS * self.m_metadata.PIXELSIZE / freq)
+        rdict['dr'] *= (self.m_metadata.FPS * self.m_metadata.PIXELSIZE / freq)
 
         return rdict
 
@@ -191,16 +282,224 @@ class Motion_Statistics:
         """
         """
 
-        if freq != 1:
-            raise NotImplementedError
-
         rdict = self.mean_abs_displacement_allframes(freq = freq)
 
-        rdict['dx'] *= (self.m_metadata.FPS * self.m_metadata.PIXELSIZE)
-        rdict['dy'] *= (self.m_metadata.FPS * self.m_metadata.PIXELSIZE)
-        rdict['dr'] *= (self.m_metadata.FPS * self.m_metadata.PIXELSIZE)
+        rdict['dx'] *= (self.m_metadata.FPS * self.m_metadata.PIXELSIZE / freq)
+        rdict['dy'] *= (self.m_metadata.FPS * self.m_metadata.PIXELSIZE / freq)
+        rdict['dr'] *= (self.m_metadata.FPS * self.m_metadata.PIXELSIZE / freq)
+
+        return rdict
+
+
+    def velocity_statistics(self, lags = [1]):
+        """
+        Global mean, abs mean and max velocity [m/s] for several frame lags. 
+
+        Returns dict lag -> {'mean' : {dx, dy, dr}, 'abs_mean' : {...}, 
+        'max' : {...}}, dx/dy/dr being velocity components here.
+        """
+        rdict = {}
+
+        for lag, stats in self.displacement_statistics(freq = list(lags)).items():
+            scale = self.m_metadata.FPS * self.m_metadata.PIXELSIZE / lag
+            rdict[lag] = {k : {c : v * scale for c, v in stats[k].items()} 
+                          for k in ['mean', 'abs_mean', 'max']}
 
         return rdict
 
 
+    def velocity_profile(self, 
+                         axis = 'y', 
+                         component = 'dx', 
+                         bin_width = 1.0, 
+                         extent = None, 
+                         freq = 1, 
+                         absolute = True, 
+                         min_velocity = None, 
+                         mask = None, 
+                         si = False):
+        """
+        Profile of a velocity component binned along an image axis.
+
+        Displacements are computed once (and cached per lag), all of them 
+        are binned at once with np.bincount.
+
+        axis         : 'x' or 'y', image axis of the bins 
+        component    : 'dx', 'dy' or 'dr'
+        bin_width    : bin width in pixel
+        extent       : image extent along axis in pixel, default IMAGE_WIDTH
+                       or IMAGE_HEIGHT of the metadata, else extent of the data
+        absolute     : use the absolute value of the component
+        min_velocity : only displacements with value > min_velocity [px/frame]
+        mask         : image mask (height, width), only displacements starting 
+                       at mask > 0 are used, e.g. Annotation_Handler.annotations2mask()
+        si           : positions in m and velocities in m/s instead of px 
+                       and px/frame
+
+        Returns dict with the arrays edges, centers, count, mean, std 
+        (mean, std are nan for empty bins).
+        """
+        if axis not in ['x', 'y']:
+            raise ValueError('axis must be x or y!')
+        if component not in ['dx', 'dy', 'dr']:
+            raise ValueError('component must be dx, dy or dr!')
+        if bin_width <= 0:
+            raise ValueError('bin_width must be positive!')
+
+        disp = self.displacements(freq = freq)
+        pos  = disp[axis].to_numpy()
+        vel  = disp[component].to_numpy() / freq
+
+        if absolute:
+            vel = np.abs(vel)
+
+        keep = np.ones(pos.shape[0], dtype = bool)
+        if min_velocity is not None:
+            keep &= vel > min_velocity
+        if mask is not None:
+            keep &= pmpiv.filtering._lookup_mask(mask, disp['x'].to_numpy(), disp['y'].to_numpy()) > 0
+
+        if extent is None:
+            extent = self.m_metadata.IMAGE_WIDTH if axis == 'x' else self.m_metadata.IMAGE_HEIGHT
+        if extent is None:
+            extent = np.floor(pos.max()) + 1 if pos.shape[0] > 0 else bin_width
+
+        nbins = int(np.ceil(extent / bin_width))
+        edges = np.arange(nbins + 1) * bin_width
+
+        idx  = np.floor(pos / bin_width).astype(np.int64)
+        keep &= (idx >= 0) & (idx < nbins)
+        idx, vel = idx[keep], vel[keep]
+
+        count = np.bincount(idx, minlength = nbins)
+        s1    = np.bincount(idx, weights = vel, minlength = nbins)
+        s2    = np.bincount(idx, weights = vel**2, minlength = nbins)
+
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            mean = s1 / count
+            std  = np.sqrt(np.maximum(s2 / count - mean**2, 0.0))
+
+        if si:
+            edges = edges * self.m_metadata.PIXELSIZE
+            mean  = mean * self.m_metadata.PIXELSIZE * self.m_metadata.FPS
+            std   = std  * self.m_metadata.PIXELSIZE * self.m_metadata.FPS
+
+        return {'edges'   : edges, 
+                'centers' : 0.5 * (edges[1:] + edges[:-1]), 
+                'count'   : count, 
+                'mean'    : mean, 
+                'std'     : std}
+
+
+class Displacement_Stream:
+    """
+
+    Displacements between frame f and f + freq of trajectories that are
+    added chunk by chunk in order of frames. The last freq frames of each
+    chunk are carried to the next one, so pairs across chunk borders are
+    found once and the result equals Motion_Statistics.displacements of
+    the complete DataFrame.
+
+    """
 
+    def __init__(self, m_metadata = None, m_metadata_file = None, freq = 1):
+
+        # check if metadata is avail
+        try:
+            self.m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+        except:
+            raise FileNotFoundError('Metadata information not available!')
+
+        if int(freq) < 1:
+            raise ValueError('freq must be a positive integer!')
+
+        self.freq        = int(freq)
+        self._carry      = None
+        self._last_frame = None
+
+    @property
+    def last_frame(self):
+        return self._last_frame
+
+    def add(self, df):
+        """
+        Add a chunk of linked trajectories (columns frame, particle, x, y),
+        returns the new displacements (see Motion_Statistics.displacements).
+        """
+        if self._last_frame is not None and len(df) > 0 and df['frame'].min() <= self._last_frame:
+            raise ValueError('Chunks must be added in order of frames!')
+
+        first = df['frame'].min() if len(df) > 0 else None
+
+        df = df[['frame', 'particle', 'x', 'y']]
+        if self._carry is not None:
+            df = pd.concat([self._carry, df])
+
+        if len(df) == 0:
+            return pd.DataFrame(columns = ['frame', 'particle', 'x', 'y', 'dx', 'dy', 'dr'])
+
+        disp = Motion_Statistics(df, m_metadata = self.m_metadata, verbose = False).displacements(freq = self.freq)
+
+        # pairs within the carried frames are already counted
+        if self._carry is not None and first is not None:
+            disp = disp.loc[disp['frame'] + self.freq >= first]
+
+        self._last_frame = df['frame'].max()
+        self._carry = df.loc[df['frame'] > self._last_frame - self.freq]
+
+        return disp
+
+
+class Displacement_Accumulator:
+    """
+
+    Statistics of displacements added in chunks (e.g. from 
+    Displacement_Stream), same result as 
+    Motion_Statistics.displacement_statistics of the complete DataFrame.
+    Only the per frame statistics are kept.
+
+    """
+
+    def __init__(self):
+        self._frames = []
+        self._max    = {'dx' : -np.inf, 'dy' : -np.inf, 'dr' : -np.inf}
+        self.count   = 0
+
+    def add(self, disp):
+        """
+        Add displacements (columns frame, dx, dy, dr) of complete frames.
+        """
+        if len(disp) == 0:
+            return
+
+        comps = ['dx', 'dy', 'dr']
+        disp = disp[['frame'] + comps].copy()
+        for c in comps:
+            disp[f'abs_{c}'] = disp[c].abs()
+            self._max[c] = max(self._max[c], float(disp[c].max()))
+
+        grouped = disp.groupby('frame', sort = True)
+        per_frame = pd.concat([grouped[comps].mean().add_prefix('mean_'),
+                               grouped[[f'abs_{c}' for c in comps]].mean().add_prefix('mean_'),
+                               grouped[comps].max().add_prefix('max_'),
+                               grouped.size().rename('count')], axis = 1)
+        self._frames.append(per_frame.rename(columns = {f'mean_abs_{c}' : f'abs_mean_{c}' for c in comps}))
+        self.count += len(disp)
+
+    def get(self):
+        """
+        Same dict as Motion_Statistics.displacement_statistics.
+        """
+        comps = ['dx', 'dy', 'dr']
+        if len(self._frames) == 0:
+            per_frame = pd.DataFrame(columns = [f'{k}_{c}' for k in ['mean', 'abs_mean', 'max'] for c in comps] + ['count'])
+        else:
+            per_frame = pd.concat(self._frames).sort_index()
+
+        rdict = {'frames' : per_frame, 'mean' : {}, 'abs_mean' : {}, 'max' : {}}
+        for c in comps:
+            rdict['mean'][c]     = np.mean(per_frame[f'mean_{c}'].to_numpy())
+            rdict['abs_mean'][c] = np.mean(per_frame[f'abs_mean_{c}'].to_numpy())
+            rdict['max'][c]      = self._max[c] if self.count > 0 else np.nan
+
+        return rdict
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import numpy as np
+import os, glob
+import json
+import concurrent.futures
+
+import pandas as pd
+
+import pims             # https://soft-matter.github.io/pims/v0.6.1/
+import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+# stages in order of execution, each reads the output of the previous one
+STAGES = ['locate', 'link', 'removal', 'static', 'stubs']
+
+# stages outside of the DataFrame chain
+#   masks    : rasterize and cache the annotation masks, runs alongside locate
+#   velocity : velocity statistics, profile and field of the final trajectories
+EXTRA_STAGES = ['masks', 'velocity']
+
+# short names of groups of stages
+ALIASES = {'filter' : ['removal', 'static', 'stubs']}
+
+
+def _image_files(m_metadata):
+    """
+    Same files as Image_Sequence.read().
+    """
+    if pmpiv.stack.is_stack(m_metadata.IN_PATH):
+        return pmpiv.stack.stack_files(m_metadata.IN_PATH)
+    return sorted(glob.glob(f'{m_metadata.IN_PATH}/*{m_metadata.IN_FORMAT}'))
+
+
+def _json_files(m_metadata, extraction = False):
+    """
+    Paths of the REMOVAL (and if extraction, EXTRACTION) json files.
+    """
+    json_files = list(m_metadata.REMOVAL) + (list(m_metadata.EXTRACTION) if extraction else [])
+    return [f'{m_metadata.JSON_PATH}/{f}' for f in json_files]
+
+
+def stage_locate(m_metadata = None,
+                 m_metadata_file = None,
+                 frames = None,
+                 chunk_frames = 1000,
+                 processes = 'auto',
+                 read_ahead = 0,
+                 verbose = True):
+    """
+    Locate features in chunks of chunk_frames frames, finished chunks are
+    skipped on rerun. The sequence statistics are computed from the stored
+    features and written to WORKING_DIR/seq_stats.json.
+
+    frames     : image sequence, default Image_Sequence.subsection_range()
+    read_ahead : > 0 decodes the images of the default sequence in 
+                 background threads of this process (frame cache with 
+                 read_ahead frames, I/O bound) and sends them to the 
+                 worker processes, which then only locate. 0: the worker 
+                 processes read their frames themselves (processes > 1 
+                 or 'auto', else the frames are read in this thread).
+
+    Returns the Checkpoint.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    ckpt = pmpiv.checkpoint.Checkpoint('locate', m_metadata = m_metadata,
+                                       params = ['IN_PATH', 'IN_FORMAT', 'START_FRAME', 'END_FRAME',
+                                                 'FEATURE_SIZE', 'FEATURE_MIN_SIZE', 'FEATURES_ARE_DARK'],
+                                       inputs = {'images' : pmpiv.checkpoint.sequence_hash(_image_files(m_metadata))},
+                                       options = {'chunk_frames' : chunk_frames},
+                                       verbose = verbose)
+
+    if ckpt.is_complete:
+        return ckpt
+
+    image_sequence = None
+    if frames is None:
+        image_sequence = pmpiv.image_sequence.Image_Sequence(m_metadata = m_metadata)
+        if not verbose:
+            image_sequence.quiet()
+        if read_ahead > 0:
+            image_sequence.cache(max_bytes = 2**28, read_ahead = read_ahead)
+        frames = image_sequence.subsection_range()
+
+    n_chunks = int(np.ceil(len(frames) / chunk_frames))
+
+    # the workers only read their frames in a process pool, in-process
+    # batches of concurrent stages (scheduler) read in the calling thread
+    in_pool = processes == 'auto' or processes > 1
+
+    for c in range(n_chunks):
+        if ckpt.has_chunk(c):
+            continue
+        if verbose:
+            print(f'Locate chunk {c + 1} from {n_chunks}')
+        _frames = frames[c * chunk_frames:(c + 1) * chunk_frames]
+        df = tp.batch(_frames,
+                      m_metadata.FEATURE_SIZE,
+                      minmass = m_metadata.FEATURE_MIN_SIZE,
+                      invert = m_metadata.FEATURES_ARE_DARK,
+                      processes = processes,
+                      worker_reader = in_pool and read_ahead == 0 and pmpiv.reader.worker_readable(_frames))
+        ckpt.write_chunk(c, df)
+
+    if image_sequence is not None:
+        image_sequence.close()
+
+    # statistics from the stored features, only the needed columns are read
+    _sq = pmpiv.fstats.Sequence_Statistics(None, m_metadata = m_metadata, verbose = verbose)
+    acc = pmpiv.fstats.Feature_Statistics(_sq.parameters)
+    for c in ckpt.chunks():
+        acc.add(ckpt.read_chunk(c, columns = _sq.parameters))
+
+    pmpiv.fstats.write_stats(os.path.join(m_metadata.WORKING_DIR, 'seq_stats.json'), acc.get(_sq.methods), verbose = verbose)
+
+    ckpt.complete()
+
+    return ckpt
+
+
+def stage_link(upstream,
+               m_metadata = None,
+               m_metadata_file = None,
+               chunk_frames = 1000,
+               processes = 1,
+               verbose = True):
+    """
+    Link the features of upstream (Checkpoint). The stage is recomputed as
+    a whole if it was interrupted.
+
+    processes : > 1 or 'auto' links time patches in parallel 
+                (linking.parallel_link, same trajectories as tp.link)
+
+    With PREDICTOR set the features are linked with the velocity field
+    predictor (predictor.get_predictor) and PREDICTOR_RANGE.
+
+    The linking diagnostics are written to WORKING_DIR/link_diagnostics.jsonl
+    and summarized in link_report.json (linking.link_report).
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    ckpt = pmpiv.checkpoint.Checkpoint('link', m_metadata = m_metadata,
+                                       params = ['MAX_PARTICLE_SPEED', 'MEMORY', 'PREDICTOR', 'PREDICTOR_RANGE'],
+                                       inputs = {'predictor' : pmpiv.predictor.predictor_key(m_metadata = m_metadata)},
+                                       upstream = [upstream],
+                                       options = {'chunk_frames' : chunk_frames},
+                                       verbose = verbose)
+
+    if ckpt.is_complete:
+        return ckpt
+
+    df = upstream.read().reset_index(drop = True)
+    predictor = pmpiv.predictor.get_predictor(df, m_metadata = m_metadata, verbose = verbose)
+    search_range = pmpiv.predictor.search_range(predictor, m_metadata = m_metadata)
+    diagnostics = tp.linking.LinkDiagnostics(os.path.join(m_metadata.WORKING_DIR, 'link_diagnostics.jsonl'))
+    if processes == 1:
+        df = tp.link(df, search_range, memory = m_metadata.MEMORY, predictor = predictor, diagnostics = diagnostics)
+    else:
+        df = pmpiv.linking.parallel_link(df, m_metadata = m_metadata, search_range = search_range,
+                                         processes = processes, verbose = verbose, predictor = predictor,
+                                         diagnostics = diagnostics)
+    diagnostics.close()
+    pmpiv.linking.link_report(diagnostics, m_metadata = m_metadata, verbose = verbose)
+
+    ckpt.write(df, chunk_frames = chunk_frames)
+
+    return ckpt
+
+
+def stage_removal(upstream,
+                  m_metadata = None,
+                  m_metadata_file = None,
+                  fuzziness = 0.5,
+                  extraction = False,
+                  verbose = True):
+    """
+    Remove features in the REMOVAL annotations (filtering.complete_removal,
+    combined). If extraction, only features in the EXTRACTION annotations
+    are kept as well. Features are independent, so the stage works chunk by
+    chunk on the chunks of upstream and skips finished chunks on rerun.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    ckpt = pmpiv.checkpoint.Checkpoint('removal', m_metadata = m_metadata,
+                                       params = ['REMOVAL', 'EXTRACTION'] if extraction else ['REMOVAL'],
+                                       inputs = {os.path.basename(f) : pmpiv.checkpoint.file_hash(f) for f in _json_files(m_metadata, extraction = extraction)},
+                                       upstream = [upstream],
+                                       options = {'fuzziness' : fuzziness, 'extraction' : extraction},
+                                       verbose = verbose)
+
+    if ckpt.is_complete:
+        return ckpt
+
+    for c in upstream.chunks():
+        if ckpt.has_chunk(c):
+            continue
+        df = upstream.read_chunk(c).reset_index(drop = True)
+        df = pmpiv.filtering.complete_removal(df, m_metadata = m_metadata, verbose = verbose,
+                                              fuzziness = fuzziness, save = False, combined = True,
+                                              extraction = extraction)
+        ckpt.write_chunk(c, df, frames = upstream.manifest['chunks'][str(c)]['frames'])
+
+    ckpt.complete()
+
+    return ckpt
+
+
+def stage_static(upstream,
+                 m_metadata = None,
+                 m_metadata_file = None,
+                 chunk_frames = 1000,
+                 verbose = True):
+    """
+    filtering.filter_static on the trajectories of upstream.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    ckpt = pmpiv.checkpoint.Checkpoint('static', m_metadata = m_metadata,
+                                       params = ['CHECK_STATIC'],
+                                       upstream = [upstream],
+                                       options = {'chunk_frames' : chunk_frames},
+                                       verbose = verbose)
+
+    if ckpt.is_complete:
+        return ckpt
+
+    df = pmpiv.filtering.filter_static(upstream.read().reset_index(drop = True),
+                                       m_metadata = m_metadata, verbose = verbose)
+
+    ckpt.write(df.reset_index(drop = True), chunk_frames = chunk_frames)
+
+    return ckpt
+
+
+def stage_stubs(upstream,
+                m_metadata = None,
+                m_metadata_file = None,
+                chunk_frames = 1000,
+                verbose = True):
+    """
+    filtering.filter_stubs on the trajectories of upstream.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    ckpt = pmpiv.checkpoint.Checkpoint('stubs', m_metadata = m_metadata,
+                                       params = ['DURATION'],
+                                       upstream = [upstream],
+                                       options = {'chunk_frames' : chunk_frames},
+                                       verbose = verbose)
+
+    if ckpt.is_complete:
+        return ckpt
+
+    df = pmpiv.filtering.filter_stubs(upstream.read().reset_index(drop = True),
+                                      m_metadata = m_metadata, verbose = verbose)
+
+    ckpt.write(df.reset_index(drop = True), chunk_frames = chunk_frames)
+
+    return ckpt
+
+
+def stage_masks(m_metadata = None,
+                m_metadata_file = None,
+                verbose = True):
+    """
+    Rasterize the REMOVAL annotations, the masks are cached
+    in WORKING_DIR (see Annotation_Handler) and reused by stage_removal.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    for f in _json_files(m_metadata):
+        pmpiv.annotations.Annotation_Handler(f, m_metadata = m_metadata, verbose = verbose).annotations2mask()
+
+
+def stage_velocity(upstream,
+                   m_metadata = None,
+                   m_metadata_file = None,
+                   cell_size = 16,
+                   verbose = True):
+    """
+    Velocity statistics (WORKING_DIR/velocity_stats.json), y-mapped velocity
+    profile and 2D velocity field (velocity_field.npz/pdf/png) of the
+    trajectories of upstream.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    ckpt = pmpiv.checkpoint.Checkpoint('velocity', m_metadata = m_metadata,
+                                       params = ['PIXELSIZE', 'FPS', 'IMAGE_WIDTH', 'IMAGE_HEIGHT'],
+                                       upstream = [upstream],
+                                       options = {'cell_size' : cell_size},
+                                       verbose = verbose)
+
+    if ckpt.is_complete:
+        return ckpt
+
+    df = upstream.read(columns = ['frame', 'particle', 'x', 'y']).reset_index(drop = True)
+
+    stats = pmpiv.motion_stats.Motion_Statistics(df, m_metadata = m_metadata, 
+                                                 verbose = verbose).velocity_statistics(lags = [1])
+    _f = os.path.join(m_metadata.WORKING_DIR, 'velocity_stats.json')
+    with open( _f, 'w' ) as f:
+        if verbose:
+            print(f'Writing velocity statistics to {_f}')
+        json.dump({str(k) : {m : {c : float(v) for c, v in d.items()} for m, d in stats[k].items()} 
+                   for k in stats}, f)
+
+    pmpiv.ploting.ymapped_velocity(df, m_metadata = m_metadata, verbose = verbose)
+
+    field = pmpiv.velocity_field.Velocity_Field(m_metadata = m_metadata, cell_size = cell_size, verbose = verbose)
+    field.add_df(df)
+    field.save()
+    field.plot()
+
+    ckpt.complete()
+
+    return ckpt
+
+
+def expand_stages(stages):
+    """
+    List of stage names from a list or a comma separated string, aliases 
+    (e.g. filter) are expanded.
+    """
+    if isinstance(stages, str):
+        stages = [s.strip() for s in stages.split(',') if s.strip()]
+
+    expanded = []
+    for s in stages:
+        for t in ALIASES.get(s, [s]):
+            if t not in STAGES + EXTRA_STAGES:
+                raise ValueError(f'Unknown stage {t}, must be in {STAGES + EXTRA_STAGES + list(ALIASES)}!')
+            if t not in expanded:
+                expanded.append(t)
+
+    return expanded
+
+
+def stage_graph(stages):
+    """
+    Dependencies of the stages: each DataFrame stage reads the previous 
+    requested one (locate is always included, link if trajectories are 
+    needed), removal needs the annotation masks, velocity the last 
+    DataFrame stage.
+
+    Returns dict stage -> list of stages it depends on, the first entry 
+    being the DataFrame input.
+    """
+    stages = expand_stages(stages)
+
+    chain = [s for s in STAGES if s in stages or s == 'locate']
+    if 'link' not in chain and any(s in stages for s in ['static', 'stubs', 'velocity']):
+        chain.insert(1, 'link')
+
+    graph = {}
+    for k in range(len(chain)):
+        graph[chain[k]] = chain[k - 1:k] if k > 0 else []
+
+    if 'masks' in stages or 'removal' in graph:
+        graph['masks'] = []
+    if 'removal' in graph:
+        graph['removal'].append('masks')
+    if 'velocity' in stages:
+        graph['velocity'] = [chain[-1]]
+
+    return graph
+
+
+def run_stage(s,
+              upstream = None,
+              m_metadata = None,
+              m_metadata_file = None,
+              chunk_frames = 1000,
+              processes = 'auto',
+              read_ahead = 0,
+              verbose = True):
+    """
+    Run stage s on the Checkpoint upstream (None for locate and masks).
+
+    read_ahead : image read-ahead of locate, see stage_locate
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    if verbose:
+        print(f'\n### Stage {s}')
+
+    if s == 'masks':
+        return stage_masks(m_metadata = m_metadata, verbose = verbose)
+    elif s == 'locate':
+        return stage_locate(m_metadata = m_metadata, chunk_frames = chunk_frames,
+                            processes = processes, read_ahead = read_ahead, verbose = verbose)
+    elif s == 'link':
+        return stage_link(upstream, m_metadata = m_metadata, chunk_frames = chunk_frames,
+                          processes = processes, verbose = verbose)
+    elif s == 'removal':
+        return stage_removal(upstream, m_metadata = m_metadata, verbose = verbose)
+    elif s == 'static':
+        return stage_static(upstream, m_metadata = m_metadata, chunk_frames = chunk_frames, verbose = verbose)
+    elif s == 'stubs':
+        return stage_stubs(upstream, m_metadata = m_metadata, chunk_frames = chunk_frames, verbose = verbose)
+    elif s == 'velocity':
+        return stage_velocity(upstream, m_metadata = m_metadata, verbose = verbose)
+
+    raise ValueError(f'Unknown stage {s}!')
+
+
+def run_stages(m_metadata = None,
+               m_metadata_file = None,
+               stages = STAGES,
+               max_workers = 2,
+               chunk_frames = 1000,
+               processes = 'auto',
+               verbose = True):
+    """
+    Run the stage graph (see stage_graph): stages start as soon as the 
+    stages they depend on are finished, independent stages (e.g. masks and 
+    locate) run concurrently in up to max_workers threads. The heavy parts 
+    of the stages run in numpy or in the process pools of tp.batch.
+
+    Returns dict stage -> Checkpoint (None for masks).
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    graph = stage_graph(stages)
+
+    results = {}
+    pending = dict(graph)
+    running = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = max(1, int(max_workers))) as pool:
+        while pending or running:
+            for s in list(pending):
+                if all(d in results for d in pending[s]):
+                    upstream = results[graph[s][0]] if graph[s] else None
+                    running[pool.submit(run_stage, s, upstream, m_metadata = m_metadata,
+                                        chunk_frames = chunk_frames, processes = processes,
+                                        verbose = verbose)] = s
+                    del pending[s]
+
+            done, _ = concurrent.futures.wait(running, return_when = concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                # re-raises the exception of a failed stage
+                results[running.pop(future)] = future.result()
+
+    return results
+
+
+def run_pipeline(m_metadata = None,
+                 m_metadata_file = None,
+                 stages = STAGES,
+                 max_workers = 2,
+                 chunk_frames = 1000,
+                 processes = 'auto',
+                 verbose = True):
+    """
+    Run the given stages (see run_stages) with checkpoints in 
+    WORKING_DIR/checkpoints. Stages with unchanged parameters and inputs
+    are read from their checkpoints, interrupted stages resume.
+
+    Returns the DataFrame of the last DataFrame stage.
+    """
+
+    results = run_stages(m_metadata = m_metadata, 
+                         m_metadata_file = m_metadata_file, 
+                         stages = stages, 
+                         max_workers = max_workers, 
+                         chunk_frames = chunk_frames, 
+                         processes = processes, 
+                         verbose = verbose)
+
+    last = [s for s in STAGES if s in results][-1]
+
+    return results[last].read()
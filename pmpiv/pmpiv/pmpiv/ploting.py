@@ -47,12 +47,22 @@ def trajectory( df,
     plt.clf()
 
 
-def ymapped_velocity(df, 
+def velocity_profile(profiles, 
                      m_metadata = None, 
                      m_metadata_file = None, 
                      figsize = [np.float64(43.52), np.float64(32.571999999999996)],
-                     fn = str('mapped_vel'),
+                     fn = str('velocity_profile'),
+                     window = None, 
+                     show_std = False, 
                      verbose = True):
+    """
+    Plot profiles from Motion_Statistics.velocity_profile().
+
+    profiles : one profile dict or dict label -> profile (e.g. one per 
+               annotation region)
+    window   : moving average over window non-empty bins
+    show_std : shade mean +- std
+    """
 
     # check if metadata is avail
     try:
@@ -60,42 +70,65 @@ def ymapped_velocity(df,
     except:
         raise FileNotFoundError('Metadata information not available!')
 
+    if 'mean' in profiles:
+        profiles = {None : profiles}
 
-    total_vel = pmpiv.motion_stats.Motion_Statistics(df, m_metadata = m_metadata)
-
-    # y-positions, x velocities
-    ys = []
-    vx = []
-
-    # get list of all frames
-    all_frames = np.unique((df['frame']).to_numpy())
-
-    for i in range(all_frames.shape[0]-1):
-        tmp_df = total_vel.displacement_2frames(i, i+1)
-        ys += tmp_df['y'].to_list()
-        vx += tmp_df['dx'].to_list()
-
-    # Bin data to get mean per position
-    bins = np.linspace(0, 1913, int(1914))
-    data = np.asarray(ys)
-    digitized = np.digitize(data, bins)
+    fig, ax = plt.subplots(1, 1, figsize = figsize)
 
-    velsx = np.abs(np.asarray(vx))
+    for label, profile in profiles.items():
+        filled  = profile['count'] > 0
+        centers = profile['centers'][filled]
+        mean    = profile['mean'][filled]
+        std     = profile['std'][filled]
 
-    pd_data = pd.DataFrame({'bin': digitized, 'velocity': velsx})
+        if window is not None:
+            mean = pd.Series(mean).rolling(window = window).mean().to_numpy()
+            std  = pd.Series(std).rolling(window = window).mean().to_numpy()
 
-    pd_data = pd_data.loc[pd_data['velocity'] > 0.5]
+        ax.plot(centers, mean, label = label)
+        if show_std:
+            ax.fill_between(centers, mean - std, mean + std, alpha = 0.3)
 
-    means = pd_data.groupby('bin').mean().reset_index()
+    if len(profiles) > 1 or None not in profiles:
+        ax.legend()
 
-    moving_avg = means['velocity'].rolling(window = 30).mean()
+    if verbose:
+        print(f'Writing velocity profile to {m_metadata.WORKING_DIR}/{fn}.pdf/png')
 
-    fig, ax = plt.subplots(1, 1, figsize = figsize)
-    plt.plot(means['bin'].to_numpy(), moving_avg)
     plt.savefig(f'{m_metadata.WORKING_DIR}/{fn}.pdf')
     plt.savefig(f'{m_metadata.WORKING_DIR}/{fn}.png')
     plt.close()
     plt.clf()
 
 
+def ymapped_velocity(df, 
+                     m_metadata = None, 
+                     m_metadata_file = None, 
+                     figsize = [np.float64(43.52), np.float64(32.571999999999996)],
+                     fn = str('mapped_vel'),
+                     verbose = True):
+    """
+    Absolute x-displacement per frame (> 0.5 px) over the y-position, 
+    binned per pixel, moving average over 30 bins.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    total_vel = pmpiv.motion_stats.Motion_Statistics(df, m_metadata = m_metadata)
 
+    profile = total_vel.velocity_profile(axis = 'y', 
+                                         component = 'dx', 
+                                         bin_width = 1.0, 
+                                         absolute = True, 
+                                         min_velocity = 0.5)
+
+    velocity_profile(profile, 
+                     m_metadata = m_metadata, 
+                     figsize = figsize, 
+                     fn = fn, 
+                     window = 30, 
+                     verbose = verbose)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import numpy as np
+import os, glob
+import scipy.ndimage
+
+import pandas as pd
+
+import pims             # https://soft-matter.github.io/pims/v0.6.1/
+import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+
+class Field_Predictor:
+    """
+
+    Predictor for tp.link (predictor = ...) on a binned 2D velocity field
+    u(x, y), v(x, y) [px/frame], e.g. of Velocity_Field. A feature at x, y
+    in frame t is expected at x + u * (t1 - t), y + v * (t1 - t) in frame
+    t1, so the search range only has to cover the deviation from the mean
+    flow. Cells with less than min_count displacements take the velocity of
+    the nearest valid cell.
+
+    The field does not change while linking, so the predictor can be used
+    with parallel_link and the streaming pipeline as well.
+
+    u, v        : arrays (ny, nx) [px/frame], nan for empty cells
+    cell_size   : cell edge length in pixel
+    count       : displacements per cell, default all cells valid
+    pos_columns : position columns of the linker, tp.link uses ['y', 'x']
+
+    """
+
+    def __init__(self, u, v, cell_size, count = None, min_count = 1, pos_columns = ['y', 'x']):
+        u, v = np.asarray(u, dtype = float), np.asarray(v, dtype = float)
+        if u.shape != v.shape or u.ndim != 2:
+            raise ValueError('u and v must be 2D arrays of the same shape!')
+        if cell_size <= 0:
+            raise ValueError('cell_size must be positive!')
+        if sorted(pos_columns) != ['x', 'y']:
+            raise ValueError('pos_columns must be x and y!')
+
+        self.cell_size   = float(cell_size)
+        self.pos_columns = list(pos_columns)
+        self.ny, self.nx = u.shape
+
+        valid = np.isfinite(u) & np.isfinite(v)
+        if count is not None:
+            valid &= np.asarray(count) >= min_count
+        self.n_valid = int(np.count_nonzero(valid))
+
+        if self.n_valid == 0:
+            self.u = np.zeros(u.shape)
+            self.v = np.zeros(v.shape)
+        else:
+            # nearest valid cell for every cell
+            _, (iy, ix) = scipy.ndimage.distance_transform_edt(~valid, return_indices = True)
+            self.u = u[iy, ix]
+            self.v = v[iy, ix]
+
+    @classmethod
+    def from_velocity_field(cls, field, min_count = 5):
+        """
+        Predictor on the field of a Velocity_Field.
+        """
+        f = field.get(si = False)
+        return cls(f['u'], f['v'], field.cell_size, count = f['count'], min_count = min_count)
+
+    @classmethod
+    def from_file(cls, fn, m_metadata = None, m_metadata_file = None, min_count = 5):
+        """
+        Predictor on a field written by Velocity_Field.save() (in m/s unless
+        saved with si = False).
+        """
+
+        # check if metadata is avail
+        try:
+            m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+        except:
+            raise FileNotFoundError('Metadata information not available!')
+
+        with np.load(fn) as f:
+            u, v, count = f['u'], f['v'], f['count']
+            cell_size   = float(f['cell_size'])
+            si          = bool(f['si']) if 'si' in f.files else True
+
+        if si:
+            s = m_metadata.PIXELSIZE * m_metadata.FPS
+            u, v = u / s, v / s
+
+        return cls(u, v, cell_size, count = count, min_count = min_count)
+
+    @classmethod
+    def from_trajectories(cls, df, m_metadata = None, m_metadata_file = None, cell_size = 16, min_count = 5):
+        """
+        Predictor on the displacements of linked trajectories (columns
+        frame, particle, x, y).
+        """
+        field = pmpiv.velocity_field.Velocity_Field(m_metadata = m_metadata, m_metadata_file = m_metadata_file,
+                                                    cell_size = cell_size, verbose = False)
+        field.add_df(df)
+        return cls.from_velocity_field(field, min_count = min_count)
+
+    def velocity(self, x, y):
+        """
+        u, v [px/frame] at the positions x, y [px]. Positions outside of the
+        field take the velocity of the nearest border cell.
+        """
+        ix = np.clip(np.floor(np.asarray(x, dtype = float) / self.cell_size), 0, self.nx - 1).astype(np.int64)
+        iy = np.clip(np.floor(np.asarray(y, dtype = float) / self.cell_size), 0, self.ny - 1).astype(np.int64)
+        return self.u[iy, ix], self.v[iy, ix]
+
+    def predict(self, t1, particles):
+        """
+        Predicted positions of the trackpy points particles in frame t1, as
+        N x 2 array in the order of pos_columns.
+        """
+        particles = list(particles)
+        if len(particles) == 0:
+            return np.empty((0, 2))
+
+        pos = np.array([p.pos for p in particles], dtype = float)
+        t   = np.array([p.t for p in particles], dtype = float)
+        return self.predict_array(t1, pos, t)
+
+    # the array linker (tp.link(..., engine = 'array')) calls predict_array
+    predict.from_arrays = True
+
+    def predict_array(self, t1, positions, times):
+        """
+        Predicted positions in frame t1 of the positions (N x 2 array in the
+        order of pos_columns) observed in the frames times.
+        """
+        pos = np.array(positions, dtype = float)
+        dt  = t1 - np.asarray(times, dtype = float)
+
+        ix, iy = self.pos_columns.index('x'), self.pos_columns.index('y')
+        u, v = self.velocity(pos[:, ix], pos[:, iy])
+
+        pos[:, ix] += u * dt
+        pos[:, iy] += v * dt
+        return pos
+
+    __call__ = predict
+
+
+def _learn(df, m_metadata, learn_frames, cell_size, min_count, verbose):
+    """
+    Link the first learn_frames frames with MAX_PARTICLE_SPEED and bin the
+    displacements of trajectories of at least DURATION frames.
+    """
+    first = df['frame'].min()
+    part  = df[df['frame'] < first + learn_frames]
+
+    if verbose:
+        print(f'Learn the velocity field from frames {first} to {first + learn_frames - 1}.')
+
+    linked = tp.link(part, m_metadata.MAX_PARTICLE_SPEED, memory = m_metadata.MEMORY, engine = 'array')
+    linked = tp.filter_stubs(linked, m_metadata.DURATION).reset_index(drop = True)
+    return Field_Predictor.from_trajectories(linked, m_metadata = m_metadata, cell_size = cell_size,
+                                             min_count = min_count)
+
+
+def _predictor_file(m_metadata):
+    """
+    Velocity field file the predictor is read from (PREDICTOR field or 
+    file), None if it is learned.
+    """
+    mode = m_metadata.PREDICTOR
+    if mode is None or mode == 'learn':
+        return None
+
+    fn = os.path.join(m_metadata.WORKING_DIR, 'velocity_field.npz') if mode == 'field' else mode
+
+    return fn if os.path.isfile(fn) else None
+
+
+def predictor_key(m_metadata = None, m_metadata_file = None):
+    """
+    Checkpoint input of the predictor: the hash of the velocity field file 
+    it is read from, 'learned' if it is learned from the features and None 
+    without PREDICTOR.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    if m_metadata.PREDICTOR is None:
+        return None
+
+    fn = _predictor_file(m_metadata)
+
+    return 'learned' if fn is None else pmpiv.checkpoint.file_hash(fn)
+
+
+def get_predictor(df = None,
+                  m_metadata = None,
+                  m_metadata_file = None,
+                  learn_frames = 200,
+                  cell_size = 16,
+                  min_count = 5,
+                  verbose = True):
+    """
+    Predictor for linking as set by PREDICTOR, None if not set:
+
+    field : velocity field of the previous run (WORKING_DIR/velocity_field.npz),
+            learned as for learn if not available
+    learn : link the first learn_frames frames of df (features) without
+            predictor and bin the displacements
+    file  : velocity field file (.npz, see Velocity_Field.save)
+
+    Without df nothing can be learned, linking is done without predictor.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    if m_metadata.PREDICTOR is None:
+        return None
+
+    fn = _predictor_file(m_metadata)
+    if fn is not None:
+        if verbose:
+            print(f'Predict with the velocity field {fn}')
+        predictor = Field_Predictor.from_file(fn, m_metadata = m_metadata, min_count = min_count)
+    elif df is not None and len(df) > 0:
+        predictor = _learn(df, m_metadata, learn_frames, cell_size, min_count, verbose)
+    else:
+        if verbose:
+            print('No velocity field to learn the predictor from, link without predictor.')
+        return None
+
+    if predictor.n_valid == 0:
+        if verbose:
+            print('Velocity field is empty, link without predictor.')
+        return None
+
+    return predictor
+
+
+def search_range(predictor, m_metadata = None, m_metadata_file = None):
+    """
+    Search range for linking: PREDICTOR_RANGE with predictor (if set),
+    else MAX_PARTICLE_SPEED.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    if predictor is not None and m_metadata.PREDICTOR_RANGE is not None:
+        return m_metadata.PREDICTOR_RANGE
+    return m_metadata.MAX_PARTICLE_SPEED
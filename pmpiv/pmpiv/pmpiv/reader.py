@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import numpy as np
+import os, glob
+import time
+import threading
+import collections
+import concurrent.futures
+
+import pandas as pd
+
+import pims             # https://soft-matter.github.io/pims/v0.6.1/
+import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+
+class Frame_Cache:
+    """
+
+    LRU cache of decoded frames of a reader (e.g. pims.ImageSequence),
+    bounded by max_bytes. Sequential access (i, i + 1, ...) starts
+    background threads that decode the next read_ahead frames. Counts
+    hits, misses, prefetched frames and the decode time.
+
+    Shared by all Cached_Sequence views (slices) of the same reader.
+
+    """
+
+    def __init__(self, reader, max_bytes = 2**30, read_ahead = 8, threads = 2):
+        self.reader     = reader
+        self.max_bytes  = int(max_bytes)
+        self.read_ahead = int(read_ahead)
+        self.threads    = max(1, int(threads))
+
+        self._frames    = collections.OrderedDict()
+        self._in_flight = {}
+        self._nbytes    = 0
+        self._last      = None
+        self._pool      = None
+        self._lock      = threading.Lock()
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        """
+        self.stats = {'hits'           : 0,
+                      'misses'         : 0,
+                      'prefetched'     : 0,
+                      'decoded'        : 0,
+                      'decode_seconds' : 0.0,
+                      'evicted'        : 0}
+
+    def info(self):
+        """
+        Counters and the current size of the cache.
+        """
+        with self._lock:
+            info = dict(self.stats)
+            info['cached_frames'] = len(self._frames)
+            info['cached_bytes']  = self._nbytes
+        return info
+
+    def __len__(self):
+        return len(self.reader)
+
+    def __getstate__(self):
+        # workers get the reader only, cache and threads stay in this
+        # process; copies in workers decode on access, as the plain reader
+        return {'reader' : self.reader, 'max_bytes' : 0,
+                'read_ahead' : 0, 'threads' : self.threads}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _decode(self, i):
+        """
+        """
+        t = time.perf_counter()
+        frame = self.reader[i]
+        dt = time.perf_counter() - t
+        with self._lock:
+            self.stats['decoded'] += 1
+            self.stats['decode_seconds'] += dt
+        return frame
+
+    def _store(self, i, frame):
+        """
+        Insert and evict the least recently used frames (lock held).
+        """
+        if i in self._frames:
+            return
+        size = getattr(frame, 'nbytes', 0)
+        if size > self.max_bytes:
+            return
+        self._frames[i] = frame
+        self._nbytes += size
+        while self._nbytes > self.max_bytes:
+            _, old = self._frames.popitem(last = False)
+            self._nbytes -= getattr(old, 'nbytes', 0)
+            self.stats['evicted'] += 1
+
+    def _prefetch(self, i):
+        """
+        """
+        frame = self._decode(i)
+        with self._lock:
+            self._store(i, frame)
+            self._in_flight.pop(i, None)
+            self.stats['prefetched'] += 1
+        return frame
+
+    def _schedule(self, start):
+        """
+        Decode the next read_ahead frames in the background (lock held).
+        """
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(max_workers = self.threads)
+        for j in range(start, min(start + self.read_ahead, len(self.reader))):
+            if j not in self._frames and j not in self._in_flight:
+                self._in_flight[j] = self._pool.submit(self._prefetch, j)
+
+    def get(self, i):
+        """
+        Frame i of the reader.
+        """
+        with self._lock:
+            sequential = self._last is not None and i == self._last + 1
+            self._last = i
+
+            if self.read_ahead > 0 and sequential:
+                self._schedule(i + 1)
+
+            if i in self._frames:
+                self._frames.move_to_end(i)
+                self.stats['hits'] += 1
+                return self._frames[i]
+
+            future = self._in_flight.get(i)
+            self.stats['misses' if future is None else 'hits'] += 1
+
+        if future is not None:
+            return future.result()
+
+        frame = self._decode(i)
+        with self._lock:
+            self._store(i, frame)
+        return frame
+
+    def clear(self):
+        """
+        """
+        with self._lock:
+            self._frames.clear()
+            self._nbytes = 0
+
+    def close(self):
+        """
+        Stop the read-ahead threads.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait = True)
+            self._pool = None
+
+
+class Cached_Sequence:
+    """
+
+    Image sequence on top of a Frame_Cache. Supports len, iteration,
+    integer indexing and slicing (views share the cache), so it can be used
+    wherever the pims sequence is used (tp.batch, Frame_Executor, plots).
+
+    """
+
+    def __init__(self, cache, indices = None):
+        if not isinstance(cache, Frame_Cache):
+            cache = Frame_Cache(cache)
+        self.cache   = cache
+        self.indices = np.arange(len(cache)) if indices is None else np.asarray(indices, dtype = np.int64)
+
+    def __len__(self):
+        return self.indices.shape[0]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice) or isinstance(key, (list, np.ndarray)):
+            return Cached_Sequence(self.cache, self.indices[key])
+        return self.cache.get(int(self.indices[key]))
+
+    @property
+    def frame_shape(self):
+        return self.reader.frame_shape
+
+    @property
+    def reader(self):
+        return self.cache.reader
+
+    def cache_info(self):
+        """
+        Counters of the shared cache, see Frame_Cache.info().
+        """
+        return self.cache.info()
+
+
+def worker_readable(frames):
+    """
+    True if frames can be sent to worker processes which read the frames
+    themselves (tp.batch(worker_reader = True)).
+    """
+    return isinstance(frames, (Cached_Sequence, pmpiv.stack.Frame_Stack, pims.FramesSequence))
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import numpy as np
+import os, glob
+import matplotlib as mpl
+import concurrent.futures
+import threading
+import queue
+import cv2
+import tifffile
+
+import pandas as pd
+from PIL import Image
+
+import pims             # https://soft-matter.github.io/pims/v0.6.1/
+import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+
+def ring_stamp(radius, width = 2):
+    """
+    Pixel offsets (dy, dx) of a ring with outer radius radius and the given
+    line width, computed once and reused for all markers.
+    """
+    r = int(np.ceil(radius))
+    dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+    d = np.sqrt(dx**2 + dy**2)
+    ring = (d <= radius) & (d > radius - width)
+    return dy[ring], dx[ring]
+
+
+def group_by_frame(df, columns = ['x', 'y']):
+    """
+    Sort the features by frame once, returns dict frame -> array of the
+    columns (n, len(columns)).
+    """
+    if len(df) == 0:
+        return {}
+    frames = df['frame'].to_numpy()
+    order  = np.argsort(frames, kind = 'stable')
+    values = df[columns].to_numpy(dtype = float)[order]
+    frames = frames[order]
+    unique, start = np.unique(frames, return_index = True)
+    return dict(zip(unique.tolist(), np.split(values, start[1:])))
+
+
+def to_rgb(image, invert = False):
+    """
+    Gray image scaled to its min/max (as imshow) as uint8 RGB array.
+    """
+    image = np.asarray(image)
+    if image.ndim == 3:
+        image = image[..., :3].mean(axis = 2)
+    image = image.astype(np.float32)
+    lo, hi = float(image.min()), float(image.max())
+    scaled = (image - lo) * (255.0 / (hi - lo)) if hi > lo else np.zeros_like(image)
+    if invert:
+        scaled = 255.0 - scaled
+    gray = scaled.astype(np.uint8)
+    return np.repeat(gray[:, :, None], 3, axis = 2)
+
+
+def draw_markers(rgb, xy, color = 'red', stamp = None):
+    """
+    Draw the stamp (default ring_stamp(7)) at all positions xy (n, 2) into
+    the RGB array (in place).
+    """
+    if stamp is None:
+        stamp = ring_stamp(7)
+    if xy is None or len(xy) == 0:
+        return rgb
+
+    dy, dx = stamp
+    yy = np.rint(xy[:, 1]).astype(np.int64)[:, None] + dy[None, :]
+    xx = np.rint(xy[:, 0]).astype(np.int64)[:, None] + dx[None, :]
+    inside = (yy >= 0) & (yy < rgb.shape[0]) & (xx >= 0) & (xx < rgb.shape[1])
+
+    rgb[yy[inside], xx[inside]] = np.round(np.asarray(mpl.colors.to_rgb(color)) * 255).astype(np.uint8)
+
+    return rgb
+
+
+def draw_lines(rgb, p0, p1, color = 'red'):
+    """
+    Draw the line segments p0[k] -> p1[k] (arrays (n, 2) of x, y) into the 
+    RGB array (in place), all segments sampled at once.
+    """
+    if len(p0) == 0:
+        return rgb
+
+    n = np.ceil(np.abs(p1 - p0).max(axis = 1)).astype(np.int64) + 1
+    seg = np.repeat(np.arange(len(n)), n)
+    t = (np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)) / np.maximum(np.repeat(n, n) - 1, 1)
+
+    xy = p0[seg] + (p1[seg] - p0[seg]) * t[:, None]
+    xx = np.rint(xy[:, 0]).astype(np.int64)
+    yy = np.rint(xy[:, 1]).astype(np.int64)
+    inside = (yy >= 0) & (yy < rgb.shape[0]) & (xx >= 0) & (xx < rgb.shape[1])
+
+    rgb[yy[inside], xx[inside]] = np.round(np.asarray(mpl.colors.to_rgb(color)) * 255).astype(np.uint8)
+
+    return rgb
+
+
+class _Tracks:
+    """
+    Trajectories sorted by frame to get the tails of the last frames.
+    """
+
+    def __init__(self, df):
+        order = np.argsort(df['frame'].to_numpy(), kind = 'stable')
+        self.frame    = df['frame'].to_numpy()[order]
+        self.particle = df['particle'].to_numpy()[order]
+        self.xy       = df[['x', 'y']].to_numpy(dtype = float)[order]
+
+    def segments(self, frame, tail):
+        """
+        Start and end points of the trajectory segments in the frames
+        frame - tail ... frame.
+        """
+        a = np.searchsorted(self.frame, frame - tail, side = 'left')
+        b = np.searchsorted(self.frame, frame, side = 'right')
+
+        # by particle and frame within the window
+        order = np.lexsort((self.frame[a:b], self.particle[a:b]))
+        particle = self.particle[a:b][order]
+        xy = self.xy[a:b][order]
+
+        same = particle[1:] == particle[:-1]
+        return xy[:-1][same], xy[1:][same]
+
+
+class Overlay_Renderer:
+    """
+
+    Draw features of one or several DataFrames as circle markers directly
+    into RGB arrays, without matplotlib figures. The features are grouped
+    by frame once; several DataFrames are rendered side by side (e.g. the
+    red/blue comparison of plot_compare_annotated_tiffs).
+
+    dfs    : list of DataFrames with columns frame, x, y
+    colors : list of matplotlib colors, one per DataFrame
+    radius : marker radius in pixel, default FEATURE_SIZE of the metadata
+    width  : line width of the markers in pixel
+    tail   : draw the trajectories of the last tail frames (requires the 
+             column particle)
+
+    """
+
+    def __init__(self,
+                 dfs,
+                 colors = ['red', 'blue'],
+                 radius = None,
+                 width = 2,
+                 tail = 0,
+                 m_metadata = None,
+                 m_metadata_file = None):
+
+        # check if metadata is avail
+        try:
+            self.m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+        except:
+            raise FileNotFoundError('Metadata information not available!')
+
+        if len(colors) < len(dfs):
+            raise ValueError('One color per DataFrame required!')
+
+        if radius is None:
+            radius = max(3, self.m_metadata.FEATURE_SIZE)
+
+        self.colors  = list(colors)[:len(dfs)]
+        self.stamp   = ring_stamp(radius, width)
+        self.grouped = [group_by_frame(df) for df in dfs]
+
+        self.tail   = int(tail)
+        self.tracks = [_Tracks(df) if self.tail > 0 and 'particle' in df.columns else None for df in dfs]
+
+    def frames(self):
+        """
+        Sorted list of all frames with features.
+        """
+        return sorted(set().union(*[g.keys() for g in self.grouped]))
+
+    def render(self, image, frame):
+        """
+        Returns the annotated RGB uint8 array of frame, panels side by side.
+        """
+        base   = to_rgb(image)
+        panels = []
+        for g, tracks, color in zip(self.grouped, self.tracks, self.colors):
+            rgb = base.copy()
+            if tracks is not None:
+                draw_lines(rgb, *tracks.segments(frame, self.tail), color = color)
+            panels.append(draw_markers(rgb, g.get(frame), color = color, stamp = self.stamp))
+        return panels[0] if len(panels) == 1 else np.concatenate(panels, axis = 1)
+
+
+def _save(rgb, fn):
+    """
+    """
+    Image.fromarray(rgb).save(fn)
+
+
+def write_annotated(image_sequence,
+                    renderer,
+                    outfolder,
+                    ext = 'tif',
+                    frames = None,
+                    threads = None,
+                    verbose = True):
+    """
+    Render all frames of renderer (or the given frames) and write them to
+    outfolder/frame_<frame>.<ext>. Frames are read, rendered and encoded in
+    a thread pool; at most 2 * threads frames are in flight.
+
+    image_sequence : indexable sequence of frames (frame number = index)
+    """
+    if frames is None:
+        frames = renderer.frames()
+    if threads is None:
+        threads = max(1, min(8, os.cpu_count() or 1))
+
+    os.makedirs(outfolder, exist_ok = True)
+    if verbose: print(f'Create folder if not existing: {outfolder}')
+
+    def _task(f):
+        _save(renderer.render(image_sequence[f], f), f'{outfolder}/frame_{f:06d}.{ext}')
+
+    n = len(frames)
+    step = max(1, n // 10)
+    with concurrent.futures.ThreadPoolExecutor(max_workers = threads) as pool:
+        in_flight = []
+        for k, f in enumerate(frames, start = 1):
+            in_flight.append(pool.submit(_task, f))
+            if len(in_flight) >= 2 * threads:
+                in_flight.pop(0).result()
+            if verbose and (k % step == 0 or k == n):
+                print(f'Save {ext} {k:06d} from {n:06d}.')
+        for fut in in_flight:
+            fut.result()
+
+
+def _render_queue(image_sequence, renderer, frames, threads, queue_size):
+    """
+    Producer: renders the frames in a thread pool and puts the futures in
+    order into a bounded queue, so at most queue_size frames are held in
+    memory. None marks the end (also if the producer fails). Setting the 
+    returned event stops the producer, also while it waits for the queue.
+    """
+    q = queue.Queue(maxsize = queue_size)
+    cancel = threading.Event()
+
+    def _put(item):
+        while not cancel.is_set():
+            try:
+                q.put(item, timeout = 0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce():
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers = threads) as pool:
+                for f in frames:
+                    future = pool.submit(lambda f: renderer.render(image_sequence[f], f), f)
+                    if not _put(future):
+                        future.cancel()
+                        break
+        finally:
+            _put(None)
+
+    producer = threading.Thread(target = _produce, daemon = True)
+    producer.start()
+
+    return q, producer, cancel
+
+
+def export_annotated(image_sequence,
+                     renderer,
+                     fn,
+                     frames = None,
+                     fps = 25,
+                     codec = None,
+                     threads = None,
+                     queue_size = 16,
+                     verbose = True):
+    """
+    Stream the annotated frames into one file instead of one file per 
+    frame: a multipage (Big)TIFF for .tif/.tiff, a video (cv2.VideoWriter)
+    for .mp4/.avi. Frames are rendered by a thread pool ahead of the writer
+    through a bounded queue, memory use does not grow with the sequence 
+    length.
+
+    fps   : frame rate of the video
+    codec : fourcc of the video, default mp4v (.mp4) or MJPG (.avi)
+    """
+    if frames is None:
+        frames = renderer.frames()
+    if threads is None:
+        threads = max(1, min(8, os.cpu_count() or 1))
+
+    ext = os.path.splitext(fn)[1].lower()
+    if ext not in ['.tif', '.tiff', '.mp4', '.avi']:
+        raise ValueError('File format must be in [.tif, .tiff, .mp4, .avi]!')
+
+    folder = os.path.dirname(fn)
+    if folder:
+        os.makedirs(folder, exist_ok = True)
+
+    q, producer, cancel = _render_queue(image_sequence, renderer, frames, threads, max(1, int(queue_size)))
+
+    writer = None
+    n = len(frames)
+    step = max(1, n // 10)
+    k = 0
+
+    try:
+        while True:
+            item = q.get()
+            if item is None:
+                break
+            rgb = item.result()
+
+            if writer is None:
+                if ext in ['.tif', '.tiff']:
+                    writer = tifffile.TiffWriter(fn, bigtiff = True)
+                else:
+                    if codec is None:
+                        codec = 'mp4v' if ext == '.mp4' else 'MJPG'
+                    writer = cv2.VideoWriter(fn, cv2.VideoWriter_fourcc(*codec), float(fps),
+                                             (rgb.shape[1], rgb.shape[0]))
+                    if not writer.isOpened():
+                        raise IOError(f'Can not open video writer for {fn} with codec {codec}!')
+
+            if ext in ['.tif', '.tiff']:
+                writer.write(rgb, photometric = 'rgb')
+            else:
+                writer.write(np.ascontiguousarray(rgb[:, :, ::-1]))
+
+            k += 1
+            if verbose and (k % step == 0 or k == n):
+                print(f'Export frame {k:06d} from {n:06d} to {fn}.')
+    finally:
+        # stop the producer and drop the frames it rendered ahead
+        cancel.set()
+        while True:
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item.cancel()
+        producer.join()
+
+        if writer is not None:
+            if ext in ['.tif', '.tiff']:
+                writer.close()
+            else:
+                writer.release()
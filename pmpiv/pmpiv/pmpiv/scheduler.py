@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import numpy as np
+import os, glob
+import json
+import time
+import traceback
+import multiprocessing
+import concurrent.futures
+
+import pandas as pd
+
+import pims             # https://soft-matter.github.io/pims/v0.6.1/
+import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+# Resource class of the stages
+#   io       : reading/rasterizing annotations, uses an I/O slot and no core
+#              of the budget, runs alongside the CPU bound stages
+#   parallel : locates frames / links time patches in a process pool, the
+#              free cores are split between the ready parallel stages (at
+#              least one each)
+#   serial   : single core
+STAGE_KIND = {'masks'    : 'io',
+              'locate'   : 'parallel',
+              'link'     : 'parallel',
+              'removal'  : 'serial',
+              'static'   : 'serial',
+              'stubs'    : 'serial',
+              'velocity' : 'serial'}
+
+# Stages that read images. With a free I/O slot the images are decoded by
+# read-ahead threads on that slot (pipeline.stage_locate(read_ahead)),
+# READ_AHEAD frames per core, otherwise by the worker processes (by the
+# stage thread itself if the stage has one core, see stage_locate).
+STAGE_READS = ['locate']
+READ_AHEAD  = 2
+
+
+class _Experiment:
+    """
+    Stage graph and state of one parameter file.
+    """
+
+    def __init__(self, infile, stages):
+        self.infile   = infile
+        self.md       = pmpiv.metadata.Metadata(infile)
+        self.graph    = pmpiv.pipeline.stage_graph(stages)
+        self.pending  = dict(self.graph)
+        self.results  = {}
+        self.timing   = {}
+        self.failed   = False
+        self.start    = time.time()
+
+    def ready(self):
+        """
+        Stages whose dependencies are finished.
+        """
+        if self.failed:
+            return []
+        return [s for s in self.pending if all(d in self.results for d in self.pending[s])]
+
+    def report(self):
+        """
+        """
+        return {'infile'        : self.infile,
+                'working_dir'   : self.md.WORKING_DIR,
+                'failed'        : self.failed,
+                'total_seconds' : max([t['end'] for t in self.timing.values() if 'end' in t], default = self.start) - self.start,
+                'stages'        : self.timing}
+
+
+def _timed_stage(experiment, s, cores, io, chunk_frames, verbose):
+    """
+    Thread function: run one stage and record its timing.
+    """
+    t = {'kind' : STAGE_KIND[s], 'cores' : cores, 'io' : io, 'start' : time.time()}
+    experiment.timing[s] = t
+
+    upstream = experiment.results[experiment.graph[s][0]] if experiment.graph[s] else None
+    try:
+        result = pmpiv.pipeline.run_stage(s, upstream,
+                                          m_metadata = experiment.md,
+                                          chunk_frames = chunk_frames,
+                                          processes = max(1, cores),
+                                          read_ahead = READ_AHEAD * max(1, cores) if (io and s in STAGE_READS) else 0,
+                                          verbose = verbose)
+        t['status'] = 'done'
+    except Exception:
+        t['status'] = 'failed'
+        t['error']  = traceback.format_exc()
+        result = None
+
+    t['end']     = time.time()
+    t['seconds'] = t['end'] - t['start']
+    return result
+
+
+def run_experiments(infiles,
+                    cores = None,
+                    io_slots = 2,
+                    stages = None,
+                    chunk_frames = 1000,
+                    report = 'timing_report.json',
+                    verbose = True):
+    """
+    Run the stages of several experiments (one parameter file each) with a
+    global core budget.
+
+    Ready stages of all experiments are started in order of the parameter
+    files: I/O stages first (up to io_slots at a time, they do not count
+    against the budget), then serial stages with one core each, then
+    locate and link stages, which split the remaining cores evenly. So the 
+    process pools of concurrent runs never use more than cores processes 
+    together. locate also takes a free I/O slot to decode the images 
+    (STAGE_READS), its cores then only locate.
+
+    A failed stage stops its experiment, the other experiments continue.
+
+    stages : stages of each experiment, see pipeline.stage_graph, default 
+             pipeline.STAGES
+    cores  : core budget, default all cores
+    report : file name of the timing report in WORKING_DIR of each
+             experiment (None: no report)
+
+    Returns dict infile -> timing report (start/end/seconds/cores/status
+    per stage).
+    """
+    if cores is None:
+        cores = multiprocessing.cpu_count()
+    cores = max(1, int(cores))
+
+    if stages is None:
+        stages = pmpiv.pipeline.STAGES
+
+    experiments = [_Experiment(f, stages) for f in infiles]
+
+    free    = cores
+    io_free = max(1, int(io_slots))
+    running = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = cores + io_free) as pool:
+        while any(e.pending and not e.failed for e in experiments) or running:
+
+            ready = [(e, s) for e in experiments for s in e.ready()]
+            n_parallel = len([s for e, s in ready if STAGE_KIND[s] == 'parallel'])
+
+            for kind in ['io', 'serial', 'parallel']:
+                for e, s in ready:
+                    if STAGE_KIND[s] != kind:
+                        continue
+                    io = kind == 'io'
+                    if io:
+                        if io_free == 0:
+                            continue
+                        n = 0
+                    elif free == 0:
+                        continue
+                    elif kind == 'serial':
+                        n = 1
+                    else:
+                        # split the free cores between the waiting parallel stages
+                        n = max(1, free // n_parallel)
+                        n_parallel -= 1
+                        io = s in STAGE_READS and io_free > 0
+                    io_free -= int(io)
+                    free -= n
+                    del e.pending[s]
+                    if verbose:
+                        print(f'\n### {e.infile}: start stage {s} ({kind}, {n} cores{", I/O slot" if io and n > 0 else ""})')
+                    running[pool.submit(_timed_stage, e, s, n, io, chunk_frames, verbose)] = (e, s, n, io)
+
+            if not running:
+                break
+
+            done, _ = concurrent.futures.wait(running, return_when = concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                e, s, n, io = running.pop(future)
+                io_free += int(io)
+                free    += n
+                if e.timing[s]['status'] == 'failed':
+                    e.failed = True
+                    print(f'### {e.infile}: stage {s} failed\n{e.timing[s]["error"]}')
+                else:
+                    e.results[s] = future.result()
+
+    reports = {}
+    for e in experiments:
+        reports[e.infile] = e.report()
+        if report is not None:
+            _f = os.path.join(e.md.WORKING_DIR, report)
+            with open( _f, 'w' ) as f:
+                json.dump(reports[e.infile], f, indent = 1)
+
+    if verbose:
+        print('\n### Timing [s]')
+        for e in experiments:
+            stages_t = ', '.join(f'{s}: {t["seconds"]:.1f} ({t["cores"]})' for s, t in e.timing.items() if 'seconds' in t)
+            state = 'FAILED' if e.failed else 'done'
+            print(f'{e.infile} ({state}, total {reports[e.infile]["total_seconds"]:.1f}): {stages_t}')
+
+    return reports
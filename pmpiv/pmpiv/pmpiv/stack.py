@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import numpy as np
+import os, glob
+import json
+
+import pandas as pd
+
+import pims             # https://soft-matter.github.io/pims/v0.6.1/
+import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+# Files of a frame stack folder
+STACK_INDEX = 'stack.json'
+STACK_DATA  = 'frames.npy'
+
+
+def is_stack(folder):
+    """
+    True if folder holds a complete frame stack (see pack_sequence).
+    """
+    return os.path.isfile(os.path.join(folder, STACK_INDEX)) and os.path.isfile(os.path.join(folder, STACK_DATA))
+
+
+def stack_files(folder):
+    """
+    """
+    return [os.path.join(folder, STACK_INDEX), os.path.join(folder, STACK_DATA)]
+
+
+def _json_safe(metadata):
+    """
+    Entries of the pims frame metadata that can be written to json.
+    """
+    safe = {}
+    for k, v in dict(metadata or {}).items():
+        if isinstance(v, np.generic):
+            v = v.item()
+        if isinstance(v, (str, int, float, bool)) or v is None:
+            safe[str(k)] = v
+    return safe
+
+
+def pack_sequence(m_metadata = None,
+                  m_metadata_file = None,
+                  outfolder = None,
+                  verbose = True):
+    """
+    Convert the tiff files IN_PATH/*IN_FORMAT into one contiguous frame
+    stack outfolder/frames.npy (n_frames, height, width) in the dtype of the
+    images (uint8/uint16) and the index outfolder/stack.json with shape,
+    dtype, the file names and the per-frame metadata (file size, mtime and
+    the tiff metadata given by pims).
+
+    The index is written last, an interrupted run leaves no valid stack.
+    Set IN_PATH to outfolder to read the stack (see Image_Sequence).
+
+    outfolder : default WORKING_DIR/stack
+
+    Returns outfolder.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    if outfolder is None:
+        outfolder = os.path.join(m_metadata.WORKING_DIR, 'stack')
+
+    if len(glob.glob(f'{m_metadata.IN_PATH}/*{m_metadata.IN_FORMAT}')) == 0:
+        raise FileNotFoundError(f'No {m_metadata.IN_FORMAT} files in {m_metadata.IN_PATH}!')
+
+    os.makedirs(outfolder, exist_ok = True)
+    if verbose: print(f'Create folder if not existing: {outfolder}')
+
+    # an old index is invalid as soon as the data is rewritten
+    if os.path.isfile(os.path.join(outfolder, STACK_INDEX)):
+        os.remove(os.path.join(outfolder, STACK_INDEX))
+
+    sequence = pims.ImageSequence(f'{m_metadata.IN_PATH}/*{m_metadata.IN_FORMAT}')
+    # file names in the (natural) order of the frames of pims
+    files = list(sequence._filepaths)
+    first = np.asarray(sequence[0])
+
+    _tmp = os.path.join(outfolder, f'tmp_{os.getpid()}_{STACK_DATA}')
+    data = np.lib.format.open_memmap(_tmp, mode = 'w+', dtype = first.dtype,
+                                     shape = (len(files),) + first.shape)
+
+    metadata = []
+    n = len(files)
+    step = max(1, n // 10)
+    for i, f in enumerate(files):
+        frame = sequence[i]
+        if frame.shape != first.shape or frame.dtype != first.dtype:
+            del data
+            os.remove(_tmp)
+            raise ValueError(f'{f}: shape {frame.shape} {frame.dtype} differs from first frame {first.shape} {first.dtype}!')
+        data[i] = frame
+
+        st = os.stat(f)
+        md = {'file' : os.path.basename(f), 'size' : st.st_size, 'mtime_ns' : st.st_mtime_ns}
+        md.update(_json_safe(getattr(frame, 'metadata', None)))
+        metadata.append(md)
+
+        if verbose and ((i + 1) % step == 0 or i + 1 == n):
+            print(f'Pack frame {i + 1:06d} from {n:06d}.')
+
+    data.flush()
+    del data
+    os.replace(_tmp, os.path.join(outfolder, STACK_DATA))
+
+    index = {'source'   : os.path.abspath(m_metadata.IN_PATH),
+             'format'   : m_metadata.IN_FORMAT,
+             'shape'    : [n] + list(first.shape),
+             'dtype'    : str(first.dtype),
+             'files'    : [m['file'] for m in metadata],
+             'metadata' : metadata}
+    pmpiv.checkpoint._write_json(index, os.path.join(outfolder, STACK_INDEX))
+
+    if verbose:
+        print(f'Packed {n} frames {first.shape} {first.dtype} to {outfolder}')
+
+    return outfolder
+
+
+class Frame_Stack:
+    """
+
+    Read only image sequence on a frame stack (see pack_sequence). The
+    frames are views of the memory mapped file, nothing is decoded or
+    copied; worker processes reopen the map and share the pages of the
+    page cache. Supports len, iteration, integer indexing and slicing like
+    pims.ImageSequence, frames are pims.Frame with frame_no and metadata.
+
+    """
+
+    def __init__(self, folder, indices = None):
+        if not is_stack(folder):
+            raise FileNotFoundError(f'No frame stack in {folder}!')
+
+        self.folder = folder
+        with open(os.path.join(folder, STACK_INDEX), 'r') as fh:
+            self.index = json.load(fh)
+
+        self._data   = np.load(os.path.join(folder, STACK_DATA), mmap_mode = 'r')
+        self.indices = np.arange(self._data.shape[0]) if indices is None else np.asarray(indices, dtype = np.int64)
+
+    def __getstate__(self):
+        # workers open their own memory map
+        return {'folder' : self.folder, 'indices' : self.indices}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __len__(self):
+        return self.indices.shape[0]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice) or isinstance(key, (list, np.ndarray)):
+            return Frame_Stack(self.folder, self.indices[key])
+        j = int(self.indices[key])
+        return pims.Frame(self._data[j], frame_no = j, metadata = self.index['metadata'][j])
+
+    @property
+    def frame_shape(self):
+        return tuple(self._data.shape[1:])
+
+    @property
+    def files(self):
+        """
+        Names of the tiff files of the frames.
+        """
+        return [self.index['files'][j] for j in self.indices]
+
+    def to_array(self):
+        """
+        Frames as one (memory mapped if not sliced) array.
+        """
+        if np.array_equal(self.indices, np.arange(self._data.shape[0])):
+            return self._data
+        return self._data[self.indices]
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import numpy as np
+import os, glob
+import json
+
+import pandas as pd
+
+import pims             # https://soft-matter.github.io/pims/v0.6.1/
+import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+# Trajectory filters of the streaming pipeline, same as the pipeline stages
+FILTERS = ['removal', 'static', 'stubs']
+
+
+class _Trajectory_Extent:
+    """
+    Number of features and bounding box of every trajectory, accumulated
+    chunk by chunk (particle ids of trackpy are 0, 1, 2, ...).
+    """
+
+    def __init__(self):
+        self.count = np.zeros(0, dtype = np.int64)
+        self.lo    = np.zeros((0, 2))
+        self.hi    = np.zeros((0, 2))
+
+    def add(self, df):
+        """
+        """
+        if len(df) == 0:
+            return
+        p  = df['particle'].to_numpy().astype(np.int64)
+        xy = df[['x', 'y']].to_numpy(dtype = float)
+
+        n = int(p.max()) + 1
+        if n > self.count.shape[0]:
+            k = n - self.count.shape[0]
+            self.count = np.concatenate([self.count, np.zeros(k, dtype = np.int64)])
+            self.lo    = np.concatenate([self.lo, np.full((k, 2), np.inf)])
+            self.hi    = np.concatenate([self.hi, np.full((k, 2), -np.inf)])
+
+        np.add.at(self.count, p, 1)
+        np.minimum.at(self.lo, p, xy)
+        np.maximum.at(self.hi, p, xy)
+
+    def keep(self, check_static = None, duration = None):
+        """
+        Boolean array particle -> trajectory passes filter_static
+        (CHECK_STATIC) and filter_stubs (DURATION).
+        """
+        keep = self.count > 0
+        if check_static is not None:
+            keep &= np.all(self.hi - self.lo >= check_static, axis = 1)
+        if duration is not None:
+            keep &= self.count >= duration
+        return keep
+
+
+def _locate_blocks(executor, chunk_frames, frame_chunk, verbose):
+    """
+    Yields the features of one frame at a time. The frames are located in
+    blocks of chunk_frames frames by the executor; frame_chunk records the
+    block of every yielded frame.
+    """
+    n = len(executor)
+    n_chunks = int(np.ceil(n / chunk_frames))
+    for c in range(n_chunks):
+        if verbose:
+            print(f'Locate chunk {c + 1} from {n_chunks}')
+        features = executor.locate(indices = range(c * chunk_frames, min(n, (c + 1) * chunk_frames)))
+        for f, part in features.groupby('frame', sort = True):
+            frame_chunk[f] = c
+            yield part
+
+
+def run_streaming(m_metadata = None,
+                  m_metadata_file = None,
+                  frames = None,
+                  filters = FILTERS,
+                  chunk_frames = 1000,
+                  processes = 'auto',
+                  fuzziness = 0.5,
+                  extraction = False,
+                  cell_size = 16,
+                  verbose = True):
+    """
+    Out-of-core locate -> link -> filter -> velocity pipeline.
+
+    Frames are located in blocks of chunk_frames frames by a process pool
+    (executor.Frame_Executor) and passed frame by frame to the iterative
+    linker (tp.link_df_iter). Every linked chunk is filtered by the
+    annotations (removal) and written to the checkpoint 'stream_linked',
+    so only one chunk of features and the linker memory are held at a
+    time. The trajectory filters (static, stubs) need complete
+    trajectories; their extent is collected from the stored chunks
+    (particle, x, y only), then every chunk is filtered, written to the
+    checkpoint 'stream' and added to the velocity accumulators
+    (velocity_stats.json, velocity_field.npz/pdf/png). The linking
+    diagnostics are written as by the link stage (link_report.json).
+
+    The trajectories and velocity results equal run_pipeline with the
+    stages locate, link, removal, static, stubs and velocity; only the
+    particle numbers may differ, as tp.link numbers the features of a frame
+    in the order of its (unstable) sort by frame.
+
+    frames     : image sequence, default Image_Sequence.subsection_range()
+    filters    : subset of FILTERS
+    processes  : number of processes to locate features
+    extraction : if True, removal also keeps only the features in the
+                 EXTRACTION annotations (see pipeline.stage_removal)
+
+    Returns the Checkpoint 'stream', read() gives the trajectories.
+    """
+
+    # check if metadata is avail
+    try:
+        m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+    except:
+        raise FileNotFoundError('Metadata information not available!')
+
+    for f in filters:
+        if f not in FILTERS:
+            raise ValueError(f'Unknown filter {f}, must be in {FILTERS}!')
+
+    json_files = pmpiv.pipeline._json_files(m_metadata, extraction = extraction) if 'removal' in filters else []
+
+    linked = pmpiv.checkpoint.Checkpoint('stream_linked', m_metadata = m_metadata,
+                                         params = ['IN_PATH', 'IN_FORMAT', 'START_FRAME', 'END_FRAME',
+                                                   'FEATURE_SIZE', 'FEATURE_MIN_SIZE', 'FEATURES_ARE_DARK',
+                                                   'MAX_PARTICLE_SPEED', 'MEMORY', 'PREDICTOR', 'PREDICTOR_RANGE',
+                                                   'REMOVAL'] + (['EXTRACTION'] if extraction else []),
+                                         inputs = dict({'images' : pmpiv.checkpoint.sequence_hash(pmpiv.pipeline._image_files(m_metadata)),
+                                                        'predictor' : pmpiv.predictor.predictor_key(m_metadata = m_metadata)},
+                                                       **{os.path.basename(f) : pmpiv.checkpoint.file_hash(f) for f in json_files}),
+                                         options = {'chunk_frames' : chunk_frames, 'fuzziness' : fuzziness,
+                                                    'removal' : 'removal' in filters, 'extraction' : extraction},
+                                         verbose = verbose)
+
+    ckpt = pmpiv.checkpoint.Checkpoint('stream', m_metadata = m_metadata,
+                                       params = ['CHECK_STATIC', 'DURATION', 'PIXELSIZE', 'FPS',
+                                                 'IMAGE_WIDTH', 'IMAGE_HEIGHT'],
+                                       upstream = [linked],
+                                       options = {'filters' : list(filters), 'cell_size' : cell_size},
+                                       verbose = verbose)
+
+    if ckpt.is_complete:
+        return ckpt
+
+    # locate -> link -> removal, written chunk by chunk -------------------
+    if not linked.is_complete:
+
+        # linking is sequential, an interrupted run starts over
+        for c in linked.chunks():
+            del linked.manifest['chunks'][str(c)]
+
+        if frames is None:
+            image_sequence = pmpiv.image_sequence.Image_Sequence(m_metadata = m_metadata)
+            if not verbose:
+                image_sequence.quiet()
+            frames = image_sequence.subsection_range()
+
+        # features are only known while linking, a predictor is taken from
+        # a velocity field file (PREDICTOR field or file)
+        predictor = pmpiv.predictor.get_predictor(m_metadata = m_metadata, verbose = verbose)
+        search_range = pmpiv.predictor.search_range(predictor, m_metadata = m_metadata)
+
+        diagnostics = tp.linking.LinkDiagnostics(os.path.join(m_metadata.WORKING_DIR, 'link_diagnostics.jsonl'))
+        frame_chunk = {}
+        buffer = []
+
+        def _flush(c):
+            df = pd.concat(buffer).reset_index(drop = True)
+            buffer.clear()
+            if 'removal' in filters:
+                df = pmpiv.filtering.complete_removal(df, m_metadata = m_metadata, verbose = verbose,
+                                                      fuzziness = fuzziness, save = False, combined = True,
+                                                      extraction = extraction)
+            linked.write_chunk(c, df.reset_index(drop = True))
+
+        with pmpiv.executor.Frame_Executor(m_metadata = m_metadata, processes = processes,
+                                           frames = frames, verbose = False) as executor:
+
+            current = None
+            for part in tp.link_df_iter(_locate_blocks(executor, chunk_frames, frame_chunk, verbose),
+                                        search_range, memory = m_metadata.MEMORY, predictor = predictor,
+                                        diagnostics = diagnostics):
+                c = frame_chunk.pop(part['frame'].iloc[0])
+                if current is not None and c != current:
+                    _flush(current)
+                current = c
+                buffer.append(part)
+
+            if current is not None:
+                _flush(current)
+
+        diagnostics.close()
+        pmpiv.linking.link_report(diagnostics, m_metadata = m_metadata, verbose = verbose)
+
+        if len(linked.chunks()) == 0:
+            linked.write_chunk(0, pd.DataFrame(columns = ['y', 'x', 'mass', 'size', 'ecc', 'signal',
+                                                          'raw_mass', 'ep', 'frame', 'particle']))
+        linked.complete()
+
+    # trajectory filters and velocity accumulators ------------------------
+    extent = _Trajectory_Extent()
+    for c in linked.chunks():
+        extent.add(linked.read_chunk(c, columns = ['particle', 'x', 'y']))
+
+    keep = extent.keep(check_static = m_metadata.CHECK_STATIC if 'static' in filters else None,
+                       duration = m_metadata.DURATION if 'stubs' in filters else None)
+    if verbose:
+        print(f'\n### Trajectory filters {[f for f in filters if f != "removal"]}:\n'
+              f'Initial number: {int(np.count_nonzero(extent.count))}\nResulting: {int(np.count_nonzero(keep))}')
+
+    for c in ckpt.chunks():
+        del ckpt.manifest['chunks'][str(c)]
+
+    stream = pmpiv.motion_stats.Displacement_Stream(m_metadata = m_metadata, freq = 1)
+    stats  = pmpiv.motion_stats.Displacement_Accumulator()
+    field  = pmpiv.velocity_field.Velocity_Field(m_metadata = m_metadata, cell_size = cell_size, verbose = False)
+
+    for c in linked.chunks():
+        df = linked.read_chunk(c).reset_index(drop = True)
+        if len(df) > 0:
+            df = df[keep[df['particle'].to_numpy().astype(np.int64)]].reset_index(drop = True)
+        ckpt.write_chunk(c, df)
+
+        disp = stream.add(df)
+        stats.add(disp)
+        if len(disp) > 0:
+            field.add_displacements(disp['x'] + 0.5 * disp['dx'], disp['y'] + 0.5 * disp['dy'],
+                                    disp['dx'], disp['dy'])
+
+    # velocity [m/s] as Motion_Statistics.velocity_statistics(lags = [1])
+    scale = m_metadata.FPS * m_metadata.PIXELSIZE
+    v = stats.get()
+    _f = os.path.join(m_metadata.WORKING_DIR, 'velocity_stats.json')
+    with open( _f, 'w' ) as f:
+        if verbose:
+            print(f'Writing velocity statistics to {_f}')
+        json.dump({'1' : {m : {c : float(v[m][c] * scale) for c in v[m]} for m in ['mean', 'abs_mean', 'max']}}, f)
+
+    field.save()
+    field.plot()
+
+    ckpt.complete()
+
+    return ckpt
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+from __future__ import division, unicode_literals, print_function
+
+import numpy as np
+import os, glob
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+
+import pandas as pd
+
+import pims             # https://soft-matter.github.io/pims/v0.6.1/
+import trackpy as tp    # https://soft-matter.github.io/trackpy/v0.6.1/index.html
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+
+class Velocity_Field:
+    """
+
+    Time averaged 2D velocity field u(x, y), v(x, y) on a regular grid.
+
+    Linked trajectories are added chunk by chunk (add()), only the per cell
+    sums (count, sum and sum of squares of u and v) are kept, so memory is
+    bounded by the grid size and not by the number of trajectories. Chunks
+    must be added in order of frames; the last freq frames of a chunk are
+    kept to connect displacements across the chunk boundary.
+
+    A displacement between frame f and f + freq is assigned to the cell of
+    its midpoint.
+
+    cell_size : cell edge length in pixel
+    extent    : (width, height) of the image in pixel, default IMAGE_WIDTH
+                and IMAGE_HEIGHT of the metadata. If not known the grid
+                grows with the data.
+    freq      : lag in frames of the displacements
+    mask      : image mask (height, width), only displacements with the
+                midpoint at mask > 0 are used, e.g.
+                Annotation_Handler.annotations2mask()
+
+    """
+
+    def __init__(self,
+                 m_metadata = None,
+                 m_metadata_file = None,
+                 cell_size = 16,
+                 extent = None,
+                 freq = 1,
+                 mask = None,
+                 verbose = True):
+
+        # check if metadata is avail
+        try:
+            self.m_metadata = pmpiv.helper._check_metadata(m_metadata, m_metadata_file)
+        except:
+            raise FileNotFoundError('Metadata information not available!')
+
+        if cell_size <= 0:
+            raise ValueError('cell_size must be positive!')
+        if int(freq) < 1:
+            raise ValueError('freq must be a positive integer!')
+
+        self.cell_size = float(cell_size)
+        self.freq      = int(freq)
+        self.mask      = mask
+        self.verbose   = verbose
+
+        if extent is None:
+            extent = (self.m_metadata.IMAGE_WIDTH, self.m_metadata.IMAGE_HEIGHT)
+        if extent[0] is None or extent[1] is None:
+            if mask is not None:
+                extent = (mask.shape[1], mask.shape[0])
+            else:
+                extent = (self.cell_size, self.cell_size)
+            self._grow = True
+        else:
+            self._grow = False
+
+        self.nx = int(np.ceil(extent[0] / self.cell_size))
+        self.ny = int(np.ceil(extent[1] / self.cell_size))
+
+        # per cell sums, layout (ny, nx) as the images
+        self._sums = np.zeros((5, self.ny, self.nx), dtype = np.float64)
+
+        self._stream = pmpiv.motion_stats.Displacement_Stream(m_metadata = self.m_metadata, freq = self.freq)
+        self.n_displacements = 0
+
+
+    def quiet(self):
+        self.verbose = False
+
+
+    def _resize(self, nx, ny):
+        """
+        """
+        if nx <= self.nx and ny <= self.ny:
+            return
+        nx, ny = max(nx, self.nx), max(ny, self.ny)
+        sums = np.zeros((5, ny, nx), dtype = np.float64)
+        sums[:, :self.ny, :self.nx] = self._sums
+        self._sums, self.nx, self.ny = sums, nx, ny
+
+
+    def add_displacements(self, x, y, dx, dy):
+        """
+        Add displacements [px] at the positions x, y [px] to the grid.
+        """
+        x, y   = np.asarray(x, dtype = float), np.asarray(y, dtype = float)
+        dx, dy = np.asarray(dx, dtype = float), np.asarray(dy, dtype = float)
+
+        keep = np.isfinite(x) & np.isfinite(y) & np.isfinite(dx) & np.isfinite(dy)
+        if self.mask is not None:
+            keep &= pmpiv.filtering._lookup_mask(self.mask, x, y) > 0
+
+        ix = np.floor(x / self.cell_size).astype(np.int64)
+        iy = np.floor(y / self.cell_size).astype(np.int64)
+        keep &= (ix >= 0) & (iy >= 0)
+
+        if self._grow and keep.any():
+            self._resize(int(ix[keep].max()) + 1, int(iy[keep].max()) + 1)
+        keep &= (ix < self.nx) & (iy < self.ny)
+
+        cell = (iy * self.nx + ix)[keep]
+        dx, dy = dx[keep], dy[keep]
+        n = self.nx * self.ny
+
+        for k, w in enumerate([None, dx, dy, dx**2, dy**2]):
+            self._sums[k] += np.bincount(cell, weights = w, minlength = n).reshape(self.ny, self.nx)
+
+        self.n_displacements += int(cell.shape[0])
+
+
+    def add(self, df):
+        """
+        Add a chunk of linked trajectories (columns frame, particle, x, y).
+        """
+        disp = self._stream.add(df)
+        if len(disp) == 0:
+            return
+
+        self.add_displacements(disp['x'] + 0.5 * disp['dx'],
+                               disp['y'] + 0.5 * disp['dy'],
+                               disp['dx'], disp['dy'])
+
+        if self.verbose:
+            print(f'Velocity field: {self.n_displacements} displacements up to frame {self._stream.last_frame}.')
+
+
+    def add_df(self, df, chunk_frames = 1000):
+        """
+        Add a complete DataFrame in chunks of chunk_frames frames.
+        """
+        frames = df['frame'].to_numpy()
+        chunk  = (frames - frames.min()) // chunk_frames if frames.shape[0] > 0 else frames
+        for _, part in df.groupby(chunk, sort = True):
+            self.add(part)
+
+
+    def merge(self, other):
+        """
+        Add the sums of another Velocity_Field with the same grid, e.g. of
+        another frame range or experiment.
+        """
+        if other.cell_size != self.cell_size or other.freq != self.freq:
+            raise ValueError('Velocity fields must have the same cell_size and freq!')
+        self._resize(other.nx, other.ny)
+        self._sums[:, :other.ny, :other.nx] += other._sums
+        self.n_displacements += other.n_displacements
+
+
+    def get(self, si = True):
+        """
+        Returns dict with x, y (cell centers), count, u, v, var_u, var_v
+        as arrays of shape (ny, nx). Empty cells are nan.
+
+        si : positions in m and velocities in m/s, else px and px/frame
+        """
+        count, su, sv, suu, svv = self._sums
+
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            u = np.where(count > 0, su / count, np.nan)
+            v = np.where(count > 0, sv / count, np.nan)
+            var_u = np.where(count > 1, (suu - count * u**2) / (count - 1), np.nan)
+            var_v = np.where(count > 1, (svv - count * v**2) / (count - 1), np.nan)
+
+        var_u = np.maximum(var_u, 0.0)
+        var_v = np.maximum(var_v, 0.0)
+
+        u, v = u / self.freq, v / self.freq
+        var_u, var_v = var_u / self.freq**2, var_v / self.freq**2
+
+        x = (np.arange(self.nx) + 0.5) * self.cell_size
+        y = (np.arange(self.ny) + 0.5) * self.cell_size
+        x, y = np.meshgrid(x, y)
+
+        if si:
+            l = self.m_metadata.PIXELSIZE
+            s = self.m_metadata.PIXELSIZE * self.m_metadata.FPS
+            x, y, u, v = x * l, y * l, u * s, v * s
+            var_u, var_v = var_u * s**2, var_v * s**2
+
+        return {'x' : x, 'y' : y, 'count' : count.astype(np.int64),
+                'u' : u, 'v' : v, 'var_u' : var_u, 'var_v' : var_v}
+
+
+    def save(self, fn = str('velocity_field'), si = True):
+        """
+        Write the field to WORKING_DIR/fn.npz.
+        """
+        _f = os.path.join(self.m_metadata.WORKING_DIR, f'{fn}.npz')
+        if self.verbose:
+            print(f'Writing velocity field to {_f}')
+        np.savez_compressed(_f, cell_size = self.cell_size, freq = self.freq, si = si, **self.get(si = si))
+
+
+    def plot(self, fn = str('velocity_field'), figsize = None, min_count = 1):
+        """
+        Magnitude and direction of the field, saved to WORKING_DIR/fn.pdf/png.
+        """
+        field = self.get(si = True)
+        valid = field['count'] >= min_count
+        u = np.where(valid, field['u'], np.nan)
+        v = np.where(valid, field['v'], np.nan)
+
+        fig, ax = plt.subplots(1, 1, figsize = figsize)
+        image = ax.pcolormesh(field['x'], field['y'], np.sqrt(u**2 + v**2), shading = 'auto')
+        ax.quiver(field['x'], field['y'], u, v)
+        ax.set_aspect('equal')
+        ax.invert_yaxis()
+        fig.colorbar(image, ax = ax, label = 'velocity [m/s]')
+        plt.savefig(f'{self.m_metadata.WORKING_DIR}/{fn}.pdf')
+        plt.savefig(f'{self.m_metadata.WORKING_DIR}/{fn}.png')
+        plt.close()
+        plt.clf()
@@ -1,5 +1,6 @@
 import warnings
 import logging
+from collections import deque
 from functools import partial
 
 import numpy as np
@@ -459,8 +460,35 @@ def locate(raw_image, diameter, minmass=None, maxsize=None, separation=None,
     return refined_coords
 
 
+# Frames of the current worker process, see `batch(worker_reader=True)`
+_worker_frames = None
+
+
+def _set_worker_frames(frames):
+    global _worker_frames
+    _worker_frames = frames
+
+
+def _locate_index(i, frames=None, **kwargs):
+    """Read frame i from frames, by default the frames of this worker
+    process, and locate. The frame number is returned with the features, as
+    the worker has the image."""
+    if frames is None:
+        frames = _worker_frames
+    image = frames[i]
+    return getattr(image, 'frame_no', None), locate(image, **kwargs)
+
+
+def _iter_frame_no(frames, frame_nos):
+    """Yield the images of frames and record their frame numbers, so they
+    need not be read again after locating."""
+    for image in frames:
+        frame_nos.append(getattr(image, 'frame_no', None))
+        yield image
+
+
 def batch(frames, diameter, output=None, meta=None, processes='auto',
-          after_locate=None, **kwargs):
+          after_locate=None, worker_reader=False, **kwargs):
     """Locate Gaussian-like blobs of some approximate size in a set of images.
 
     Preprocess the image by performing a band pass and a threshold.
@@ -497,6 +525,13 @@ def batch(frames, diameter, output=None, meta=None, processes='auto',
         - ``features``: a DataFrame containing the detected features.
 
         Furthermore it must return a DataFrame like ``features``.
+    worker_reader : boolean
+        If True, `frames` is sent once to every worker process, which reads
+        its frames itself; only frame numbers are sent to and feature
+        DataFrames are returned from the workers. `frames` must then be a
+        picklable reader that supports `len()` and integer indexing, such
+        as a pims reader. Default False: the images are read in the
+        current process and sent to the workers.
     **kwargs :
         Keyword arguments that are passed to the wrapped `trackpy.locate`.
         Refer to its docstring for further details.
@@ -543,10 +578,24 @@ def batch(frames, diameter, output=None, meta=None, processes='auto',
             # Interpret meta to be a file handle.
             record_meta(meta_info, meta)
 
-    # Prepare wrapped function for mapping to `frames`
-    curried_locate = partial(locate, **kwargs)
-
-    pool, map_func = get_pool(processes)
+    # Prepare wrapped function for mapping to `frames`. Every image is read
+    # only once: the frame numbers are recorded while the images are handed
+    # to the workers, or returned by the workers that read the images.
+    if worker_reader:
+        pool, map_func = get_pool(processes, initializer=_set_worker_frames,
+                                  initargs=(frames,))
+        # Without a pool the frames are passed directly: the module global
+        # is only set in worker processes, so concurrent calls in threads of
+        # this process do not share it.
+        results = map_func(partial(_locate_index,
+                                   frames=None if pool else frames, **kwargs),
+                           range(len(frames)))
+    else:
+        pool, map_func = get_pool(processes)
+        frame_nos = deque()
+        results = map_func(partial(locate, **kwargs),
+                           _iter_frame_no(frames, frame_nos))
+        results = ((frame_nos.popleft(), features) for features in results)
 
     if after_locate is None:
         def after_locate(frame_no, features):
@@ -554,15 +603,8 @@ def batch(frames, diameter, output=None, meta=None, processes='auto',
 
     try:
         all_features = []
-        for i, features in enumerate(map_func(curried_locate, frames)):
-            image = frames[i]
-            if hasattr(image, 'frame_no') and image.frame_no is not None:
-                frame_no = image.frame_no
-                # Even if this worked, if locate() was running in parallel,
-                # it may not have had access to the "frame_no" attribute.
-                # Therefore we'll add the frame number to the DataFrame if
-                # needed, below.
-            else:
+        for i, (frame_no, features) in enumerate(results):
+            if frame_no is None:
                 frame_no = i
             if 'frame' not in features.columns:
                 features['frame'] = frame_no  # just counting iterations
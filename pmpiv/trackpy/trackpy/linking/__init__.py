@@ -1,7 +1,9 @@
 from .linking import (link, link_df, link_iter, link_df_iter,
-                      logger, Linker, adaptive_link_wrap)
+                      logger, Linker, ArrayLinker, adaptive_link_wrap)
 from .partial import link_partial, reconnect_traj_patch
 from .find_link import find_link, find_link_iter
+from .diagnostics import LinkDiagnostics
 from .utils import verify_integrity, SubnetOversizeException, TrackUnstored, \
                    Point, UnknownLinkingError
-from . import legacy, subnet, subnetlinker, find_link, linking, utils
+from . import (legacy, subnet, subnetlinker, find_link, linking, utils,
+               arraylinker, diagnostics)
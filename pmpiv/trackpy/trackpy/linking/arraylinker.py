@@ -0,0 +1,422 @@
+""" Linker engine that keeps the trajectory ends in arrays.
+
+The Crocker-Grier algorithm of :class:`~trackpy.linking.Linker`, without a
+Point object per feature: the features of the current frame and the memory
+window are stored as arrays of positions, track ids and levels. Candidates
+are found with one KD-tree query per frame, subnets are the connected
+components of the candidate graph and only subnets with more than one
+possible link are passed to the (numba) subnet solver.
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from ..utils import is_isotropic
+from ..try_numba import NUMBA_AVAILABLE
+from .utils import SubnetOversizeException, array_predictor
+from .subnetlinker import (_numba_subnet_norecur, recursive_linker_obj,
+                           nonrecursive_link)
+
+
+def _components(e_src, e_dest, n_src, n_dest):
+    """Connected components of the bipartite candidate graph. Nodes are the
+    destinations (0 ... n_dest - 1) followed by the sources."""
+    n = n_dest + n_src
+    graph = coo_matrix((np.ones(len(e_src), dtype=np.int8),
+                        (e_dest, n_dest + e_src)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    return labels[:n_dest], labels[n_dest:]
+
+
+def _sort_candidates(e_src, e_dest, e_dist, e_label):
+    """Sort the candidates by subnet, source, distance and destination (the
+    order of the forward candidates of Linker) and number the subnets
+    0, 1, 2, ... in order of their label."""
+    order = np.lexsort((e_dest, e_dist, e_src, e_label))
+    e_src, e_dest, e_dist = e_src[order], e_dest[order], e_dist[order]
+    e_label = e_label[order]
+    e_sub = np.cumsum(np.r_[False, e_label[1:] != e_label[:-1]])
+    return e_src, e_dest, e_dist, e_sub
+
+
+def _candidate_table(e_src, e_dest, e_sub, e_dist, search_range):
+    """Candidate arrays of the subnet solver for sorted candidates.
+
+    One row per source, rows grouped by subnet and sorted by the number of
+    candidates within a subnet. Candidates are the destination indices,
+    followed by the null candidate (-1, search_range).
+
+    Returns the sources, their subnet, the number of candidates (including
+    the null candidate), the candidates and their distances.
+    """
+    first = np.flatnonzero(np.r_[True, e_src[1:] != e_src[:-1]])
+    n_cands = np.diff(np.r_[first, len(e_src)])
+    sources, s_sub = e_src[first], e_sub[first]
+
+    row = np.repeat(np.arange(len(first)), n_cands)
+    col = np.arange(len(e_src)) - np.repeat(first, n_cands)
+    cands = np.full((len(first), n_cands.max() + 1), -1, dtype=np.int64)
+    dists = np.full(cands.shape, search_range, dtype=np.float64)
+    cands[row, col] = e_dest
+    dists[row, col] = e_dist
+
+    # the solver performs best with the most constrained sources first
+    order = np.lexsort((n_cands, s_sub))
+    return (sources[order], s_sub[order], n_cands[order] + 1,
+            cands[order], dists[order])
+
+
+class _Source:
+    """Source of a subnet for the pure Python subnet linkers."""
+    __slots__ = ['row', 'forward_cands']
+
+    def __init__(self, row, forward_cands):
+        self.row = row
+        self.forward_cands = forward_cands
+
+
+def _python_subnet(n_cands, cands, dists, n_dest, search_range, max_size,
+                   recursive=True):
+    """Solve one subnet of the candidate table with the pure Python subnet
+    linker of link_strategy 'recursive' or 'nonrecursive'.
+
+    Returns the destination of every source (-1 if not linked).
+    """
+    sources = [_Source(j, [(None if c < 0 else int(c), float(d))
+                           for c, d in zip(cands[j, :n], dists[j, :n])])
+               for j, n in enumerate(n_cands)]
+    if recursive:
+        s_list, d_list = recursive_linker_obj(sources, n_dest, search_range,
+                                              max_size=max_size)
+    else:
+        s_list, d_list = nonrecursive_link(sources, n_dest, search_range,
+                                           max_size=max_size)
+    best = np.full(len(sources), -1, dtype=np.int64)
+    for s, d in zip(s_list, d_list):
+        if d is not None:
+            best[s.row] = d
+    return best
+
+
+class ArrayLinker:
+    """Linker that stores the features in arrays instead of Point objects.
+
+    Same algorithm, parameters and results as :class:`Linker` (select it
+    with ``engine='array'`` in :func:`link`). Predictors are supported if
+    they have an array version (see :mod:`trackpy.predict`); custom
+    distance functions and custom subnet linkers need the Point objects and
+    are not supported. New trajectories are numbered in the order of their subnet,
+    then of their feature; the point based linker numbers the unclaimed
+    features inside a subnet in an arbitrary (set) order.
+
+    The subnets are solved as by the link_strategy of :class:`Linker`:
+    'hybrid' and 'numba' use the numba solver, 'recursive' and
+    'nonrecursive' the pure Python solvers and 'drop' does not link them.
+
+    Attributes
+    ----------
+    particle_ids : list
+        a list of track ids of the current level
+    coords : ndarray
+        The coordinates of the features of the current level.
+    ends : dict of ndarrays
+        Positions ('coords'), mapped positions ('eucl'), track ids
+        ('particle'), levels ('level') and times ('t') of the features that
+        can be linked to the next level.
+    diagnostics : LinkDiagnostics or None
+        Records per-frame statistics, see :class:`LinkDiagnostics`.
+
+    Methods
+    -------
+    init_level(coords, t, extra_data)
+        creates the first level (frame): no linking is done
+    next_level(coords, t, extra_data)
+        Add a level, assign candidates and subnets, and apply the links.
+
+    See also
+    --------
+    Linker
+    """
+    # Largest subnet we will attempt to solve.
+    MAX_SUB_NET_SIZE = 30
+    # For adaptive search, subnet linking should fail much faster.
+    MAX_SUB_NET_SIZE_ADAPTIVE = 15
+    # Maximum number of candidates per particle
+    MAX_NEIGHBORS = 10
+    # Maximum number of forward candidates in the numba solver
+    MAX_CANDIDATES = 8
+
+    def __init__(self, search_range, memory=0, predictor=None,
+                 adaptive_stop=None, adaptive_step=0.95,
+                 neighbor_strategy=None, link_strategy=None,
+                 dist_func=None, to_eucl=None, diagnostics=None):
+        self.diagnostics = diagnostics
+        self.predict = array_predictor(predictor)
+        if predictor is not None and self.predict is None:
+            raise ValueError("The array linker only supports predictors "
+                             "with an array version (predict_array).")
+        if dist_func is not None or neighbor_strategy not in [None, 'KDTree']:
+            raise ValueError("The array linker only supports the 'KDTree' "
+                             "neighbor_strategy.")
+
+        if link_strategy is None or link_strategy == 'auto':
+            if NUMBA_AVAILABLE:
+                link_strategy = 'hybrid'
+            else:
+                link_strategy = 'recursive'
+        if link_strategy not in ['recursive', 'nonrecursive', 'hybrid',
+                                 'numba', 'drop']:
+            raise ValueError("Unknown linking strategy '{}' for the array "
+                             "linker".format(link_strategy))
+        self.link_strategy = link_strategy
+
+        self.memory = memory
+        self.to_eucl = to_eucl
+        self.ndim = None  # unknown at this point; inferred at init_level()
+
+        # if search_range is anisotropic, transform coordinates to a rescaled
+        # space with search_range == 1.
+        if is_isotropic(search_range):
+            if hasattr(search_range, '__iter__'):
+                self.search_range = float(search_range[0])
+            else:
+                self.search_range = float(search_range)
+        elif self.to_eucl is not None:
+            raise ValueError('Cannot use anisotropic search ranges in '
+                             'combination with a coordinate transformation.')
+        else:
+            search_range = np.atleast_2d(search_range)
+            self.to_eucl = lambda x: x / search_range
+            self.search_range = 1.
+            # also rescale adaptive_stop
+            if adaptive_stop is not None:
+                adaptive_stop = np.max(adaptive_stop / search_range)
+
+        if adaptive_stop is not None:
+            if 1 * adaptive_stop <= 0:
+                raise ValueError("adaptive_stop must be positive.")
+            self.max_size = self.MAX_SUB_NET_SIZE_ADAPTIVE
+        else:
+            self.max_size = self.MAX_SUB_NET_SIZE
+        self.adaptive_stop = adaptive_stop
+        self.adaptive_step = adaptive_step
+
+    def _map(self, coords):
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, self.ndim)
+        if self.to_eucl is None or len(coords) == 0:
+            return coords
+        return np.asarray(self.to_eucl(coords), dtype=np.float64)
+
+    def init_level(self, coords, t, extra_data=None):
+        """extra_data is accepted for compatibility with Linker and ignored."""
+        coords = np.asarray(coords)
+        self.ndim = coords.shape[1]
+        self.level = 0
+        self._coords = coords
+        self._ids = np.arange(len(coords), dtype=np.int64)
+        self._n_tracks = len(coords)
+        self.ends = dict(coords=np.asarray(coords, dtype=np.float64),
+                         eucl=self._map(coords), particle=self._ids.copy(),
+                         level=np.zeros(len(coords), dtype=np.int64),
+                         t=self._times(t, len(coords)))
+        if self.diagnostics is not None:
+            self.diagnostics.start(t, len(coords), self.search_range)
+            self.diagnostics.finish([], [], len(coords))
+
+    @staticmethod
+    def _times(t, n):
+        return np.full(n, np.nan if t is None else t, dtype=np.float64)
+
+    @property
+    def particle_ids(self):
+        return self._ids.tolist()
+
+    @property
+    def coords(self):
+        return self._coords
+
+    def next_level(self, coords, t, extra_data=None):
+        if self.ndim is None:
+            raise RuntimeError("The Linker was not initialized. Please use "
+                               "`init_level` for the first level.")
+        self.level += 1
+        diag = self.diagnostics
+        if diag is not None:
+            diag.start(t, len(coords), self.search_range)
+        # features of the previous level and the memory window
+        alive = self.ends['level'] >= self.level - 1 - self.memory
+        src = {key: value[alive] for key, value in self.ends.items()}
+
+        if self.predict is not None and len(src['coords']) > 0:
+            src_eucl = self._map(self.predict(t, src['coords'], src['t']))
+        else:
+            src_eucl = src['eucl']
+        coords = np.asarray(coords, dtype=np.float64)
+        dest = self._map(coords)
+        linked_src, source_of, unclaimed = self.assign_links(src_eucl, dest)
+        ids = np.empty(len(dest), dtype=np.int64)
+        claimed = source_of >= 0
+        ids[claimed] = src['particle'][source_of[claimed]]
+        # unclaimed destination features: a track is born!
+        ids[unclaimed] = self._n_tracks + np.arange(len(unclaimed))
+        self._n_tracks += len(unclaimed)
+        if diag is not None:
+            linked_of = source_of[claimed]
+            diag.finish(np.linalg.norm(src_eucl[linked_of] - dest[claimed],
+                                       axis=1),
+                        self.level - 1 - src['level'][linked_of],
+                        len(unclaimed))
+
+        keep = ~linked_src
+        self.ends = dict(
+            coords=np.concatenate([src['coords'][keep],
+                                   coords.reshape(-1, self.ndim)]),
+            eucl=np.concatenate([src['eucl'][keep], dest]),
+            particle=np.concatenate([src['particle'][keep], ids]),
+            level=np.concatenate([src['level'][keep],
+                                  np.full(len(dest), self.level, np.int64)]),
+            t=np.concatenate([src['t'][keep], self._times(t, len(dest))]))
+        self._coords = coords
+        self._ids = ids
+
+    def assign_links(self, src, dest):
+        """Links between the source and destination positions (mapped).
+
+        Returns a boolean array of the linked sources, for every destination
+        its source (-1 if unclaimed) and the unclaimed destinations in the
+        order in which they start a new track: by subnet (subnets in order
+        of their last destination), then by index.
+        """
+        n_src, n_dest = len(src), len(dest)
+        linked = np.zeros(n_src, dtype=bool)
+        source_of = np.full(n_dest, -1, dtype=np.int64)
+        diag = self.diagnostics
+        if n_src == 0 or n_dest == 0:
+            if diag is not None:
+                diag.subnets(n_src, 0, [])
+            return linked, source_of, np.flatnonzero(source_of == -1)
+
+        tree = cKDTree(src, 15)
+        dists, inds = tree.query(dest, self.MAX_NEIGHBORS,
+                                 distance_upper_bound=self.search_range + 1e-7)
+        dists = dists.reshape(n_dest, -1)
+        inds = inds.reshape(n_dest, -1)
+        found = np.isfinite(dists)
+        e_dest = np.nonzero(found)[0]
+        e_src = inds[found]
+        e_dist = dists[found]
+
+        d_label, s_label = _components(e_src, e_dest, n_src, n_dest)
+        n_cands = np.bincount(e_src, minlength=n_src)
+        n_comp = max(d_label.max(), s_label.max()) + 1
+        comp_src = np.bincount(s_label[n_cands > 0], minlength=n_comp)
+        comp_dest = np.bincount(d_label, minlength=n_comp)
+        if diag is not None:
+            diag.subnets(n_src, len(e_src), comp_src[comp_src > 0])
+            diag.lap('time_tree')
+
+        # one source and one destination: link directly
+        e_label = d_label[e_dest]
+        single = (comp_src[e_label] == 1) & (comp_dest[e_label] == 1)
+        source_of[e_dest[single]] = e_src[single]
+        linked[e_src[single]] = True
+
+        # subnets with more than one possible link
+        e_src, e_dest, e_dist, e_sub = _sort_candidates(
+            e_src[~single], e_dest[~single], e_dist[~single], e_label[~single])
+        sources, dests = self._link_subnets(e_src, e_dest, e_dist, e_sub,
+                                            self.search_range)
+        source_of[dests] = sources
+        linked[sources] = True
+        if diag is not None:
+            diag.lap('time_solver')
+
+        # unclaimed destinations start new tracks in order of their subnet
+        last = np.zeros(n_comp, dtype=np.int64)
+        np.maximum.at(last, d_label, np.arange(n_dest))
+        unclaimed = np.flatnonzero(source_of == -1)
+        unclaimed = unclaimed[np.argsort(last[d_label[unclaimed]],
+                                         kind='mergesort')]
+        return linked, source_of, unclaimed
+
+    def _oversize(self, n_src, n_dest, n_cands):
+        """Message of the SubnetOversizeException of the subnet linker of
+        Linker, or None if the subnet can be solved."""
+        if n_src > self.max_size:
+            return "Subnetwork contains %d points" % n_src
+        small = n_src == 1 or n_dest == 1 or (n_src <= 3 and n_dest <= 3)
+        if ((self.link_strategy == 'numba' or
+                (self.link_strategy == 'hybrid' and not small)) and
+                n_cands > self.MAX_CANDIDATES + 1):
+            return ('search_range (aka maxdisp) too large for reasonable '
+                    'performance on these data (particle has %i forward '
+                    'candidates)' % n_cands)
+        return None
+
+    def _link_subnets(self, e_src, e_dest, e_dist, e_sub, search_range):
+        """Solve the subnets of the candidates (sorted, see
+        _sort_candidates). Returns the linked sources and destinations."""
+        if len(e_src) == 0:
+            return e_src, e_dest
+        sources, s_sub, n_cands, cands, dists = _candidate_table(
+            e_src, e_dest, e_sub, e_dist, search_range)
+
+        n_subs = e_sub[-1] + 1
+        bounds = np.searchsorted(s_sub, np.arange(n_subs + 1))
+        n_src = np.diff(bounds)
+        _, first_dest = np.unique(e_sub * (e_dest.max() + 1) + e_dest,
+                                  return_index=True)
+        n_dest = np.bincount(e_sub[first_dest], minlength=n_subs)
+        max_cands = np.maximum.reduceat(n_cands, bounds[:-1])
+
+        best = np.full(len(sources), -1, dtype=np.int64)
+        cur = np.full(len(sources), -1, dtype=np.int64)
+        tmp = np.zeros(len(sources), dtype=np.int64)
+        sums = np.zeros(len(sources), dtype=np.float64)
+        dists2 = dists**2
+        split = []
+        for k in range(n_subs):
+            if n_src[k] == 1 and n_dest[k] == 1:
+                best[bounds[k]] = cands[bounds[k], 0]
+                continue
+            message = self._oversize(n_src[k], n_dest[k], max_cands[k])
+            if message is not None:
+                if self.adaptive_stop is None or search_range <= self.adaptive_stop:
+                    # adaptive_stop is the search_range below which linking
+                    # is presumed invalid. So we just give up.
+                    raise SubnetOversizeException(message)
+                split.append(k)
+                continue
+            if self.link_strategy == 'drop':
+                continue
+            sl = slice(bounds[k], bounds[k + 1])
+            if self.link_strategy in ['recursive', 'nonrecursive']:
+                best[sl] = _python_subnet(
+                    n_cands[sl], cands[sl], dists[sl], n_dest[k],
+                    search_range, self.max_size,
+                    recursive=self.link_strategy == 'recursive')
+            else:
+                _numba_subnet_norecur(n_cands[sl], cands[sl], dists2[sl],
+                                      cur[sl], sums[sl], tmp[sl], best[sl])
+
+        linked = best >= 0
+        sources, dests = [sources[linked]], [best[linked]]
+        if len(split) > 0:
+            # Split the subnets with a reduced search_range and recurse
+            new_range = search_range * self.adaptive_step
+            if self.diagnostics is not None:
+                for k in split:
+                    self.diagnostics.adaptive_retry(new_range)
+            near = np.isin(e_sub, split) & (e_dist <= new_range)
+            e_src, e_dest, e_dist = e_src[near], e_dest[near], e_dist[near]
+            src_idx, e_src_local = np.unique(e_src, return_inverse=True)
+            dest_idx, e_dest_local = np.unique(e_dest, return_inverse=True)
+            d_label, _ = _components(e_src_local, e_dest_local,
+                                     len(src_idx), len(dest_idx))
+            split_src, split_dest = self._link_subnets(
+                *_sort_candidates(e_src, e_dest, e_dist,
+                                  d_label[e_dest_local]), new_range)
+            sources.append(split_src)
+            dests.append(split_dest)
+        return np.concatenate(sources), np.concatenate(dests)
@@ -0,0 +1,185 @@
+""" Per-frame statistics of the linkers, for tuning search_range and memory.
+
+Pass a :class:`LinkDiagnostics` as ``diagnostics`` to :func:`link`,
+:func:`link_df`, :func:`link_iter` or :func:`link_df_iter` (both engines).
+For every frame the linker records the number of features and candidates,
+the subnet sizes, the adaptive retries, the link distances, the links made
+from memory and the time spent in the KD-tree and in the subnet solver.
+"""
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class LinkDiagnostics:
+    """Records one entry per linked frame.
+
+    Parameters
+    ----------
+    log : str or file-like, optional
+        Every record is appended as one line of JSON (JSON Lines) as soon as
+        its frame is linked, so long or interrupted runs keep their records.
+        Read it back with :meth:`read_log`.
+
+    Attributes
+    ----------
+    records : list of dict
+        One dict per frame with the keys
+
+        - frame : frame number (the ``t`` of the linker)
+        - features : number of features in the frame
+        - sources : number of features that could be linked to the frame,
+          of the previous frame and the memory
+        - candidates : number of (source, destination) candidate pairs
+        - subnets : {size: count}, the number of subnets by their number of
+          source features (the size limited by the subnet solver), before
+          adaptive splitting
+        - adaptive_retries : number of subnets that were split with a
+          reduced search range
+        - min_range : smallest search range of these splits
+        - linked : number of links
+        - memory_links : {gap: count}, links from features that were
+          missing in gap frames (levels) before
+        - new : number of new trajectories
+        - search_range : search range of the linker (in rescaled units if
+          the search range is anisotropic), distances are in the same units
+        - distance_mean, distance_max : of the links
+        - distances : number of links by distance, in tenths of the search
+          range (10 bins)
+        - time_tree : time [s] to find the candidates and subnets
+          (predictor, KD-tree and subnet assignment)
+        - time_solver : time [s] in the subnet solver
+
+    Examples
+    --------
+    >>> diag = tp.linking.LinkDiagnostics('link.jsonl')
+    >>> linked = tp.link(features, 5, memory=3, diagnostics=diag)
+    >>> diag.close()
+    >>> diag.to_frame().head()
+    """
+    # records that are per-frame scalars (see to_frame)
+    COLUMNS = ['frame', 'features', 'sources', 'candidates', 'n_subnets',
+               'max_subnet', 'adaptive_retries', 'min_range', 'linked',
+               'n_memory_links', 'new', 'search_range', 'distance_mean',
+               'distance_max', 'time_tree', 'time_solver']
+
+    def __init__(self, log=None):
+        self.records = []
+        self._current = None
+        self._own_log = isinstance(log, str)
+        self._log = open(log, 'w') if self._own_log else log
+
+    def close(self):
+        """Close the log file, if it was opened by this object."""
+        if self._own_log and self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def start(self, t, features, search_range):
+        """Start the record of the next frame."""
+        self._current = dict(
+            frame=t.item() if hasattr(t, 'item') else t,
+            features=int(features), sources=0, candidates=0,
+            subnets={}, adaptive_retries=0, min_range=None, linked=0,
+            memory_links={}, new=0, search_range=float(search_range),
+            distance_mean=None, distance_max=None, distances=[0] * 10,
+            time_tree=0., time_solver=0.)
+        self._clock = time.perf_counter()
+
+    def lap(self, key):
+        """Add the time since the last lap (or start) to key."""
+        now = time.perf_counter()
+        self._current[key] += now - self._clock
+        self._clock = now
+
+    def subnets(self, sources, candidates, subnet_sizes):
+        """Number of sources and candidate pairs and the number of sources of
+        every subnet."""
+        self._current['sources'] = int(sources)
+        self._current['candidates'] = int(candidates)
+        sizes = np.bincount(np.asarray(subnet_sizes, dtype=np.int64))
+        for size in np.flatnonzero(sizes):
+            key = str(size)
+            self._current['subnets'][key] = \
+                self._current['subnets'].get(key, 0) + int(sizes[size])
+
+    def adaptive_retry(self, search_range):
+        """A subnet is split with the reduced search_range."""
+        current = self._current
+        if current is None:
+            return
+        current['adaptive_retries'] += 1
+        if current['min_range'] is None or search_range < current['min_range']:
+            current['min_range'] = float(search_range)
+
+    def finish(self, distances, gaps, new):
+        """Complete the record with the link distances, the gaps (levels
+        missed by the sources, 0 for the previous level) of the links and the
+        number of new trajectories."""
+        current = self._current
+        distances = np.asarray(distances, dtype=np.float64)
+        current['linked'] = len(distances)
+        if len(distances) > 0:
+            current['distance_mean'] = float(distances.mean())
+            current['distance_max'] = float(distances.max())
+            tenths = np.minimum(distances / current['search_range'] * 10, 9)
+            current['distances'] = np.bincount(tenths.astype(np.int64),
+                                               minlength=10).tolist()
+        gaps = np.bincount(np.asarray(gaps, dtype=np.int64))
+        current['memory_links'] = {str(g): int(gaps[g])
+                                   for g in np.flatnonzero(gaps) if g > 0}
+        current['new'] = int(new)
+        self._current = None
+        self.append(current)
+
+    def append(self, record):
+        """Add a complete record (e.g. of another process)."""
+        self.records.append(record)
+        if self._log is not None:
+            self._log.write(json.dumps(record, separators=(',', ':')) + '\n')
+            self._log.flush()
+
+    @classmethod
+    def read_log(cls, log):
+        """LinkDiagnostics with the records of a log file."""
+        diag = cls()
+        with open(log) as f:
+            diag.records = [json.loads(line) for line in f if line.strip()]
+        return diag
+
+    def to_frame(self):
+        """DataFrame of the per-frame scalars, with the number of subnets
+        (n_subnets), the largest subnet (max_subnet) and the number of links
+        from memory (n_memory_links)."""
+        rows = []
+        for r in self.records:
+            sizes = [int(s) for s in r['subnets']]
+            rows.append(dict(r, n_subnets=sum(r['subnets'].values()),
+                             max_subnet=max(sizes, default=0),
+                             n_memory_links=sum(r['memory_links'].values())))
+        return pd.DataFrame(rows, columns=self.COLUMNS)
+
+    def _histogram(self, key):
+        counts = {}
+        for r in self.records:
+            for k, v in r[key].items():
+                counts[int(k)] = counts.get(int(k), 0) + v
+        return pd.Series(counts, dtype=np.int64).sort_index()
+
+    def subnet_histogram(self):
+        """Number of subnets by size (number of sources), all frames."""
+        return self._histogram('subnets')
+
+    def distance_histogram(self):
+        """Number of links by distance, all frames. The index is the upper
+        bound of the bins as fraction of the search range (0.1 ... 1.0)."""
+        counts = np.zeros(10, dtype=np.int64)
+        for r in self.records:
+            counts += r['distances']
+        return pd.Series(counts, index=np.arange(1, 11) / 10.)
+
+    def memory_histogram(self):
+        """Number of links from memory by gap (missed levels), all frames."""
+        return self._histogram('memory_links')
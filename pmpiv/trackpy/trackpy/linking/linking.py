@@ -13,6 +13,8 @@ from .utils import (Point, TrackUnstored, points_from_arr,
 from .subnet import HashBTree, HashKDTree, Subnets, split_subnet
 from .subnetlinker import (subnet_linker_recursive, subnet_linker_drop,
                            subnet_linker_numba, subnet_linker_nonrecursive)
+from .arraylinker import ArrayLinker
+from .diagnostics import LinkDiagnostics
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +24,7 @@ def link_iter(coords_iter, search_range, **kwargs):
     link_iter(coords_iter, search_range, *,
         memory=0, predictor=None, adaptive_stop=None, adaptive_step=0.95,
         neighbor_strategy=None, link_strategy=None, dist_func=None,
-        to_eucl=None)
+        to_eucl=None, engine='points', diagnostics=None)
 
     Link an iterable of per-frame coordinates into trajectories.
 
@@ -64,6 +66,18 @@ def link_iter(coords_iter, search_range, **kwargs):
         in Euclidean space. Useful for instance to link by Euclidean distance
         starting from radial coordinates. If search_range is anisotropic, this
         parameter cannot be used.
+    engine : {'points', 'array'}
+        'points' (default) uses the Linker, which creates a Point object per
+        feature. 'array' uses the ArrayLinker, which keeps the features in
+        arrays and is much faster for many features per frame, with the same
+        trajectories. It supports the predictors of :mod:`trackpy.predict`
+        (not instrumented ones), but not dist_func and callable link
+        strategies.
+    diagnostics : LinkDiagnostics, optional
+        Records per-frame statistics of the linking: features, candidates,
+        subnet sizes, adaptive retries, link distances, links from memory and
+        the time in the KD-tree and in the subnet solver. See
+        :class:`~trackpy.linking.LinkDiagnostics`.
 
     Yields
     ------
@@ -94,8 +108,13 @@ def link_iter(coords_iter, search_range, **kwargs):
     else:
         t, coords = val
 
+    engine = kwargs.pop('engine', 'points')
+    if engine not in ['points', 'array']:
+        raise ValueError("engine must be 'points' or 'array'")
+    linker_cls = dict(points=Linker, array=ArrayLinker)[engine]
+
     # initialize the linker and yield the particle ids of the first frame
-    linker = Linker(search_range, **kwargs)
+    linker = linker_cls(search_range, **kwargs)
     linker.init_level(coords, t)
     yield t, linker.particle_ids
 
@@ -110,7 +129,7 @@ def link(f, search_range, pos_columns=None, t_column='frame', **kwargs):
     link(f, search_range, pos_columns=None, t_column='frame', *,
         memory=0, predictor=None, adaptive_stop=None, adaptive_step=0.95,
         neighbor_strategy=None, link_strategy=None, dist_func=None,
-        to_eucl=None)
+        to_eucl=None, engine='points', diagnostics=None)
 
     Link a DataFrame of coordinates into trajectories.
 
@@ -157,6 +176,18 @@ def link(f, search_range, pos_columns=None, t_column='frame', **kwargs):
         in Euclidean space. Useful for instance to link by Euclidean distance
         starting from radial coordinates. If search_range is anisotropic, this
         parameter cannot be used.
+    engine : {'points', 'array'}
+        'points' (default) uses the Linker, which creates a Point object per
+        feature. 'array' uses the ArrayLinker, which keeps the features in
+        arrays and is much faster for many features per frame, with the same
+        trajectories. It supports the predictors of :mod:`trackpy.predict`
+        (not instrumented ones), but not dist_func and callable link
+        strategies.
+    diagnostics : LinkDiagnostics, optional
+        Records per-frame statistics of the linking: features, candidates,
+        subnet sizes, adaptive retries, link distances, links from memory and
+        the time in the KD-tree and in the subnet solver. See
+        :class:`~trackpy.linking.LinkDiagnostics`.
 
     Returns
     -------
@@ -205,7 +236,7 @@ def link_df_iter(f_iter, search_range, pos_columns=None,
     link_df_iter(f_iter, search_range, pos_columns=None, t_column='frame', *,
         memory=0, predictor=None, adaptive_stop=None, adaptive_step=0.95,
         neighbor_strategy=None, link_strategy=None, dist_func=None,
-        to_eucl=None)
+        to_eucl=None, engine='points', diagnostics=None)
 
     Link an iterable of DataFrames into trajectories.
 
@@ -255,6 +286,18 @@ def link_df_iter(f_iter, search_range, pos_columns=None,
         in Euclidean space. Useful for instance to link by Euclidean distance
         starting from radial coordinates. If search_range is anisotropic, this
         parameter cannot be used.
+    engine : {'points', 'array'}
+        'points' (default) uses the Linker, which creates a Point object per
+        feature. 'array' uses the ArrayLinker, which keeps the features in
+        arrays and is much faster for many features per frame, with the same
+        trajectories. It supports the predictors of :mod:`trackpy.predict`
+        (not instrumented ones), but not dist_func and callable link
+        strategies.
+    diagnostics : LinkDiagnostics, optional
+        Records per-frame statistics of the linking: features, candidates,
+        subnet sizes, adaptive retries, link distances, links from memory and
+        the time in the KD-tree and in the subnet solver. See
+        :class:`~trackpy.linking.LinkDiagnostics`.
 
     Yields
     ------
@@ -283,8 +326,10 @@ def link_df_iter(f_iter, search_range, pos_columns=None,
 
 
 def adaptive_link_wrap(source_set, dest_set, search_range, subnet_linker,
-                       adaptive_stop=None, adaptive_step=0.95, **kwargs):
-    """Wraps a subnetlinker, making it adaptive."""
+                       adaptive_stop=None, adaptive_step=0.95,
+                       diagnostics=None, **kwargs):
+    """Wraps a subnetlinker, making it adaptive. Splits are recorded in
+    diagnostics (LinkDiagnostics), if given."""
     try:
         sn_spl, sn_dpl = subnet_linker(source_set, dest_set,
                                        search_range, **kwargs)
@@ -298,12 +343,15 @@ def adaptive_link_wrap(source_set, dest_set, search_range, subnet_linker,
             raise
 
         # Split the subnet and recurse
+        if diagnostics is not None:
+            diagnostics.adaptive_retry(new_range)
         sn_spl = []
         sn_dpl = []
         for source, dest in split_subnet(source_set, dest_set, new_range):
             split_spl, split_dpl = \
                 adaptive_link_wrap(source, dest, new_range, subnet_linker,
-                                   adaptive_stop, adaptive_step, **kwargs)
+                                   adaptive_stop, adaptive_step, diagnostics,
+                                   **kwargs)
             sn_spl.extend(split_spl)
             sn_dpl.extend(split_dpl)
 
@@ -334,6 +382,8 @@ class Linker:
         number of coordinates stays constant.
     subnets : Subnets
         Subnets object containing the subnets of the prev and current points.
+    diagnostics : LinkDiagnostics or None
+        Records per-frame statistics, see :class:`LinkDiagnostics`.
 
     Methods
     -------
@@ -365,9 +415,10 @@ class Linker:
     def __init__(self, search_range, memory=0, predictor=None,
                  adaptive_stop=None, adaptive_step=0.95,
                  neighbor_strategy=None, link_strategy=None,
-                 dist_func=None, to_eucl=None):
+                 dist_func=None, to_eucl=None, diagnostics=None):
         self.memory = memory
         self.predictor = predictor
+        self.diagnostics = diagnostics
         self.track_cls = TrackUnstored
         self.ndim = None  # unknown at this point; inferred at init_level()
 
@@ -437,6 +488,7 @@ class Linker:
                                                    subnet_linker=subnet_linker,
                                                    adaptive_stop=adaptive_stop,
                                                    adaptive_step=adaptive_step,
+                                                   diagnostics=diagnostics,
                                                    max_size=self.MAX_SUB_NET_SIZE_ADAPTIVE)
         else:
             self.subnet_linker = functools.partial(subnet_linker,
@@ -475,6 +527,9 @@ class Linker:
             self.mem_history.append(set())
 
         self.update_hash(coords, t, extra_data)
+        if self.diagnostics is not None:
+            self.diagnostics.start(t, len(coords), self.search_range)
+            self.diagnostics.finish([], [], len(coords))
         # Assume everything in first level starts a Track.
         # Iterate over prev_level, not prev_set, because order -> track ID.
         for p in self.hash.points:
@@ -505,13 +560,40 @@ class Linker:
         self.coords = value[default_pos_columns(self.ndim)].values
 
     def next_level(self, coords, t, extra_data=None):
+        diag = self.diagnostics
+        if diag is not None:
+            diag.start(t, len(coords), self.search_range)
         prev_hash = self.update_hash(coords, t, extra_data)
 
         self.subnets = Subnets(prev_hash, self.hash, self.search_range,
                                self.MAX_NEIGHBORS)
+        if diag is not None:
+            diag.subnets(len(prev_hash),
+                         sum(len(p.forward_cands) for p in prev_hash.points),
+                         [len(s) for s, _ in self.subnets if len(s) > 0])
+            diag.lap('time_tree')
         spl, dpl = self.assign_links()
+        if diag is not None:
+            diag.lap('time_solver')
+            self.diagnose_links(spl, dpl)
         self.apply_links(spl, dpl)
 
+    def diagnose_links(self, spl, dpl):
+        """Record the distances and memory gaps of the links in
+        self.diagnostics. Must be called before apply_links."""
+        # the memory points of j frames ago are in mem_history[-j]
+        gap_of = {p: len(self.mem_history) - j
+                  for j, mem in enumerate(getattr(self, 'mem_history', []))
+                  for p in mem if p in self.mem_set}
+        distances, gaps = [], []
+        for sp, dp in zip(spl, dpl):
+            if sp is None or dp is None:
+                continue
+            distances.append(next(d for p, d in sp.forward_cands if p is dp))
+            gaps.append(gap_of.get(sp, 0))
+        self.diagnostics.finish(distances, gaps,
+                                sum(sp is None for sp in spl))
+
     def assign_links(self):
         spl, dpl = [], []
         for source_set, dest_set in self.subnets:
@@ -70,6 +70,23 @@ def coords_from_df_iter(df_iter, pos_columns, t_column):
             yield df[t_column].iloc[0], df[pos_columns].values
 
 
+def array_predictor(predictor):
+    """The array version of a predictor, or None if it has none.
+
+    A predictor (a ``predict`` method of a predictor from
+    :mod:`trackpy.predict` or an object with such a method) that only depends
+    on the positions and times of the particles marks its ``predict`` with
+    ``from_arrays = True``. Its ``predict_array(t1, positions, times)`` takes
+    and returns ndarrays instead of Point objects."""
+    if getattr(predictor, 'from_arrays', False):
+        owner = getattr(predictor, '__self__', None)
+    elif getattr(getattr(predictor, 'predict', None), 'from_arrays', False):
+        owner = predictor
+    else:
+        owner = None
+    return getattr(owner, 'predict_array', None)
+
+
 def verify_integrity(df):
     """Verifies that particle labels are unique for each frame, and that every
     particle is labeled."""
@@ -7,7 +7,7 @@ from collections import deque
 import functools, itertools
 
 import numpy as np
-from scipy.interpolate import NearestNDInterpolator, interp1d
+from scipy.spatial import cKDTree
 import pandas as pd
 
 from . import linking
@@ -15,6 +15,14 @@ from . import linking
 from .utils import pandas_concat, guess_pos_columns
 
 
+def _particle_arrays(particles):
+    """Positions (N x d array) and times (N array) of a list of Points."""
+    particles = list(particles)
+    positions = np.array([p.pos for p in particles], dtype=float)
+    times = np.array([p.t for p in particles], dtype=float)
+    return positions, times
+
+
 def predictor(predict_func):
     """Decorator to vectorize a predictor function for a single particle.
 
@@ -133,7 +141,18 @@ class NullPredict:
 
     def predict(self, t1, particles):
         """Predict the positions of 'particles' at time 't1'"""
-        return map(lambda p: p.pos, particles)
+        positions, times = _particle_arrays(particles)
+        if len(positions) == 0:
+            return positions
+        return self.predict_array(t1, positions, times)
+    # predict only depends on the positions and times of the particles, so
+    # linkers may call predict_array directly (see ArrayLinker)
+    predict.from_arrays = True
+
+    def predict_array(self, t1, positions, times):
+        """Predict the positions (N x d array) at time 't1' of features
+        observed at 'times' (N array)"""
+        return positions
 
 
 class _RecentVelocityPredict(NullPredict):
@@ -157,29 +176,46 @@ class _RecentVelocityPredict(NullPredict):
                                  'you must specify pos_columns when you initialize the predictor object.')
 
     def _compute_velocities(self, frame):
-        """Compute velocity field based on a newly-tracked frame."""
+        """Compute velocity field based on a newly-tracked frame.
+
+        Returns dt and the positions and velocities (N x d arrays) of the
+        particles present in the first and last of the recent frames."""
         self._check_pos_columns()
-        pframe = frame.set_index('particle')
-        self.recent_frames.append(pframe)
+        particles = frame['particle'].values
+        order = np.argsort(particles, kind='mergesort')
+        times = frame[self.t_column].values
+        recent = (particles[order],
+                  frame[self.pos_columns].values.astype(float)[order],
+                  times[0] if len(times) > 0 else np.nan)
+        self.recent_frames.append(recent)
         if len(self.recent_frames) == 1:
             # Double the first frame. Velocity field will be zero.
-            self.recent_frames.append(pframe)
+            self.recent_frames.append(recent)
             dt = 1. # Avoid dividing by zero
         else: # Not the first frame
-            dt = float(self.recent_frames[-1][self.t_column].values[0] -
-                 self.recent_frames[0][self.t_column].values[0])
-
-        # Compute velocity field
-        disps = self.recent_frames[-1][self.pos_columns].join(
-            self.recent_frames[-1][self.pos_columns] -
-                self.recent_frames[0][self.pos_columns], rsuffix='_disp_').dropna()
-        positions = disps[self.pos_columns]
-        vels = disps[[cn + '_disp_' for cn in self.pos_columns]] / dt
-        # 'vels' will have same column names as 'positions'
-        vels = vels.rename(columns=lambda n: n[:-6])
+            dt = float(self.recent_frames[-1][2] - self.recent_frames[0][2])
+
+        # Compute velocity field from the particles in both frames
+        new_ids, new_pos, _ = self.recent_frames[-1]
+        old_ids, old_pos, _ = self.recent_frames[0]
+        _, i_new, i_old = np.intersect1d(new_ids, old_ids, assume_unique=True,
+                                         return_indices=True)
+        positions = new_pos[i_new]
+        vels = (new_pos[i_new] - old_pos[i_old]) / dt
         return dt, positions, vels
 
 
+class _NearestInterpolator:
+    """Value of the nearest sample, using one KD-tree of the samples."""
+    def __init__(self, positions, values):
+        self.tree = cKDTree(positions, balanced_tree=False, compact_nodes=False)
+        self.values = np.asarray(values, dtype=float)
+
+    def __call__(self, positions):
+        _, idx = self.tree.query(positions)
+        return self.values[idx]
+
+
 class NearestVelocityPredict(_RecentVelocityPredict):
     """Predict a particle's position based on the most recent nearby velocity.
 
@@ -207,7 +243,7 @@ class NearestVelocityPredict(_RecentVelocityPredict):
         super().__init__(span=span, pos_columns=pos_columns)
         if initial_guess_positions is not None:
             self.use_initial_guess = True
-            self.interpolator = NearestNDInterpolator(
+            self.interpolator = _NearestInterpolator(
                 np.asarray(initial_guess_positions),
                 np.asarray(initial_guess_vels))
         else:
@@ -218,16 +254,14 @@ class NearestVelocityPredict(_RecentVelocityPredict):
         if self.use_initial_guess:
             self.use_initial_guess = False
         else:
-            if positions.values.shape[0] > 0:
-                self.interpolator = NearestNDInterpolator(
-                    positions[self.pos_columns].values,
-                    vels[self.pos_columns].values)
+            if positions.shape[0] > 0:
+                self.interpolator = _NearestInterpolator(positions, vels)
             else:
                 # Sadly, the 2 most recent frames had no points in common.
                 warn('Could not generate velocity field for prediction: no tracks')
 
-                def null_interpolator(*x):
-                    return np.zeros((len(x),))
+                def null_interpolator(x):
+                    return np.zeros_like(x)
 
                 self.interpolator = null_interpolator
 
@@ -237,12 +271,9 @@ class NearestVelocityPredict(_RecentVelocityPredict):
                 'using_initial_guess': self.use_initial_guess,
                 }
 
-    def predict(self, t1, particles):
-        poslist, tlist = zip(*[(p.pos, p.t) for p in particles])
-        positions = np.array(poslist)
-        times = np.array(tlist)
+    def predict_array(self, t1, positions, times):
         return (positions + self.interpolator(positions) *
-               np.tile(t1 - times, (positions.shape[1], 1)).T)
+                (t1 - times)[:, np.newaxis])
 
 
 class DriftPredict(_RecentVelocityPredict):
@@ -273,14 +304,11 @@ class DriftPredict(_RecentVelocityPredict):
             self.vel = np.asarray(self.initial_guess)
             self.initial_guess = None
         else:
-            self.vel = vels.mean().values
+            self.vel = vels.mean(axis=0) if len(vels) > 0 else \
+                np.full(len(self.pos_columns), np.nan)
 
-    def predict(self, t1, particles):
-        poslist, tlist = zip(*[(p.pos, p.t) for p in particles])
-        positions = np.array(poslist)
-        times = np.array(tlist)
-        return (positions + self.vel *
-                np.tile(t1 - times, (positions.shape[1], 1)).T)
+    def predict_array(self, t1, positions, times):
+        return positions + self.vel * (t1 - times)[:, np.newaxis]
 
 
 class ChannelPredict(_RecentVelocityPredict):
@@ -329,41 +357,36 @@ class ChannelPredict(_RecentVelocityPredict):
             raise ValueError('pos_columns (%r) does not include the specified flow_axis (%s)!' %
                              (self.pos_columns, self.flow_axis))
         poscols = self.pos_columns[:]
-        flow_axis_position = poscols.index(self.flow_axis)
         poscols.remove(self.flow_axis)
         span_axis = poscols[0]
 
         # Make velocity profile
         dt, positions, vels = self._compute_velocities(frame)
+        flow_index = self.pos_columns.index(self.flow_axis)
+        span_index = self.pos_columns.index(span_axis)
 
         if self.initial_profile_guess is not None:
-            ipg = np.asarray(self.initial_profile_guess)
-            prof = pd.Series(ipg[:, 1], index=ipg[:, 0])
+            ipg = np.asarray(self.initial_profile_guess, dtype=float)
+            order = np.argsort(ipg[:, 0], kind='mergesort')
+            centers, prof = ipg[order, 0], ipg[order, 1]
             self.initial_profile_guess = None  # Don't reuse
         else:
-            # Bin centers
-            vels['bin'] = (positions[span_axis] - positions[span_axis]
-                                                 % self.bin_size + self.bin_size / 2.)
-            grpvels = vels.groupby('bin')[self.flow_axis]
+            # Running sums of the streamwise velocity per spanwise bin
+            bins = np.floor(positions[:, span_index] / self.bin_size).astype(np.int64)
+            if len(bins) > 0:
+                first = bins.min()
+                counts = np.bincount(bins - first)
+                sums = np.bincount(bins - first, weights=vels[:, flow_index])
+            else:
+                first, counts, sums = 0, np.zeros(0, dtype=np.int64), np.zeros(0)
             # Only use bins that have enough samples
-            profcount = grpvels.count()
-            prof = grpvels.mean()[profcount >= self.minsamples]
+            valid = np.nonzero(counts >= max(self.minsamples, 1))[0]
+            centers = (valid + first + 0.5) * self.bin_size
+            prof = sums[valid] / counts[valid]
 
         if len(prof) > 0:
-            # Handle boundary conditions for interpolator
-            prof_ind, prof_vals = list(prof.index), list(prof)
-            prof_ind.insert(0, -np.inf)
-            prof_ind.append(np.inf)
-            prof_vals.insert(0, prof.values[0])
-            prof_vals.append(prof.values[-1])
-            prof_vels = pd.DataFrame({self.flow_axis: pd.Series(prof_vals, index=prof_ind),
-                                      span_axis: 0})
-            prof_interp = interp1d(prof_vels.index.values, prof_vels[self.pos_columns].values,
-                                   'nearest', axis=0)
-            if flow_axis_position == 0:
-                self.interpolator = lambda x: prof_interp(x[:, 1])
-            else:
-                self.interpolator = lambda x: prof_interp(x[:, 0])
+            self.interpolator = _ProfileLookup(centers, prof, span_index,
+                                               flow_index)
         else:
             # Not enough samples in any bin
             warn('Could not generate velocity field for prediction: '
@@ -381,12 +404,25 @@ class ChannelPredict(_RecentVelocityPredict):
                 'initial_profile_guess': self.initial_profile_guess,
                 }
 
-    def predict(self, t1, particles):
-        poslist, tlist = zip(*[(p.pos, p.t) for p in particles])
-        positions = np.array(poslist)
-        times = np.array(tlist)
+    def predict_array(self, t1, positions, times):
         return (positions + self.interpolator(positions) *
-               np.tile(t1 - times, (positions.shape[1], 1)).T)
+                (t1 - times)[:, np.newaxis])
+
+
+class _ProfileLookup:
+    """Velocity vectors of a profile of the streamwise velocity at sorted
+    spanwise bin centers. A position takes the value of the nearest center
+    (ties go to the lower one), beyond the ends the value of the last one."""
+    def __init__(self, centers, values, span_index, flow_index):
+        self.bounds = (centers[1:] + centers[:-1]) / 2.
+        self.span_index = span_index
+        self.table = np.zeros((len(values), 2))
+        self.table[:, flow_index] = values
+
+    def __call__(self, positions):
+        idx = np.searchsorted(self.bounds, positions[:, self.span_index],
+                              side='left')
+        return self.table[idx]
 
 
 def instrumented(limit=None):
@@ -1,4 +1,6 @@
 import os
+import threading
+import time
 import unittest
 import warnings
 
@@ -12,7 +14,7 @@ from trackpy.artificial import (draw_feature, draw_spots, draw_point, draw_array
                                 gen_nonoverlapping_locations)
 from trackpy.utils import pandas_sort
 from trackpy.refine import refine_com_arr
-from trackpy.tests.common import sort_positions, StrictTestCase
+from trackpy.tests.common import sort_positions, StrictTestCase, TrackpyFrame
 from trackpy.preprocessing import invert_image
 from trackpy.uncertainty import measure_noise
 
@@ -802,3 +804,93 @@ class TestFeatureIdentificationWithNumba(
 if __name__ == '__main__':
     import unittest
     unittest.main()
+
+
+class CountingReader:
+    """Picklable reader of spot images that counts its reads. Frame numbers
+    start at offset, as for a sliced pims reader."""
+    def __init__(self, count=4, offset=10):
+        self.count = count
+        self.offset = offset
+        self.reads = 0
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i >= self.count:
+            raise IndexError
+        self.reads += 1
+        pos = [[20 + 5 * i, 20], [60, 40 + 3 * i]]
+        image = draw_spots((80, 90), pos, 4, noise_level=1)
+        return TrackpyFrame(image, frame_no=self.offset + i)
+
+
+class TestBatch(StrictTestCase):
+    def setUp(self):
+        self.params = dict(diameter=9, minmass=100, engine='python')
+        self.expected = pandas_sort(
+            tp.batch(CountingReader(), processes=1, **self.params),
+            ['frame', 'x']).reset_index(drop=True)
+
+    def test_frame_no(self):
+        assert_allclose(np.unique(self.expected['frame']), [10, 11, 12, 13])
+        self.assertEqual(len(self.expected), 8)
+
+    def test_read_once(self):
+        reader = CountingReader()
+        tp.batch(reader, processes=1, **self.params)
+        self.assertEqual(reader.reads, len(reader))
+
+        reader = CountingReader()
+        tp.batch(reader, processes=1, worker_reader=True, **self.params)
+        self.assertEqual(reader.reads, len(reader))
+
+    def test_after_locate_frame_no(self):
+        frame_nos = []
+
+        def after_locate(frame_no, features):
+            frame_nos.append(frame_no)
+            return features
+
+        tp.batch(CountingReader(), processes=2, after_locate=after_locate,
+                 **self.params)
+        self.assertEqual(frame_nos, [10, 11, 12, 13])
+
+    def test_parallel(self):
+        for worker_reader in [False, True]:
+            actual = tp.batch(CountingReader(), processes=2,
+                              worker_reader=worker_reader, **self.params)
+            actual = pandas_sort(actual, ['frame', 'x']).reset_index(drop=True)
+            assert_allclose(actual[['frame', 'x', 'y', 'mass']],
+                            self.expected[['frame', 'x', 'y', 'mass']])
+
+    def test_worker_reader_threads(self):
+        # In-process batches with worker_reader must not share the frames
+        # of the worker processes; run two of them concurrently.
+        class SlowReader(CountingReader):
+            def __getitem__(self, i):
+                time.sleep(0.02)
+                return super().__getitem__(i)
+
+        readers = [SlowReader(count=3, offset=0), SlowReader(count=8, offset=20)]
+        results = [None, None]
+
+        def run(j):
+            results[j] = tp.batch(readers[j], processes=1, worker_reader=True,
+                                  **self.params)
+
+        threads = [threading.Thread(target=run, args=(j,)) for j in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for reader, actual in zip(readers, results):
+            expected = tp.batch(CountingReader(reader.count, reader.offset),
+                                processes=1, **self.params)
+            actual = pandas_sort(actual, ['frame', 'x']).reset_index(drop=True)
+            expected = pandas_sort(expected,
+                                   ['frame', 'x']).reset_index(drop=True)
+            assert_allclose(actual[['frame', 'x', 'y', 'mass']],
+                            expected[['frame', 'x', 'y', 'mass']])
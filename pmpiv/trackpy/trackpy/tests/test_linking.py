@@ -10,7 +10,8 @@ from numpy.testing import assert_equal
 from trackpy.try_numba import NUMBA_AVAILABLE
 from trackpy.utils import pandas_sort, pandas_concat
 from trackpy.linking import (link, link_iter, link_df_iter, verify_integrity,
-                             SubnetOversizeException, Linker, link_partial)
+                             SubnetOversizeException, Linker, link_partial,
+                             LinkDiagnostics)
 from trackpy.linking.subnetlinker import subnet_linker_recursive
 from trackpy.tests.common import assert_traj_equal, StrictTestCase
 
@@ -782,6 +783,120 @@ class TestBTreeLink(SubnetNeededTests):
         assert_traj_equal(actual, expected)
 
 
+class TestArrayLink(SubnetNeededTests):
+    def setUp(self):
+        self.linker_opts = dict(engine='array')
+
+    @staticmethod
+    def random_walkers():
+        # Many random walkers with gaps
+        np.random.seed(0)
+        N = 300
+        length = 10
+        pos = np.random.random((N, 2)) * 100
+        frames = []
+        for t in range(length):
+            pos = pos + np.random.randn(N, 2) * 0.5
+            present = np.random.random(N) > 0.1
+            frames.append(DataFrame(dict(x=pos[present, 0], y=pos[present, 1],
+                                         frame=t)))
+        return pandas_concat(frames, ignore_index=True)
+
+    def test_same_as_linker(self):
+        f = self.random_walkers()
+        for opts in [dict(), dict(memory=2),
+                     dict(adaptive_stop=0.5, adaptive_step=0.9)]:
+            expected = link(f, 3, **opts)
+            actual = self.link(f, 3, **opts)
+            assert_traj_equal(actual, expected)
+
+    def test_link_strategies(self):
+        # every strategy solves the subnets as the Linker with that strategy
+        f = self.random_walkers()
+        for strategy in ['recursive', 'nonrecursive', 'hybrid', 'numba']:
+            expected = link(f, 3, memory=1, link_strategy=strategy)
+            actual = self.link(f, 3, memory=1, link_strategy=strategy)
+            assert_traj_equal(actual, expected)
+
+    def test_drop_link(self):
+        f = DataFrame({'x': [0, 1, 3], 'y': [1, 1, 1], 'frame': [0, 1, 1]})
+        actual = self.link(f, 5, link_strategy='drop')
+        assert set(actual.particle) == {0, 1, 2}
+
+    def test_unsupported(self):
+        f = unit_steps()
+        with self.assertRaises(ValueError):
+            self.link(f, 5, predictor=lambda t, particles: particles)
+        with self.assertRaises(ValueError):
+            self.link(f, 5, neighbor_strategy='BTree')
+        with self.assertRaises(ValueError):
+            self.link(f, 5, engine='unknown')
+
+
+class TestLinkDiagnostics(StrictTestCase):
+    engine = 'points'
+
+    def link(self, f, search_range, **kwargs):
+        diag = LinkDiagnostics()
+        kwargs = dict(dict(engine=self.engine), **kwargs)
+        link(f, search_range, diagnostics=diag, **kwargs)
+        return diag
+
+    def test_records(self):
+        # two particles, one appears in frame 1 and one skips frame 2
+        f = DataFrame(dict(x=[0, 10, 1, 11, 50, 2, 3, 12.5], y=0,
+                           frame=[0, 0, 1, 1, 1, 2, 3, 3]))
+        diag = self.link(f, 2, memory=1)
+        df = diag.to_frame()
+        assert_equal(df['frame'].values, [0, 1, 2, 3])
+        assert_equal(df['features'].values, [2, 3, 1, 2])
+        assert_equal(df['sources'].values, [0, 2, 3, 3])
+        assert_equal(df['candidates'].values, [0, 2, 1, 2])
+        assert_equal(df['linked'].values, [0, 2, 1, 2])
+        assert_equal(df['new'].values, [2, 1, 0, 0])
+        assert_equal(df['n_memory_links'].values, [0, 0, 0, 1])
+        assert_equal(df['distance_max'].values[1:], [1, 1, 1.5])
+        assert_equal(df['adaptive_retries'].values, 0)
+        assert_equal(diag.records[1]['subnets'], {'1': 2})
+        assert_equal(diag.memory_histogram().to_dict(), {1: 1})
+        # distances 1, 1, 1 and 1, 1.5 in tenths of the search range 2
+        assert_equal(diag.distance_histogram().values,
+                     [0, 0, 0, 0, 0, 4, 0, 1, 0, 0])
+        assert (df['time_tree'] >= 0).all() and (df['time_solver'] >= 0).all()
+
+    def test_adaptive_retries(self):
+        f = contracting_grid()
+        diag = self.link(f, 2, adaptive_stop=0.1, adaptive_step=0.95)
+        record = diag.records[1]
+        assert record['adaptive_retries'] > 0
+        assert record['min_range'] < 2
+        # subnets are recorded before they are split
+        assert diag.subnet_histogram().index.max() > Linker.MAX_SUB_NET_SIZE_ADAPTIVE
+
+    def test_log(self):
+        import tempfile
+        f = contracting_grid()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fn = os.path.join(tmpdir, 'link.jsonl')
+            diag = LinkDiagnostics(fn)
+            link(f, 2, adaptive_stop=0.1, engine=self.engine, diagnostics=diag)
+            diag.close()
+            assert diag.records == LinkDiagnostics.read_log(fn).records
+
+
+class TestLinkDiagnosticsArray(TestLinkDiagnostics):
+    engine = 'array'
+
+    def test_same_as_linker(self):
+        f = contracting_grid()
+        kwargs = dict(adaptive_stop=0.1, memory=1)
+        expected = TestLinkDiagnostics.link(self, f, 2, engine='points',
+                                            **kwargs).to_frame()
+        actual = self.link(f, 2, **kwargs).to_frame()
+        columns = [c for c in expected.columns if not c.startswith('time')]
+        pd.testing.assert_frame_equal(actual[columns], expected[columns])
+
+
 class TestMockSubnetlinker(StrictTestCase):
     def setUp(self):
         self.dest = []
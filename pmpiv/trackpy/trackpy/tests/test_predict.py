@@ -395,6 +395,101 @@ class ChannelPredictYDFTests(LinkDFWithPrediction, ChannelPredictYTests, StrictT
     pass
 
 
+# Test the array linker, which calls predict_array instead of predict
+class ArrayLinkIterWithPrediction(LinkIterWithPrediction):
+    def link(self, frames, pred, *args, **kw):
+        kw = dict(engine='array', **kw)
+        return super().link(frames, pred, *args, **kw)
+
+    def get_unwrapped_linker(self):
+        return functools.partial(trackpy.link_df_iter, engine='array')
+
+    def test_predict_diagnostics(self):
+        # instrumented predictors record the Point objects
+        pred = self.instrumented_predict_class()
+        frames = (self.mkframe(0), self.mkframe(25))
+        with self.assertRaises(ValueError):
+            self.get_linked_lengths(frames, pred, 45)
+
+
+class ALNearestVelocityPredictTests(ArrayLinkIterWithPrediction, NearestVelocityPredictTests, StrictTestCase):
+    pass
+
+
+class ALDriftPredictTests(ArrayLinkIterWithPrediction, DriftPredictTests, StrictTestCase):
+    pass
+
+
+class ALChannelPredictXTests(ArrayLinkIterWithPrediction, ChannelPredictXTests, StrictTestCase):
+    pass
+
+
+class ALChannelPredictYTests(ArrayLinkIterWithPrediction, ChannelPredictYTests, StrictTestCase):
+    pass
+
+
+class TestPredictArray(StrictTestCase):
+    def setUp(self):
+        self.frames = [mkframe(n) for n in (0, 25, 50)]
+
+    def observed(self, pred):
+        pred.pos_columns = ['x', 'y']
+        pred.t_column = 'frame'
+        for f in self.frames:
+            f = f.copy()
+            f['particle'] = np.arange(len(f))
+            pred.observe(f)
+        return pred
+
+    def assert_same_prediction(self, pred):
+        positions = np.array([[0., 0.], [50., 120.], [250., -3.]])
+        times = np.array([50., 25., 50.])
+        points = [trackpy.linking.utils.Point(t, pos)
+                  for pos, t in zip(positions, times)]
+        actual = pred.predict_array(75, positions, times)
+        assert_equal(np.asarray(list(pred.predict(75, points))), actual)
+        assert_equal(trackpy.linking.utils.array_predictor(pred.predict)(
+            75, positions, times), actual)
+        return actual
+
+    def test_null(self):
+        actual = self.assert_same_prediction(predict.NullPredict())
+        assert_equal(actual[0], [0, 0])
+
+    def test_nearest_velocity(self):
+        actual = self.assert_same_prediction(
+            self.observed(predict.NearestVelocityPredict()))
+        assert_equal(actual[0], [25, -25])
+        assert_equal(actual[1], [100, 70])
+
+    def test_drift(self):
+        actual = self.assert_same_prediction(
+            self.observed(predict.DriftPredict()))
+        assert_equal(actual[2], [275, -28])
+
+    def test_channel(self):
+        pred = self.observed(predict.ChannelPredict(3, minsamples=3))
+        actual = self.assert_same_prediction(pred)
+        assert_equal(actual[0], [25, 0])
+
+    def test_channel_profile_lookup(self):
+        # nearest valid bin center, ties go to the lower bin
+        pred = predict.ChannelPredict(10, initial_profile_guess=[
+            [25., 3.], [5., 1.], [15., 2.]], pos_columns=['y', 'x'])
+        pred.t_column = 'frame'
+        pred.observe(pandas.DataFrame(dict(x=[0.], y=[0.], frame=[0],
+                                           particle=[0])))
+        positions = np.array([[-100., 0.], [10., 0.], [10.1, 0.], [21., 0.],
+                              [1000., 0.]])
+        actual = pred.predict_array(1, positions, np.zeros(5))
+        assert_equal(actual[:, 1], [1., 1., 2., 3., 3.])
+        assert_equal(actual[:, 0], positions[:, 0])
+
+    def test_instrumented(self):
+        pred = predict.instrumented()(predict.DriftPredict)()
+        self.assertIsNone(trackpy.linking.utils.array_predictor(pred.predict))
+
+
 # Test legacy linking functions, wrapped by a predictor method
 class LegacyLinkWithPrediction:
     def get_linked_lengths(self, frames, pred, *args, **kw):
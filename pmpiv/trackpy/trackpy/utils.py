@@ -389,7 +389,7 @@ def safe_exp(arr):
     result[mask] = np.exp(arr[mask])
     return result
 
-def get_pool(processes):
+def get_pool(processes, initializer=None, initargs=()):
     """Returns the appropriate pool and map functions if multiprocessing needs
     to be used, otherwise None, map.
 
@@ -398,6 +398,11 @@ def get_pool(processes):
     processes : integer or "auto"
         The number of processes to use in parallel. If <= 1, multiprocessing is
         disabled. If "auto", the number returned by `os.cpu_count()`` is used.
+    initializer : function, optional
+        Called with ``initargs`` once in each worker process. It is not
+        called if multiprocessing is disabled.
+    initargs : tuple, optional
+        Arguments of ``initializer``.
 
     Returns
     -------
@@ -416,7 +421,8 @@ def get_pool(processes):
 
     if processes is None or processes > 1:
         # Use multiprocessing
-        pool = Pool(processes=processes)
+        pool = Pool(processes=processes, initializer=initializer,
+                    initargs=initargs)
         map_func = pool.imap
     else:
         pool = None
@@ -64,23 +64,17 @@ if TASK == "BATCH" or TASK == "ALL":
     hmf1.histogram('mass', bins = 50)
 
 
-    # Compute statistics to see if batching is good
-    # It is only used later for percentile filtering
-    # Do not compute if not necessary, since expensive
-    _sq_stats = pmpiv.fstats.Sequence_Statistics(frames, m_metadata = md)
-    # sq_stats = _sq_stats.get(force_recompute = True)
-    sq_stats = _sq_stats.get()
-    # print(sq_stats)
-
     # Locate Gaussian-like blobs of some approximate size in the set of images
+    # and compute the sequence statistics (used for percentile filtering) in the same pass.
     # This takes place fully parallel
     #tp.quiet()  # Turn off progress reports for best performance
-    df_all = tp.batch(frames, md.FEATURE_SIZE, minmass=md.FEATURE_MIN_SIZE, invert = md.FEATURES_ARE_DARK)
+    df_all, sq_stats = pmpiv.locate_sequence(frames, m_metadata = md)
+    # print(sq_stats)
 
     # Linking particle positions
     df_filtered = tp.link(df_all.copy( deep = True ), md.MAX_PARTICLE_SPEED, memory = 0)
 
-    df_filtered = pmpiv.filtering.complete_removal( df_filtered.copy( deep = True ), m_metadata = md )
+    df_filtered = pmpiv.filtering.complete_removal( df_filtered.copy( deep = True ), m_metadata = md, combined = True )
     # image_sequence.plot_annotated_pngs(df_filtered, os.path.join(md.WORKING_DIR, f'png_filtered_removal_all'), color = 'red')
     image_sequence.plot_annotated_tiffs(df_filtered, os.path.join(md.WORKING_DIR, f'tiff_filtered_removal_all'), color = 'red')
 
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach 
+         david.krach@mib.uni-stuttgart.de
+
+Shared fixtures of the pmpiv tests. Run from the repository root with 
+the paths of addpythonpath.sh:
+
+    source addpythonpath.sh
+    python3 -m pytest tests
+"""
+
+### HEADER ------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+# test1 is an example study, not a test module
+collect_ignore = ['test1']
+
+
+PARAMS = {'IN_FORMAT'            : 'tif',
+          'PIXELSIZE'            : '1.3e-06',
+          'HEIGHT'               : '100.0e-06',
+          'START_FRAME'          : '0',
+          'END_FRAME'            : '0',
+          'RATE'                 : '1',
+          'FEATURE_SIZE'         : '7',
+          'FEATURE_MIN_SIZE'     : '100',
+          'FEATURES_ARE_DARK'    : 'True',
+          'FPS'                  : '70.0',
+          'MAX_PARTICLE_SPEED'   : '4',
+          'MEMORY'               : '0',
+          'DURATION'             : '5',
+          'REMOVE_STATIC'        : 'True',
+          'CHECK_STATIC'         : '0',
+          'STATIC_DEV_PARAMETER' : '0.05',
+          'REMOVAL'              : '',
+          'EXTRACTION'           : ''}
+
+
+@pytest.fixture
+def make_metadata(tmp_path):
+    """
+    Returns a function writing a parameter file in tmp_path (IN_PATH 
+    tmp_path/in, WORKING_DIR tmp_path/work, JSON_PATH tmp_path/json) with 
+    the given parameters replaced and returning its Metadata. folder 
+    places the files in tmp_path/folder instead (several experiments).
+    """
+    def _make(folder = None, **params):
+        base = tmp_path / folder if folder is not None else tmp_path
+        for d in ['in', 'work', 'json']:
+            os.makedirs(base / d, exist_ok = True)
+        _params = dict(PARAMS, IN_PATH = str(base / 'in'), 
+                       WORKING_DIR = str(base / 'work'), 
+                       JSON_PATH = str(base / 'json'))
+        _params.update({k : str(v) for k, v in params.items()})
+        infile = base / 'params.txt'
+        with open(infile, 'w') as fh:
+            for k, v in _params.items():
+                fh.write(f'{k} {v}\n')
+        return pmpiv.metadata.Metadata(str(infile))
+
+    return _make
@@ -45,17 +45,12 @@ image_sequence.plot_parallel()
 # Extract subsection <class 'slicerator.Slicerator'>
 frames = image_sequence.subsection_range()
 
-# Compute statistics to see if batching is good
-# It is only used later for percentile filtering
-# Do not compute if not necessary, since expensive
-_sq_stats = pmpiv.fstats.Sequence_Statistics(frames, m_metadata = md)
-sq_stats = _sq_stats.get()
-# print(sq_stats)
-
 # Locate Gaussian-like blobs of some approximate size in the set of images
+# and compute the sequence statistics (used for percentile filtering) in the same pass.
 # This takes place fully parallel
 #tp.quiet()  # Turn off progress reports for best performance
-df_all = tp.batch(frames, md.FEATURE_SIZE, minmass=md.FEATURE_MIN_SIZE, invert = md.FEATURES_ARE_DARK)
+df_all, sq_stats = pmpiv.locate_sequence(frames, m_metadata = md)
+# print(sq_stats)
 
 # Linking particle positions 
 # sequential computation
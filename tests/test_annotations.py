@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach 
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+
+import os
+import json
+import hashlib
+
+import numpy as np
+import pytest
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+pytest.importorskip('pycocotools')
+
+
+def _write_coco(fn):
+    """
+    Two images, the annotated one (id 1) is not the first entry.
+    """
+    coco = {'images'      : [{'id' : 2, 'height' : 10, 'width' : 12, 'file_name' : 'b.tif'},
+                             {'id' : 1, 'height' : 20, 'width' : 30, 'file_name' : 'a.tif'}],
+            'categories'  : [{'id' : 1, 'name' : 'REMOVE'}],
+            'annotations' : [{'id' : 1, 'image_id' : 1, 'category_id' : 1, 'iscrowd' : 0,
+                              'area' : 50, 'bbox' : [5, 4, 10, 5],
+                              'segmentation' : [[5, 4, 15, 4, 15, 9, 5, 9]]}]}
+    with open(fn, 'w') as fh:
+        json.dump(coco, fh)
+
+
+def test_cache_key_image_shape(make_metadata):
+    md = make_metadata()
+    fn = os.path.join(md.JSON_PATH, 'remove.json')
+    _write_coco(fn)
+
+    handler = pmpiv.annotations.Annotation_Handler(fn, m_metadata = md, verbose = False)
+    mask    = handler.annotations2mask()
+    assert mask.shape == (20, 30)
+    assert mask.sum() > 0
+
+    with open(fn, 'rb') as fh:
+        key = hashlib.sha1(fh.read() + str((20, 30)).encode()).hexdigest()[:16]
+    assert os.path.basename(handler._cache_file()) == f'annotations_remove_{key}.npz'
+
+    # read back from the cache
+    assert os.path.isfile(handler._cache_file())
+    np.testing.assert_array_equal(handler.annotations2mask(), mask)
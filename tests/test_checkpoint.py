@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach 
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+
+def _features(n_frames = 10, n = 5):
+    return pd.DataFrame({'frame' : np.repeat(np.arange(n_frames), n),
+                         'x'     : np.arange(n_frames * n, dtype = float),
+                         'y'     : np.arange(n_frames * n, dtype = float) * 0.5})
+
+
+def _checkpoint(md, inputs = {'images' : 'a'}, options = {'chunk_frames' : 4}):
+    return pmpiv.Checkpoint('locate', m_metadata = md, params = ['MAX_PARTICLE_SPEED', 'MEMORY'],
+                            inputs = inputs, options = options, verbose = False)
+
+
+def test_resume(make_metadata):
+    md = make_metadata()
+    df = _features()
+
+    ckpt = _checkpoint(md)
+    assert not ckpt.is_complete and ckpt.chunks() == []
+    # interrupted after the first chunk
+    ckpt.write_chunk(0, df[df['frame'] < 4])
+
+    ckpt = _checkpoint(md)
+    assert not ckpt.is_complete
+    assert ckpt.has_chunk(0) and not ckpt.has_chunk(1)
+    ckpt.write_chunk(1, df[df['frame'] >= 4])
+    ckpt.complete()
+
+    ckpt = _checkpoint(md)
+    assert ckpt.is_complete and ckpt.chunks() == [0, 1]
+    out = ckpt.read().reset_index(drop = True)
+    pd.testing.assert_frame_equal(out[df.columns], df, check_dtype = False)
+    assert len(ckpt.read(frames = (4, 5)).index) == 10
+
+
+@pytest.mark.parametrize('change', ['params', 'inputs', 'options', 'upstream'])
+def test_invalidation(make_metadata, change):
+    md = make_metadata()
+    ckpt = _checkpoint(md)
+    ckpt.write(_features(), chunk_frames = 4)
+    assert ckpt.is_complete and ckpt.chunks() == [0, 1, 2]
+
+    if change == 'params':
+        ckpt = _checkpoint(make_metadata(MAX_PARTICLE_SPEED = 5))
+    elif change == 'inputs':
+        ckpt = _checkpoint(md, inputs = {'images' : 'b'})
+    elif change == 'options':
+        ckpt = _checkpoint(md, options = {'chunk_frames' : 8})
+    else:
+        upstream = pmpiv.Checkpoint('masks', m_metadata = md, verbose = False)
+        ckpt = pmpiv.Checkpoint('locate', m_metadata = md, params = ['MAX_PARTICLE_SPEED', 'MEMORY'],
+                                inputs = {'images' : 'a'}, options = {'chunk_frames' : 4},
+                                upstream = [upstream], verbose = False)
+
+    assert not ckpt.is_complete
+    assert ckpt.chunks() == []
+
+
+def test_unchanged_parameters(make_metadata):
+    ckpt = _checkpoint(make_metadata())
+    ckpt.write(_features(), chunk_frames = 4)
+
+    # a parameter the stage does not depend on
+    ckpt = _checkpoint(make_metadata(DURATION = 10))
+    assert ckpt.is_complete
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach 
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+EXTENSIONS = ['.csv', '.parquet', '.feather', '.npy']
+
+
+def _df():
+    rng = np.random.default_rng(0)
+    n = 60
+    # unsorted frames, written sorted by frame
+    return pd.DataFrame({'frame'    : rng.permutation(np.repeat(np.arange(12), 5)),
+                         'particle' : np.arange(n),
+                         'x'        : rng.uniform(0, 100, n),
+                         'y'        : rng.uniform(0, 100, n),
+                         'mass'     : rng.uniform(100, 500, n)})
+
+
+def _skip_without_pyarrow(ext):
+    if ext in ['.parquet', '.feather']:
+        pytest.importorskip('pyarrow')
+
+
+@pytest.mark.parametrize('ext', EXTENSIONS)
+def test_round_trip(tmp_path, ext):
+    _skip_without_pyarrow(ext)
+    df = _df()
+
+    pmpiv.df_io.write2csv(df, str(tmp_path), f'df{ext}')
+    out = pmpiv.df_io.read_csv(str(tmp_path), f'df{ext}')
+
+    # csv keeps the row order, the columnar formats are sorted by frame
+    expected = df if ext == '.csv' else df.sort_values('frame', kind = 'stable')
+    assert list(out.index) == list(out['frame'])
+    pd.testing.assert_frame_equal(out.reset_index(drop = True), expected.reset_index(drop = True), 
+                                  check_dtype = False)
+
+
+@pytest.mark.parametrize('ext', EXTENSIONS)
+def test_columns_and_frames(tmp_path, ext):
+    _skip_without_pyarrow(ext)
+    df = _df()
+
+    pmpiv.df_io.write_store(df, str(tmp_path), f'df{ext}', verbose = False)
+    out = pmpiv.df_io.read_store(str(tmp_path), f'df{ext}', columns = ['particle', 'x'], 
+                                 frames = (3, 6), memory_map = True)
+
+    expected = df[(df['frame'] >= 3) & (df['frame'] <= 6)].sort_values('frame', kind = 'stable')
+    assert list(out.columns) == ['particle', 'x']
+    np.testing.assert_array_equal(out['particle'].to_numpy(), expected['particle'].to_numpy())
+    np.testing.assert_allclose(out['x'].to_numpy(), expected['x'].to_numpy())
+
+
+def test_npy_is_a_folder(tmp_path):
+    pmpiv.df_io.write_store(_df(), str(tmp_path), 'df.npy', verbose = False)
+    assert os.path.isfile(os.path.join(tmp_path, 'df.npy', 'x.npy'))
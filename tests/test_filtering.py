@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach 
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+
+def _mask():
+    mask = np.zeros((40, 50), dtype = np.uint8)
+    mask[5:12, 8:20]  = 1
+    mask[20:30, 30:33] = 1
+    mask[25, 5]       = 1
+    mask[31:33, 40]   = 1
+    mask[34:36, 40]   = 1
+    return mask
+
+
+def _ranges(mask):
+    """
+    Range DF of a mask as from Annotation_Handler.annotations2DF.
+    """
+    ys, xs  = np.nonzero(mask)
+    columns = sorted(set(xs.tolist()))
+    ranges  = []
+    for c in columns:
+        runs = []
+        for _, group in itertools.groupby(enumerate(sorted(ys[xs == c])), lambda t: t[1] - t[0]):
+            group = list(group)
+            runs.append((group[0][1], group[-1][1]))
+        ranges.append(runs)
+    return pd.DataFrame({'x' : columns, 'y' : ranges})
+
+
+def _features(n = 2000, seed = 0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'x' : rng.uniform(-3, 53, n), 'y' : rng.uniform(-3, 43, n), 'frame' : 0})
+    # positions on the pixel grid and half way between pixels
+    df.loc[:299, ['x', 'y']] = np.round(df.loc[:299, ['x', 'y']] * 2) / 2
+    return df
+
+
+@pytest.mark.parametrize('fuzziness', [0.3, 0.5, 1.0, 1.7, 2.5])
+@pytest.mark.parametrize('m_type', ['remove', 'extract'])
+def test_mask_engine_equals_range_engine(make_metadata, fuzziness, m_type):
+    md   = make_metadata()
+    mask = _mask()
+    df   = _features()
+
+    ann_filter = pmpiv.filtering.Annotation_Filtering(df, m_metadata = md, fuzziness = fuzziness, 
+                                                      verbose = False, save = False)
+    f = getattr(ann_filter, m_type)
+    df_range = f(_ranges(mask), json_type = 'COCO_range')
+    df_mask  = f(mask, json_type = 'COCO_mask')
+
+    assert 0 < len(df_mask.index) < len(df.index)
+    np.testing.assert_array_equal(np.sort(df_range['x'].to_numpy()), np.sort(df_mask['x'].to_numpy()))
+    np.testing.assert_array_equal(np.sort(df_range['y'].to_numpy()), np.sort(df_mask['y'].to_numpy()))
+
+
+@pytest.mark.parametrize('fuzziness', [0.5, 1.0])
+def test_classify_label_bits(make_metadata, fuzziness):
+    md    = make_metadata()
+    mask  = _mask()
+    other = np.zeros_like(mask)
+    other[8:26, 15:35] = 1
+    labels = (mask | (other << 1)).astype(np.uint8)
+    df = _features()
+
+    ann_filter = pmpiv.filtering.Annotation_Filtering(df, m_metadata = md, fuzziness = fuzziness, 
+                                                      verbose = False, save = False)
+    classified = ann_filter.classify(labels)
+
+    for bit, m in enumerate([mask, other]):
+        kept = ann_filter.remove(m, json_type = 'COCO_mask')
+        assert np.count_nonzero((classified >> bit) & 1) == len(df.index) - len(kept.index)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach 
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import trackpy as tp
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+tp.quiet()
+
+
+def _random_walkers(n = 150, length = 24, seed = 0):
+    """
+    Random walkers with gaps, dense enough for subnets.
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(0, 80, (n, 2))
+    frames = []
+    for t in range(length):
+        pos = pos + rng.normal(0, 0.7, (n, 2))
+        present = rng.uniform(size = n) > 0.1
+        frames.append(pd.DataFrame({'x' : pos[present, 0], 'y' : pos[present, 1], 'frame' : t}))
+    df = pd.concat(frames, ignore_index = True)
+    df['id'] = np.arange(len(df))
+    return df
+
+
+def _partition(df):
+    """
+    Trajectories as sets of feature ids, independent of their numbering.
+    """
+    return set(frozenset(ids) for ids in df.groupby('particle')['id'].apply(tuple))
+
+
+@pytest.mark.parametrize('memory', [0, 2])
+@pytest.mark.parametrize('patches', [2, 5])
+def test_parallel_link_equals_link(make_metadata, memory, patches):
+    md = make_metadata(MEMORY = memory)
+    df = _random_walkers()
+
+    expected = tp.link(df.copy(), 3, memory = memory)
+    actual   = pmpiv.parallel_link(df.copy(), m_metadata = md, search_range = 3, 
+                                   processes = 2, patches = patches, verbose = False)
+
+    assert len(actual.index) == len(df.index)
+    assert _partition(actual) == _partition(expected)
+    # trajectories are numbered in order of their first feature
+    np.testing.assert_array_equal(actual['particle'].to_numpy(),
+                                  pmpiv.linking.canonical_particles(actual['particle'].to_numpy()))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach 
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import trackpy as tp
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+tp.quiet()
+
+
+def _channel_flow(n = 60, length = 12, seed = 0):
+    """
+    Particles moving 5 px per frame in x with small random steps.
+    """
+    rng = np.random.default_rng(seed)
+    x0 = rng.uniform(0, 200, n)
+    y0 = rng.uniform(0, 100, n)
+    frames = []
+    for t in range(length):
+        frames.append(pd.DataFrame({'x'     : x0 + 5 * t + rng.normal(0, 0.2, n),
+                                    'y'     : y0 + rng.normal(0, 0.2, n),
+                                    'frame' : t,
+                                    'id'    : np.arange(n)}))
+    return pd.concat(frames, ignore_index = True)
+
+
+def test_field_predictor_links_with_small_range(make_metadata):
+    md = make_metadata(DURATION = 3)
+    df = _channel_flow()
+
+    expected  = tp.link(df.copy(), 7)
+    predictor = pmpiv.Field_Predictor.from_trajectories(expected, m_metadata = md, cell_size = 50, min_count = 1)
+
+    predicted = predictor.predict_array(3, np.array([[50., 100.]]), np.array([1]))
+    np.testing.assert_allclose(predicted, [[50., 110.]], atol = 1)
+
+    # the steps are larger than the search range without the predictor
+    assert tp.link(df.copy(), 3)['particle'].nunique() > df['id'].nunique()
+
+    for engine in ['points', 'array']:
+        actual = tp.link(df.copy(), 3, predictor = predictor, engine = engine)
+        # every particle is one trajectory
+        assert (actual.groupby('particle')['id'].nunique() == 1).all()
+        assert actual['particle'].nunique() == df['id'].nunique()
+
+
+def test_predictor_key(make_metadata):
+    assert pmpiv.predictor.predictor_key(m_metadata = make_metadata()) is None
+
+    md = make_metadata(PREDICTOR = 'field')
+    assert pmpiv.predictor.predictor_key(m_metadata = md) == 'learned'
+
+    linked = tp.link(_channel_flow(), 7)
+    field  = pmpiv.Velocity_Field(m_metadata = md, cell_size = 50, verbose = False)
+    field.add(linked)
+    field.save()
+    key = pmpiv.predictor.predictor_key(m_metadata = md)
+    assert key == pmpiv.checkpoint.file_hash(os.path.join(md.WORKING_DIR, 'velocity_field.npz'))
+
+    field = pmpiv.Velocity_Field(m_metadata = md, cell_size = 25, verbose = False)
+    field.add(linked)
+    field.save()
+    assert pmpiv.predictor.predictor_key(m_metadata = md) not in [key, 'learned']
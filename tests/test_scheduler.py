@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach 
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+
+import os
+
+import numpy as np
+import pytest
+
+import pmpiv as pmpiv
+from trackpy.artificial import draw_spots
+
+###--------------------------------------------------------------------------------
+
+tifffile = pytest.importorskip('tifffile')
+
+
+def _write_spots(folder, n_frames, seed):
+    """
+    Dark spots, different in every experiment and frame.
+    """
+    rng = np.random.default_rng(seed)
+    for k in range(n_frames):
+        pos   = rng.uniform(10, 190, size = (20, 2))
+        image = 255 - draw_spots((200, 200), pos, 4, noise_level = 1)
+        tifffile.imwrite(os.path.join(folder, f'img{k}.tif'), image.astype(np.uint8))
+
+
+def _features(ckpt):
+    df = ckpt.read().reset_index(drop = True)
+    return df.sort_values(['frame', 'x']).reset_index(drop = True)[['frame', 'x', 'y', 'mass']]
+
+
+def test_more_experiments_than_cores(make_metadata):
+    # four experiments on three cores: three concurrent locate stages with 
+    # one process each (in-process batches), one of them with the I/O slot 
+    # (read-ahead), the others reading in their threads
+    # (packed frame stacks: the workers of a pool would read the frames)
+    experiments = []
+    for k, n_frames in enumerate([12, 30, 20, 25]):
+        raw = make_metadata(folder = f'raw{k}')
+        _write_spots(raw.IN_PATH, n_frames, seed = k)
+        stack = pmpiv.pack_sequence(m_metadata = raw, verbose = False)
+        experiments.append(make_metadata(folder = f'exp{k}', IN_PATH = stack))
+
+    reports = pmpiv.run_experiments([md.infile for md in experiments],
+                                    cores = 3, io_slots = 1, stages = ['locate'],
+                                    chunk_frames = 10, report = None, verbose = False)
+    assert all(r['stages']['locate']['status'] == 'done' for r in reports.values())
+
+    for k, md in enumerate(experiments):
+        # complete checkpoint of the scheduled run, read back
+        actual = pmpiv.pipeline.stage_locate(m_metadata = md, chunk_frames = 10,
+                                             processes = 1, verbose = False)
+        # serial run of the same images in a new working directory
+        serial = make_metadata(folder = f'serial{k}', IN_PATH = md.IN_PATH)
+        expected = pmpiv.pipeline.stage_locate(m_metadata = serial, chunk_frames = 10,
+                                               processes = 1, verbose = False)
+        assert len(_features(expected)) > 0
+        np.testing.assert_allclose(_features(actual).values, _features(expected).values)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 17 2026
+
+@author: David Krach 
+         david.krach@mib.uni-stuttgart.de
+"""
+
+### HEADER ------------------------------------------------------------------------
+
+import os
+
+import numpy as np
+import pytest
+
+import pmpiv as pmpiv
+
+###--------------------------------------------------------------------------------
+
+tifffile = pytest.importorskip('tifffile')
+
+
+def _write_frames(folder, numbers):
+    """
+    Unpadded file names img<k>.tif, every pixel of frame k has the value k.
+    """
+    for k in numbers:
+        tifffile.imwrite(os.path.join(folder, f'img{k}.tif'), np.full((6, 8), k, dtype = np.uint8))
+
+
+def test_pack_sequence_order(make_metadata, tmp_path):
+    md = make_metadata()
+    _write_frames(md.IN_PATH, [10, 2, 1, 11, 3])
+
+    outfolder = pmpiv.pack_sequence(m_metadata = md, outfolder = str(tmp_path / 'stack'), verbose = False)
+    assert pmpiv.stack.is_stack(outfolder)
+
+    stack = pmpiv.stack.Frame_Stack(outfolder)
+    # natural order as pims: names, metadata and frames stay aligned
+    assert stack.files == ['img1.tif', 'img2.tif', 'img3.tif', 'img10.tif', 'img11.tif']
+    assert [m['file'] for m in stack.index['metadata']] == stack.files
+    assert [int(frame[0, 0]) for frame in stack] == [1, 2, 3, 10, 11]
+    assert stack.frame_shape == (6, 8)
+    assert stack.files[1:3] == stack[1:3].files
+
+
+def test_pack_sequence_shape_mismatch(make_metadata, tmp_path):
+    md = make_metadata()
+    _write_frames(md.IN_PATH, [1, 2])
+    tifffile.imwrite(os.path.join(md.IN_PATH, 'img10.tif'), np.zeros((4, 4), dtype = np.uint8))
+
+    with pytest.raises(ValueError, match = 'img10.tif'):
+        pmpiv.pack_sequence(m_metadata = md, outfolder = str(tmp_path / 'stack'), verbose = False)
+    assert not pmpiv.stack.is_stack(str(tmp_path / 'stack'))
+
+
+def test_image_sequence_reads_stack(make_metadata, tmp_path):
+    md = make_metadata()
+    _write_frames(md.IN_PATH, [1, 2, 10])
+    md.IN_PATH = pmpiv.pack_sequence(m_metadata = md, outfolder = str(tmp_path / 'stack'), verbose = False)
+
+    with pmpiv.Image_Sequence(m_metadata = md) as image_sequence:
+        image_sequence.quiet()
+        frames = image_sequence.read()
+        assert isinstance(frames, pmpiv.Frame_Stack)
+        assert [int(frame[0, 0]) for frame in frames] == [1, 2, 10]